@@ -6,7 +6,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from config import TEMPLATES_DIR
-from routes import videos_bp, jobs_bp, stats_bp, tiktok_bp, cleanup_bp
+from routes import videos_bp, jobs_bp, stats_bp, tiktok_bp, cleanup_bp, metrics_bp
+from services.job_executor import job_executor, download_executor
 
 
 def create_app():
@@ -25,6 +26,10 @@ def create_app():
     app.register_blueprint(stats_bp)
     app.register_blueprint(tiktok_bp)
     app.register_blueprint(cleanup_bp)
+    app.register_blueprint(metrics_bp)
+    
+    job_executor.start()
+    download_executor.start()
     
     @app.route("/")
     def serve_index():
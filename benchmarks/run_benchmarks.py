@@ -0,0 +1,316 @@
+"""Benchmark suite for the FFmpegHelper pipelines.
+
+Synthetic inputs are generated locally with lavfi, then every case runs in its
+own worker process so CPU time and peak RSS cover that case only (ffmpeg and
+ffprobe children included). Results are written as JSON and compared against a
+stored baseline:
+
+    python benchmarks/run_benchmarks.py                      # run, compare with baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline      # record a new baseline
+    python benchmarks/run_benchmarks.py --quick --case split_parallel
+
+The exit code is 1 when a case got slower than the baseline by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+
+SEGMENT_DURATION = 10
+
+# name: (duration s, width, height, fps, gop in frames)
+INPUTS = {
+    "720p30_gop30_20s": (20, 1280, 720, 30, 30),
+    "1080p30_gop250_60s": (60, 1920, 1080, 30, 250),
+    "720p60_gop120_30s": (30, 1280, 720, 60, 120),
+    "vertical1080_gop60_20s": (20, 1080, 1920, 30, 60),
+}
+QUICK_INPUTS = ("720p30_gop30_20s",)
+
+CASES = (
+    "probe",
+    "split_parallel",
+    "split_single_pass",
+    "split_fast",
+    "split_smart",
+    "split_720p",
+    "merge_lossless",
+    "merge_720p",
+    "merge_reencode",
+    "extract_frames",
+)
+
+# Metrics compared against the baseline; output size is reported but not a regression
+COMPARED_METRICS = ("wall_s", "cpu_s")
+
+
+def generate_input(path, duration, width, height, fps, gop):
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-c:a", "aac", "-b:a", "128k",
+        "-threads", "1",
+        path
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def ensure_inputs(names, input_dir):
+    os.makedirs(input_dir, exist_ok=True)
+    paths = {}
+    for name in names:
+        path = os.path.join(input_dir, f"{name}.mp4")
+        if not os.path.exists(path):
+            print(f"Generating {name}...")
+            generate_input(path, *INPUTS[name])
+        paths[name] = path
+    return paths
+
+
+def run_case(case, input_path, workdir):
+    """Run one case in this process; returns the output files it produced"""
+    from utils.ffmpeg import FFmpegHelper
+    from utils.probe_cache import probe_cache
+    from utils.artifact_cache import artifact_cache
+
+    # Keep every run cold: no cached probes, no cached artifacts
+    probe_cache.max_entries = 0
+    artifact_cache.root = os.path.join(workdir, ".cache")
+    artifact_cache.max_bytes = 0
+
+    pattern = os.path.join(workdir, "segment_{index}.mp4")
+
+    if case == "probe":
+        FFmpegHelper.get_video_info(input_path)
+        return []
+
+    total = FFmpegHelper.get_duration(input_path)
+    if case == "split_parallel":
+        return FFmpegHelper.split_video_lossless(input_path, pattern, SEGMENT_DURATION, total)
+    if case == "split_single_pass":
+        return FFmpegHelper.split_video_single_pass(input_path, pattern, SEGMENT_DURATION, total)
+    if case == "split_fast":
+        plan = FFmpegHelper.plan_keyframe_segments(input_path, SEGMENT_DURATION, total, 2.0)
+        if plan is None:
+            plan = FFmpegHelper.get_segment_plan(SEGMENT_DURATION, total)
+        return FFmpegHelper.split_video_stream_copy(input_path, pattern, plan)
+    if case == "split_smart":
+        return FFmpegHelper.split_video_smart(input_path, pattern, SEGMENT_DURATION, total, workdir) or []
+    if case == "split_720p":
+        return FFmpegHelper.split_video_720p(input_path, pattern, SEGMENT_DURATION, total)
+
+    output = os.path.join(workdir, "merged.mp4")
+    inputs = [input_path, input_path]
+    if case == "merge_lossless":
+        ok = FFmpegHelper.merge_videos_lossless(inputs, output, workdir)
+    elif case == "merge_720p":
+        ok = FFmpegHelper.merge_videos_720p(inputs, output, workdir)
+    elif case == "merge_reencode":
+        ok = FFmpegHelper._merge_with_reencode(inputs, output, workdir)
+    elif case == "extract_frames":
+        return run_extract_frames(input_path, workdir)
+    else:
+        raise ValueError(f"Unknown case {case}")
+    return [output] if ok else []
+
+
+def run_extract_frames(input_path, workdir):
+    from werkzeug.datastructures import FileStorage
+    import utils.file_handler
+    import services.video_service
+    from services.video_service import VideoService
+
+    utils.file_handler.UPLOAD_DIR = workdir
+    services.video_service.OUTPUT_DIR = workdir
+
+    with open(input_path, "rb") as f:
+        result, error = VideoService.extract_frames(FileStorage(f, filename="input.mp4"), "input.mp4")
+    if error:
+        raise RuntimeError(error)
+    return [result["firstFrame"], result["lastFrame"]]
+
+
+def rss_mb(usage):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss / scale
+
+
+def worker(case, input_path, workdir):
+    """Entry point of the per-case process: prints the case metrics as JSON"""
+    # Import the application before the clock starts so only the case itself is timed
+    import utils.ffmpeg  # noqa: F401
+    import services.video_service  # noqa: F401
+
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+
+    outputs = run_case(case, input_path, workdir)
+
+    wall = time.perf_counter() - start
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def cpu(before, after):
+        return (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    output_bytes = 0
+    for name in outputs:
+        path = name if os.path.isabs(name) else os.path.join(workdir, name)
+        if os.path.exists(path):
+            output_bytes += os.path.getsize(path)
+
+    print(json.dumps({
+        "wall_s": wall,
+        "cpu_s": cpu(self_before, self_after) + cpu(children_before, children_after),
+        "peak_rss_mb": max(rss_mb(self_after), rss_mb(children_after)),
+        "output_bytes": output_bytes,
+        "outputs": len(outputs),
+    }))
+
+
+def measure(case, input_path, repeat):
+    runs = []
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix="clipflow_bench_")
+        try:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", case, input_path, workdir],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "wall_s": round(statistics.median(r["wall_s"] for r in runs), 4),
+        "cpu_s": round(statistics.median(r["cpu_s"] for r in runs), 4),
+        "peak_rss_mb": round(max(r["peak_rss_mb"] for r in runs), 1),
+        "output_bytes": runs[-1]["output_bytes"],
+        "outputs": runs[-1]["outputs"],
+        "runs": len(runs),
+    }
+
+
+def environment():
+    try:
+        ffmpeg = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.splitlines()[0]
+    except (OSError, IndexError):
+        ffmpeg = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": ffmpeg,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every metric against the baseline; returns the regressions"""
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            if not previous.get(metric):
+                continue
+            change = (current[metric] - previous[metric]) / previous[metric]
+            changes.append(f"{metric} {previous[metric]:.3f} -> {current[metric]:.3f} ({change:+.1%})")
+            if change > threshold:
+                regressions.append(f"{key} {metric} {change:+.1%}")
+        print(f"{key}: " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FFmpegHelper pipelines")
+    parser.add_argument("--case", action="append", choices=CASES, help="case to run (repeatable, default: all)")
+    parser.add_argument("--input", action="append", choices=sorted(INPUTS), help="input to use (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="only the smallest input")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the median is kept")
+    parser.add_argument("--input-dir", default=os.path.join(tempfile.gettempdir(), "clipflow_bench_inputs"))
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing")
+    parser.add_argument("--worker", nargs=3, metavar=("CASE", "INPUT", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return 0
+
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        print("ffmpeg and ffprobe are required to run the benchmarks")
+        return 2
+
+    names = args.input or (list(QUICK_INPUTS) if args.quick else list(INPUTS))
+    cases = args.case or list(CASES)
+    inputs = ensure_inputs(names, args.input_dir)
+
+    results = {}
+    for name in names:
+        for case in cases:
+            key = f"{name}/{case}"
+            results[key] = measure(case, inputs[name], max(1, args.repeat))
+            if "error" in results[key]:
+                print(f"{key}: error: {results[key]['error']}")
+            else:
+                print(f"{key}: {results[key]['wall_s']:.3f}s wall, {results[key]['cpu_s']:.3f}s cpu, "
+                      f"{results[key]['peak_rss_mb']:.0f} MB, {results[key]['output_bytes']} bytes")
+
+    report = {"environment": environment(), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with, run with --save-baseline first")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
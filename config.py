@@ -8,10 +8,152 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 ALLOWED_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm', 'flv', 'wmv', 'm4v'}
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
 
+# Resumable chunked uploads
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 3600  # seconds before an unfinished upload is discarded
+UPLOAD_WRITE_TIMEOUT = 600  # seconds a chunk write holds its offset before another PUT may take it over
+
 FFMPEG_VIDEO_CODEC = "libx264"
 FFMPEG_AUDIO_CODEC = "aac"
 FFMPEG_PRESET = "medium"
 FFMPEG_CRF = "23"
 
+# Named x264 settings selectable per request. 'auto' picks one from the current load:
+# 'fast' once AUTO_PROFILE_BUSY_QUEUE jobs (splits, merges and social downloads) are
+# waiting, otherwise 'balanced', the medium/CRF 23 baseline used before profiles existed.
+# 'auto' never picks 'quality', even when idle: its slow preset would make a lone job
+# slower than before and hold up whatever arrives next. It stays an explicit choice.
+ENCODING_PROFILES = {
+    "quality": {"preset": "slow", "crf": "20"},
+    "balanced": {"preset": FFMPEG_PRESET, "crf": FFMPEG_CRF},
+    "fast": {"preset": "veryfast", "crf": "25"},
+}
+BASE_ENCODING_PROFILE = "balanced"
+DEFAULT_ENCODING_PROFILE = "auto"
+AUTO_PROFILE_BUSY_QUEUE = 4
+
+# Split engines: 'parallel' runs one ffmpeg per segment, 'single_pass' decodes the
+# input once and writes every segment with the segment muxer, 'fast' snaps cuts to
+# source keyframes and stream-copies without re-encoding, 'smart' keeps exact cuts
+# but only re-encodes up to the first keyframe of each segment.
+SPLIT_MODES = ('parallel', 'single_pass', 'fast', 'smart')
+DEFAULT_SPLIT_MODE = 'parallel'
+KEYFRAME_SNAP_TOLERANCE = 2.0  # seconds a 'fast' cut may move to reach a keyframe
+
+# Job executor: each server process runs JOB_WORKERS jobs at a time, taken from the
+# 'pending' rows of the jobs table. New jobs are refused once JOB_QUEUE_LIMIT are waiting.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", 20))
+JOB_POLL_INTERVAL = 2.0
+JOB_HEARTBEAT_INTERVAL = 10.0
+JOB_HEARTBEAT_TIMEOUT = 60.0  # a 'processing' job without heartbeat for this long is requeued
+JOB_MAX_ATTEMPTS = 3
+
+# Social downloads are 'social' jobs run by their own pool, so slow downloads never hold
+# the split/merge workers. SOCIAL_PLATFORM_LIMITS caps the downloads running at once per
+# platform across all server processes ('default' for platforms not listed). yt-dlp runs
+# in a child process and is killed after SOCIAL_DOWNLOAD_TIMEOUT seconds.
+SOCIAL_DOWNLOAD_WORKERS = int(os.environ.get("SOCIAL_DOWNLOAD_WORKERS", 4))
+SOCIAL_DOWNLOAD_QUEUE_LIMIT = int(os.environ.get("SOCIAL_DOWNLOAD_QUEUE_LIMIT", 50))
+SOCIAL_PLATFORM_LIMITS = {
+    'default': 2,
+    'youtube': 2,
+    'facebook': 1,
+    'instagram': 1,
+}
+SOCIAL_DOWNLOAD_TIMEOUT = 1800
+
+# A 720p conversion reads the stream yt-dlp selected straight from the platform, so
+# the encode overlaps the download and the original is never written. The server
+# fetches the stream itself and pipes it into ffmpeg, so the platform's headers and
+# cookies never appear on a command line. Formats that are not one progressive HTTP
+# stream (DASH video and audio apart, HLS, images) and failed streamed encodes fall
+# back to downloading the file first, then converting it. Streamed encodes run at the
+# pace of the network: they share their own SOCIAL_STREAM_ENCODE_BUDGET threads
+# instead of holding slots of ENCODE_CPU_BUDGET for the whole download.
+SOCIAL_STREAM_TRANSCODE = os.environ.get("SOCIAL_STREAM_TRANSCODE", "1") != "0"
+SOCIAL_STREAM_ENCODE_BUDGET = int(os.environ.get("SOCIAL_STREAM_ENCODE_BUDGET", max(1, (os.cpu_count() or 1) // 2)))
+SOCIAL_STREAM_RETRIES = 3  # reconnections, resumed with a Range request, before a stream is given up
+
+# A URL whose media (same canonical id, same 720p choice) was downloaded less than
+# SOCIAL_CACHE_TTL seconds ago is served from that file; while a download of it is
+# running, repeat requests join that job. Files do not outlive TEMPORARY_OUTPUT_RETENTION,
+# so the TTL is capped at half of it: a file served from the cache stays on disk for at
+# least that long to be fetched.
+SOCIAL_CACHE_TTL = int(os.environ.get("SOCIAL_CACHE_TTL", 3600))
+
+# A batch (/api/social/batches) takes a list of URLs, or a playlist/profile URL that
+# yt-dlp expands, and queues one 'social' job per item on the download pool above.
+# At most SOCIAL_BATCH_MAX_ITEMS items per batch; a playlist is cut there. Items only
+# get their job while the pool has room under SOCIAL_DOWNLOAD_QUEUE_LIMIT; the rest
+# wait in the batch and are fed in as jobs finish, and every SOCIAL_BATCH_FEED_INTERVAL.
+SOCIAL_BATCH_MAX_ITEMS = int(os.environ.get("SOCIAL_BATCH_MAX_ITEMS", 100))
+SOCIAL_BATCH_FEED_INTERVAL = 10
+
+# ffprobe results are cached per (path, size, mtime); the keyframe interval stored on
+# each video is measured over the first KEYFRAME_SAMPLE_SECONDS of the file.
+PROBE_CACHE_SIZE = 256
+KEYFRAME_SAMPLE_SECONDS = 10
+
+# CPU budget shared by every ffmpeg encode of this process. Each encode gets a fair
+# share of it as -threads, capped at ENCODE_MAX_THREADS.
+ENCODE_CPU_BUDGET = int(os.environ.get("ENCODE_CPU_BUDGET", os.cpu_count() or 1))
+ENCODE_MAX_THREADS = 16
+
+# Minimum seconds between two progress writes to a job row
+PROGRESS_UPDATE_INTERVAL = 2.0
+
+# Finished split/merge/720p/frame outputs are kept in ARTIFACT_CACHE_DIR, keyed by the
+# input content hash and the operation parameters; least recently used entries are
+# evicted once the cache grows past ARTIFACT_CACHE_MAX_BYTES.
+ARTIFACT_CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache")
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 5 * 1024 * 1024 * 1024))
+
+# List endpoints return pages of PAGE_SIZE rows (a client may ask for up to MAX_PAGE_SIZE).
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Completed and failed jobs older than JOB_RETENTION_DAYS are moved to the jobs_archive
+# table, JOB_ARCHIVE_BATCH rows at a time, every JOB_RETENTION_INTERVAL seconds.
+JOB_RETENTION_DAYS = float(os.environ.get("JOB_RETENTION_DAYS", 7))
+JOB_RETENTION_INTERVAL = 3600
+JOB_ARCHIVE_BATCH = 500
+
+# /api/jobs/stream (Server-Sent Events). Each stream is closed after JOB_STREAM_MAX_SECONDS
+# and the browser reconnects, so a stream never holds a sync worker for long.
+JOB_STREAM_MAX_CLIENTS = 100
+JOB_STREAM_QUEUE_SIZE = 200
+JOB_STREAM_KEEPALIVE = 15.0
+JOB_STREAM_MAX_SECONDS = 300
+JOB_STREAM_RETRY_MS = 3000
+
+# Stats are recorded as append-only events, folded every STATS_AGGREGATE_INTERVAL seconds
+# into the all-time totals and hourly/daily rollups. Hourly rollups are kept
+# STATS_HOURLY_RETENTION_DAYS days; daily rollups are kept forever.
+STATS_AGGREGATE_INTERVAL = 30.0
+STATS_AGGREGATE_BATCH = 1000
+STATS_HOURLY_RETENTION_DAYS = 30
+
+# Downloads are served by Flask (byte ranges and ETags included), or handed to the front
+# server: 'x-accel' for nginx X-Accel-Redirect, with internal locations aliased to
+# OUTPUT_DIR and UPLOAD_DIR, or 'x-sendfile' for Apache/lighttpd.
+FILE_SERVING_MODE = os.environ.get("FILE_SERVING_MODE", "flask")
+X_ACCEL_LOCATIONS = {
+    OUTPUT_DIR: os.environ.get("X_ACCEL_OUTPUTS_LOCATION", "/_protected/outputs/"),
+    UPLOAD_DIR: os.environ.get("X_ACCEL_UPLOADS_LOCATION", "/_protected/uploads/"),
+}
+
+# Social downloads and extracted frames are one-off outputs: they are deleted
+# TEMPORARY_OUTPUT_RETENTION seconds after being written rather than on the first
+# GET, so an interrupted or multi-range download can resume.
+TEMPORARY_OUTPUT_PREFIXES = ('tiktok_', 'instagram_', 'facebook_', 'youtube_', 'twitter_', 'snapchat_',
+                             'threads_', 'linkedin_', 'pinterest_', 'vimeo_', 'frame_')
+TEMPORARY_OUTPUT_RETENTION = int(os.environ.get("TEMPORARY_OUTPUT_RETENTION", 6 * 3600))
+TEMPORARY_OUTPUT_SWEEP_INTERVAL = 600
+
+# /metrics is served from memory; queue depth and the stats table counters are
+# refreshed in the background every METRICS_SNAPSHOT_INTERVAL seconds.
+METRICS_SNAPSHOT_INTERVAL = 15.0
+
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -1,6 +1,6 @@
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean, Index, UniqueConstraint, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -20,20 +20,45 @@ class VideoModel(Base):
     size = Column(Integer, nullable=False)
     duration = Column(Float, nullable=False)
     path = Column(String(500), nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256; rows sharing it share path
     codec = Column(String(50), nullable=True)
     resolution = Column(String(20), nullable=True)
     bitrate = Column(Integer, nullable=True)
+    fps = Column(Float, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    audio_codec = Column(String(50), nullable=True)
+    keyframe_interval = Column(Float, nullable=True)
+    probe = Column(Text, nullable=True)  # JSON ffprobe cache entry, reused instead of re-probing
     created_at = Column(DateTime, default=datetime.utcnow)
     is_temporary = Column(Boolean, default=False)
+    
+    __table_args__ = (
+        Index("ix_videos_created_at_id", "created_at", "id"),
+        Index("ix_videos_is_temporary", "is_temporary"),
+    )
+
+
+class StoredFileModel(Base):
+    """One stored upload file and how many videos rows point at it. Deduplicated
+    uploads share a file; refcount is only changed with single UPDATE statements so
+    adding a reference and dropping the last one cannot interleave."""
+    __tablename__ = "stored_files"
+    
+    path = Column(String(500), primary_key=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    refcount = Column(Integer, nullable=False, default=1)
 
 
 class JobModel(Base):
     __tablename__ = "jobs"
     
     id = Column(String(36), primary_key=True)
-    type = Column(String(20), nullable=False)  # 'split' or 'merge'
+    type = Column(String(20), nullable=False)  # 'split', 'merge', 'social' or 'social_batch'
     status = Column(String(20), nullable=False, default='pending')
     progress = Column(Integer, default=0)
+    speed = Column(Float, nullable=True)  # x realtime
+    eta = Column(Float, nullable=True)  # seconds
     video_id = Column(String(36), nullable=True)
     video_ids = Column(Text, nullable=True)  # JSON array for merge
     segment_duration = Column(Integer, nullable=True)
@@ -41,7 +66,53 @@ class JobModel(Base):
     output = Column(String(255), nullable=True)
     error = Column(Text, nullable=True)
     convert_720 = Column(Boolean, default=False)
+    split_mode = Column(String(20), nullable=True)
+    keyframe_tolerance = Column(Float, nullable=True)
+    encoding_profile = Column(String(20), nullable=True)  # as requested, may be 'auto'
+    encoding_profile_used = Column(String(20), nullable=True)
+    segments = Column(Text, nullable=True)  # JSON array of actual segment boundaries
+    resource_usage = Column(Text, nullable=True)  # JSON rusage totals of the job's ffmpeg/ffprobe children
+    url = Column(String(500), nullable=True)  # social download source
+    platform = Column(String(50), nullable=True)
+    lane = Column(String(50), nullable=True)  # concurrency group, see JobExecutor.lane_limits
+    transfer = Column(Text, nullable=True)  # JSON download progress: bytes done/total, bytes per second
+    media = Column(Text, nullable=True)  # JSON result of a social download
+    media_key = Column(String(200), nullable=True)
+    items = Column(Text, nullable=True)  # JSON array of a batch's items: url, jobId or error
+    worker_id = Column(String(100), nullable=True)
+    attempts = Column(Integer, default=0)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_media_key", "media_key"),
+    )
+
+
+class BatchItemModel(Base):
+    """Link from an open social batch to the job of one of its items, so a finished
+    job finds its batches by index. A download coalesced into a running job links
+    that job to every batch waiting on it. Dropped once the batch is done."""
+    __tablename__ = "batch_items"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_id = Column(String(36), nullable=False, index=True)
+    job_id = Column(String(36), nullable=False, index=True)
+
+
+class JobArchiveModel(Base):
+    """Finished jobs moved out of the jobs table by the retention task"""
+    __tablename__ = "jobs_archive"
+    
+    id = Column(String(36), primary_key=True)
+    type = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)
+    data = Column(Text, nullable=False)  # JSON, as returned by GET /api/jobs/<id>
+    created_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
 
 
 class TikTokDownloadModel(Base):
@@ -60,6 +131,31 @@ class TikTokDownloadModel(Base):
     media_type = Column(String(20), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_downloaded = Column(Boolean, default=False)
+    media_key = Column(String(200), nullable=True)  # canonical media id, see utils.media_key
+    converted_720p = Column(Boolean, default=False)
+    hits = Column(Integer, default=0)  # repeat requests served from this download
+    swept_at = Column(DateTime, nullable=True)  # when the retention sweep found the file gone
+    
+    __table_args__ = (
+        Index("ix_tiktok_downloads_created_at_id", "created_at", "id"),
+        Index("ix_tiktok_downloads_media_key", "media_key", "created_at"),
+        Index("ix_tiktok_downloads_swept_at", "swept_at", "created_at"),
+    )
+
+
+class UploadSessionModel(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(36), primary_key=True)
+    filename = Column(String(255), nullable=False)
+    original_name = Column(String(255), nullable=False)
+    path = Column(String(500), nullable=False)
+    size = Column(Integer, nullable=False)  # declared total size
+    received = Column(Integer, default=0)  # bytes written contiguously from the start
+    writing_since = Column(DateTime, nullable=True)  # set while a chunk is being written at 'received'
+    is_temporary = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class StatsModel(Base):
@@ -71,6 +167,60 @@ class StatsModel(Base):
     total_videos_merged = Column(Integer, default=0)
     total_time_saved = Column(Float, default=0)
     total_tiktok_downloads = Column(Integer, default=0)
+    cache_hits = Column(Integer, default=0)
+    cache_misses = Column(Integer, default=0)
+    download_cache_hits = Column(Integer, default=0)
+    download_cache_misses = Column(Integer, default=0)
+
+
+# Stats counters that may be recorded; each names a column of StatsModel
+STATS_COUNTERS = (
+    "total_videos_split",
+    "total_segments_created",
+    "total_videos_merged",
+    "total_time_saved",
+    "total_tiktok_downloads",
+    "cache_hits",
+    "cache_misses",
+    "download_cache_hits",
+    "download_cache_misses",
+)
+
+
+class StatsEventModel(Base):
+    """Append-only stats increments. Writers only insert, so they never wait on
+    each other; the aggregation task folds the rows into StatsModel and the
+    rollups, then deletes them."""
+    __tablename__ = "stats_events"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    counter = Column(String(40), nullable=False)
+    amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StatsRollupModel(Base):
+    __tablename__ = "stats_rollups"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    period = Column(String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = Column(DateTime, nullable=False)
+    counter = Column(String(40), nullable=False)
+    value = Column(Float, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("period", "bucket_start", "counter", name="uq_stats_rollups_bucket"),
+        Index("ix_stats_rollups_period_bucket", "period", "bucket_start"),
+    )
+
+
+def record_stats(db, **counters):
+    """Add stats increments to db; they are saved with the caller's commit"""
+    for counter, amount in counters.items():
+        if counter not in STATS_COUNTERS:
+            raise ValueError(f"Unknown stats counter: {counter}")
+        if amount:
+            db.add(StatsEventModel(counter=counter, amount=amount))
 
 
 def get_db():
@@ -125,6 +275,16 @@ def init_db():
                         except Exception as e:
                             print(f"Error adding column '{column.name}' to '{table_name}': {e}")
 
+                # create_all only creates indexes together with a new table
+                existing_indexes = {i['name'] for i in inspector.get_indexes(table_name)}
+                for index in table.indexes:
+                    if index.name not in existing_indexes:
+                        print(f"Migrating: Creating index '{index.name}' on '{table_name}'")
+                        try:
+                            index.create(bind=engine)
+                        except Exception as e:
+                            print(f"Error creating index '{index.name}': {e}")
+
         db = SessionLocal()
         stats = db.query(StatsModel).first()
         if not stats:
@@ -137,6 +297,15 @@ def init_db():
             )
             db.add(stats)
             db.commit()
+        
+        # Reference counts for videos stored before stored_files existed
+        if not db.query(StoredFileModel).first():
+            files = db.query(VideoModel.path, func.max(VideoModel.content_hash),
+                             func.count(VideoModel.id)).group_by(VideoModel.path).all()
+            if files:
+                db.add_all(StoredFileModel(path=path, content_hash=content_hash, refcount=count)
+                           for path, content_hash, count in files)
+                db.commit()
         db.close()
         
         print("Database initialized successfully!")
@@ -146,6 +315,25 @@ def init_db():
         return False
 
 
+def record_cache_lookup(hit: bool):
+    """Count an artifact cache hit or miss as a stats event"""
+    if SessionLocal is None:
+        return
+    
+    db = SessionLocal()
+    try:
+        if hit:
+            record_stats(db, cache_hits=1)
+        else:
+            record_stats(db, cache_misses=1)
+        db.commit()
+    except Exception as e:
+        print(f"Error recording cache lookup: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 def cleanup_all():
     """Clean up all data from database tables (except stats) and return True if successful."""
     if SessionLocal is None:
@@ -154,8 +342,12 @@ def cleanup_all():
     try:
         db = SessionLocal()
         db.query(VideoModel).delete()
+        db.query(StoredFileModel).delete()
         db.query(JobModel).delete()
+        db.query(BatchItemModel).delete()
+        db.query(JobArchiveModel).delete()
         db.query(TikTokDownloadModel).delete()
+        db.query(UploadSessionModel).delete()
         db.commit()
         db.close()
         return True
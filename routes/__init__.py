@@ -3,5 +3,6 @@ from .jobs import jobs_bp
 from .stats import stats_bp
 from .tiktok import tiktok_bp
 from .cleanup import cleanup_bp
+from .metrics import metrics_bp
 
-__all__ = ['videos_bp', 'jobs_bp', 'stats_bp', 'tiktok_bp', 'cleanup_bp']
+__all__ = ['videos_bp', 'jobs_bp', 'stats_bp', 'tiktok_bp', 'cleanup_bp', 'metrics_bp']
@@ -1,11 +1,90 @@
-from flask import Blueprint, jsonify
+import queue
+import time
+from flask import Blueprint, Response, request, jsonify
 
-from services.video_service import VideoService
+from services.video_service import VideoService, JOB_STATUSES, JOB_NOT_FOUND
+from services.job_events import job_events, RESYNC
+from utils.pagination import page_args
+from utils.sse import sse_event
+from utils.zip_stream import stream_zip
+from utils.file_serving import content_disposition
+from config import (PAGE_SIZE, MAX_PAGE_SIZE, JOB_STREAM_KEEPALIVE, JOB_STREAM_MAX_SECONDS,
+                    JOB_STREAM_RETRY_MS)
 
 jobs_bp = Blueprint('jobs', __name__)
 
 
 @jobs_bp.route('/api/jobs', methods=['GET'])
 def get_jobs():
-    jobs = VideoService.get_all_jobs()
-    return jsonify(jobs)
+    page, error = page_args(request.args, PAGE_SIZE, MAX_PAGE_SIZE)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    status = request.args.get('status') or None
+    if status and status not in JOB_STATUSES:
+        return jsonify({"error": f"status must be one of: {', '.join(JOB_STATUSES)}"}), 400
+    
+    jobs, next_cursor = VideoService.list_jobs(status=status, job_type=request.args.get('type') or None, **page)
+    response = jsonify(jobs)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@jobs_bp.route('/api/jobs/stream', methods=['GET'])
+def stream_jobs():
+    """Server-Sent Events: a 'snapshot' with the first page of jobs, then one 'job'
+    event per change (full job or changed fields only, always with its id)"""
+    subscription = job_events.subscribe()
+    if subscription is None:
+        return jsonify({"error": "Too many job streams open"}), 503
+    
+    def generate():
+        try:
+            yield f"retry: {JOB_STREAM_RETRY_MS}\n\n"
+            yield sse_event("snapshot", VideoService.list_jobs()[0])
+            
+            deadline = time.monotonic() + JOB_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event = subscription.get(timeout=JOB_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                
+                if event is RESYNC:
+                    yield sse_event("snapshot", VideoService.list_jobs()[0])
+                    continue
+                if event.get("reload"):
+                    event = VideoService.get_job(event["id"])
+                    if not event:
+                        continue
+                yield sse_event("job", event)
+        finally:
+            job_events.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = VideoService.get_job(job_id)
+    
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    
+    return jsonify(job)
+
+
+@jobs_bp.route('/api/jobs/<job_id>/archive', methods=['GET'])
+def download_job_archive(job_id):
+    """All segments of a split job in one ZIP, built while it is sent"""
+    archive, error = VideoService.get_job_archive(job_id)
+    
+    if error:
+        return jsonify({"error": error}), 404 if error == JOB_NOT_FOUND else 400
+    
+    download_name, entries = archive
+    return Response(stream_zip(entries), mimetype='application/zip',
+                    headers={'Content-Disposition': content_disposition(download_name)})
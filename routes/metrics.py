@@ -0,0 +1,30 @@
+import time
+from flask import Blueprint, Response, g, request
+
+from services.metrics_service import MetricsService
+from utils.metrics import HTTP_REQUEST_DURATION
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.before_app_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'metrics.get_metrics':
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unmatched',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(MetricsService.render(), mimetype='text/plain; version=0.0.4')
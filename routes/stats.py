@@ -1,11 +1,32 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 
-from services.video_service import VideoService
+from services.stats_service import StatsService, ROLLUP_PERIODS, STATS_FIELDS
+from utils.scheduler import encode_scheduler
+from utils.pagination import parse_since
 
 stats_bp = Blueprint('stats', __name__)
 
 
 @stats_bp.route('/api/stats', methods=['GET'])
 def get_stats():
-    stats = VideoService.get_stats()
+    stats = StatsService.get_stats()
+    stats["encodeScheduler"] = encode_scheduler.stats()
     return jsonify(stats)
+
+
+@stats_bp.route('/api/stats/rollups', methods=['GET'])
+def get_rollups():
+    period = request.args.get('period', 'hour')
+    if period not in ROLLUP_PERIODS:
+        return jsonify({"error": f"period must be one of: {', '.join(ROLLUP_PERIODS)}"}), 400
+    
+    counter = request.args.get('counter') or None
+    if counter and counter not in STATS_FIELDS:
+        return jsonify({"error": f"counter must be one of: {', '.join(STATS_FIELDS)}"}), 400
+    
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError:
+        return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+    
+    return jsonify(StatsService.get_rollups(period, since, counter))
@@ -1,6 +1,15 @@
-from flask import Blueprint, request, jsonify
+import queue
+import time
+from flask import Blueprint, Response, request, jsonify
 
-from services.social_service import SocialVideoService
+from services.social_service import SocialVideoService, BATCH_NOT_FOUND
+from services.job_executor import QUEUE_FULL_ERROR
+from services.job_events import job_events, RESYNC
+from services.encoding_policy import ENCODING_PROFILE_CHOICES
+from utils.pagination import page_args
+from utils.sse import sse_event
+from config import (DEFAULT_ENCODING_PROFILE, PAGE_SIZE, MAX_PAGE_SIZE, PROGRESS_UPDATE_INTERVAL,
+                    JOB_STREAM_KEEPALIVE, JOB_STREAM_MAX_SECONDS, JOB_STREAM_RETRY_MS)
 
 tiktok_bp = Blueprint('tiktok', __name__)
 
@@ -10,22 +19,36 @@ def download_tiktok():
     data = request.get_json()
     url = data.get('url', '').strip()
     convert_720 = data.get('convert720', False)
+    encoding_profile = data.get('encodingProfile') or DEFAULT_ENCODING_PROFILE
     
     if not url:
         return jsonify({"error": "URL is required"}), 400
     
-    result, error = SocialVideoService.download_media(url, convert_720)
+    if encoding_profile not in ENCODING_PROFILE_CHOICES:
+        return jsonify({"error": f"encodingProfile must be one of: {', '.join(ENCODING_PROFILE_CHOICES)}"}), 400
+    
+    job, error = SocialVideoService.download_media(url, convert_720, encoding_profile)
+    
+    if error == QUEUE_FULL_ERROR:
+        return jsonify({"error": error}), 429
     
     if error:
         return jsonify({"error": error}), 400
     
-    return jsonify(result)
+    return jsonify({"jobId": job['id'], **job}), 202
 
 
 @tiktok_bp.route('/api/social/history', methods=['GET'])
 def get_history():
-    history = SocialVideoService.get_all_downloads()
-    return jsonify(history)
+    page, error = page_args(request.args, PAGE_SIZE, MAX_PAGE_SIZE)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    history, next_cursor = SocialVideoService.list_downloads(**page)
+    response = jsonify(history)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @tiktok_bp.route('/api/social/download', methods=['POST'])
@@ -33,13 +56,119 @@ def download_social():
     data = request.get_json()
     url = data.get('url', '').strip()
     convert_720 = data.get('convert720', False)
+    encoding_profile = data.get('encodingProfile') or DEFAULT_ENCODING_PROFILE
     
     if not url:
         return jsonify({"error": "URL is required"}), 400
     
-    result, error = SocialVideoService.download_media(url, convert_720)
+    if encoding_profile not in ENCODING_PROFILE_CHOICES:
+        return jsonify({"error": f"encodingProfile must be one of: {', '.join(ENCODING_PROFILE_CHOICES)}"}), 400
+    
+    job, error = SocialVideoService.download_media(url, convert_720, encoding_profile)
+    
+    if error == QUEUE_FULL_ERROR:
+        return jsonify({"error": error}), 429
+    
+    if error:
+        return jsonify({"error": error}), 400
+    
+    return jsonify({"jobId": job['id'], **job}), 202
+
+
+@tiktok_bp.route('/api/social/batches', methods=['POST'])
+def create_batch():
+    """Body: {"urls": [...]} (or one URL per line) or {"playlist": url}, plus convert720
+    and encodingProfile applied to every item"""
+    data = request.get_json() or {}
+    urls = data.get('urls') or []
+    playlist = (data.get('playlist') or '').strip() or None
+    convert_720 = data.get('convert720', False)
+    encoding_profile = data.get('encodingProfile') or DEFAULT_ENCODING_PROFILE
+    
+    if isinstance(urls, str):
+        urls = urls.split()
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        return jsonify({"error": "urls must be a list of URLs"}), 400
+    
+    if encoding_profile not in ENCODING_PROFILE_CHOICES:
+        return jsonify({"error": f"encodingProfile must be one of: {', '.join(ENCODING_PROFILE_CHOICES)}"}), 400
+    
+    batch, error = SocialVideoService.create_batch(urls, playlist, convert_720, encoding_profile)
+    
+    if error == QUEUE_FULL_ERROR:
+        return jsonify({"error": error}), 429
     
     if error:
         return jsonify({"error": error}), 400
     
-    return jsonify(result)
+    return jsonify({"batchId": batch['id'], **batch}), 202
+
+
+@tiktok_bp.route('/api/social/batches/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    batch, error = SocialVideoService.get_batch(batch_id)
+    
+    if error:
+        return jsonify({"error": error}), 404 if error == BATCH_NOT_FOUND else 400
+    
+    return jsonify(batch)
+
+
+@tiktok_bp.route('/api/social/batches/<batch_id>/stream', methods=['GET'])
+def stream_batch(batch_id):
+    """Server-Sent Events: the 'batch' with all its items, then an 'item' event for each
+    item as it finishes and a 'progress' event with the aggregate counts, until 'done'"""
+    batch, error = SocialVideoService.get_batch(batch_id)
+    if error:
+        return jsonify({"error": error}), 404 if error == BATCH_NOT_FOUND else 400
+    
+    subscription = job_events.subscribe()
+    if subscription is None:
+        return jsonify({"error": "Too many job streams open"}), 503
+    
+    def aggregate(summary):
+        return {key: value for key, value in summary.items() if key != 'items'}
+    
+    def generate():
+        try:
+            yield f"retry: {JOB_STREAM_RETRY_MS}\n\n"
+            # Batch re-read now that the subscription cannot miss an event
+            summary = SocialVideoService.get_batch(batch_id)[0] or batch
+            yield sse_event("batch", summary)
+            reported = {item['jobId'] for item in summary['items'] if item['status'] in ('completed', 'error')}
+            last_refresh = 0.0
+            
+            deadline = time.monotonic() + JOB_STREAM_MAX_SECONDS
+            while summary['status'] not in ('completed', 'error') and time.monotonic() < deadline:
+                try:
+                    event = subscription.get(timeout=JOB_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                
+                if event is not RESYNC:
+                    job_ids = {batch_id} | {item['jobId'] for item in summary['items']}
+                    if event.get("id") not in job_ids:
+                        continue
+                    # Progress of a running item: refreshed at most every PROGRESS_UPDATE_INTERVAL
+                    finished = event.get("status") in ('completed', 'error') or event.get("id") == batch_id
+                    if not finished and time.monotonic() - last_refresh < PROGRESS_UPDATE_INTERVAL:
+                        continue
+                
+                last_refresh = time.monotonic()
+                summary = SocialVideoService.get_batch(batch_id)[0]
+                if summary is None:
+                    return
+                for item in summary['items']:
+                    if item['status'] in ('completed', 'error') and item['jobId'] not in reported:
+                        reported.add(item['jobId'])
+                        yield sse_event("item", item)
+                yield sse_event("progress", aggregate(summary))
+            
+            if summary['status'] in ('completed', 'error'):
+                yield sse_event("done", aggregate(summary))
+        finally:
+            job_events.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
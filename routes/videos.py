@@ -1,16 +1,29 @@
-from flask import Blueprint, request, jsonify, send_file, after_this_request
+from flask import Blueprint, request, jsonify
 import os
 
 from services.video_service import VideoService
-from config import OUTPUT_DIR
+from services.job_executor import QUEUE_FULL_ERROR
+from services.upload_service import UploadService, UPLOAD_NOT_FOUND, OFFSET_MISMATCH, UPLOAD_TOO_LARGE
+from services.encoding_policy import ENCODING_PROFILE_CHOICES
+from utils.pagination import page_args
+from utils.file_serving import send_download
+from config import (OUTPUT_DIR, SPLIT_MODES, DEFAULT_SPLIT_MODE, DEFAULT_ENCODING_PROFILE,
+                    PAGE_SIZE, MAX_PAGE_SIZE)
 
 videos_bp = Blueprint('videos', __name__)
 
 
 @videos_bp.route('/api/videos', methods=['GET'])
 def get_videos():
-    videos = VideoService.get_all_videos()
-    return jsonify(videos)
+    page, error = page_args(request.args, PAGE_SIZE, MAX_PAGE_SIZE)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    videos, next_cursor = VideoService.list_videos(**page)
+    response = jsonify(videos)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @videos_bp.route('/api/videos/upload', methods=['POST'])
@@ -31,6 +44,79 @@ def upload_video():
     return jsonify(video)
 
 
+UPLOAD_ERROR_STATUS = {
+    UPLOAD_NOT_FOUND: 404,
+    OFFSET_MISMATCH: 409,
+    UPLOAD_TOO_LARGE: 413,
+}
+
+
+def _upload_error(error, session=None):
+    body = {"error": error}
+    if session:
+        body.update(session)
+    return jsonify(body), UPLOAD_ERROR_STATUS.get(error, 400)
+
+
+@videos_bp.route('/api/videos/uploads', methods=['POST'])
+def create_upload():
+    data = request.get_json() or {}
+    filename = data.get('filename')
+    size = data.get('size')
+
+    if not filename:
+        return jsonify({"error": "No filename provided"}), 400
+
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        return jsonify({"error": "size must be an integer"}), 400
+    if size <= 0:
+        return jsonify({"error": "size must be positive"}), 400
+
+    session, error = UploadService.create_session(filename, size, bool(data.get('isTemporary', False)))
+    if error or not session:
+        return _upload_error(error or "Upload failed")
+
+    return jsonify(session), 201
+
+
+@videos_bp.route('/api/videos/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    session, error = UploadService.get_session(upload_id)
+    if error:
+        return _upload_error(error)
+    return jsonify(session)
+
+
+@videos_bp.route('/api/videos/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({"error": "offset must be an integer"}), 400
+
+    session, error = UploadService.write_chunk(upload_id, offset, request.stream)
+    if error:
+        return _upload_error(error, session)
+    return jsonify(session)
+
+
+@videos_bp.route('/api/videos/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    video, error = UploadService.complete(upload_id)
+    if error or not video:
+        return _upload_error(error or "Upload failed")
+    return jsonify(video)
+
+
+@videos_bp.route('/api/videos/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    if not UploadService.abort(upload_id):
+        return jsonify({"error": UPLOAD_NOT_FOUND}), 404
+    return jsonify({"success": True})
+
+
 @videos_bp.route('/api/videos/<video_id>', methods=['DELETE'])
 def delete_video(video_id):
     success = VideoService.delete_video(video_id)
@@ -48,14 +134,10 @@ def download_video(video_id):
     if not video:
         return jsonify({"error": "Video not found"}), 404
     
-    if not os.path.exists(video.path):
+    response = send_download(os.path.dirname(video.path), os.path.basename(video.path), video.original_name)
+    if response is None:
         return jsonify({"error": "File not found"}), 404
-    
-    return send_file(
-        video.path,
-        as_attachment=True,
-        download_name=video.original_name
-    )
+    return response
 
 
 @videos_bp.route('/api/videos/split', methods=['POST'])
@@ -64,6 +146,9 @@ def split_video():
     video_id = data.get('videoId')
     segment_duration = data.get('segmentDuration')
     convert_720 = data.get('convert720', False)
+    split_mode = data.get('splitMode') or DEFAULT_SPLIT_MODE
+    keyframe_tolerance = data.get('keyframeTolerance')
+    encoding_profile = data.get('encodingProfile') or DEFAULT_ENCODING_PROFILE
     
     if not video_id:
         return jsonify({"error": "videoId is required"}), 400
@@ -71,7 +156,20 @@ def split_video():
     if not segment_duration or not isinstance(segment_duration, int):
         return jsonify({"error": "segmentDuration must be a positive integer"}), 400
     
-    job, error = VideoService.split_video(video_id, segment_duration, convert_720)
+    if split_mode not in SPLIT_MODES:
+        return jsonify({"error": f"splitMode must be one of: {', '.join(SPLIT_MODES)}"}), 400
+    
+    if keyframe_tolerance is not None and (not isinstance(keyframe_tolerance, (int, float)) or keyframe_tolerance < 0):
+        return jsonify({"error": "keyframeTolerance must be a non-negative number"}), 400
+    
+    if encoding_profile not in ENCODING_PROFILE_CHOICES:
+        return jsonify({"error": f"encodingProfile must be one of: {', '.join(ENCODING_PROFILE_CHOICES)}"}), 400
+    
+    job, error = VideoService.split_video(video_id, segment_duration, convert_720, split_mode,
+                                          keyframe_tolerance, encoding_profile)
+    
+    if error == QUEUE_FULL_ERROR:
+        return jsonify({"error": error}), 429
     
     if error or not job:
         return jsonify({"error": error or "Split failed"}), 400
@@ -84,11 +182,18 @@ def merge_videos():
     data = request.get_json()
     video_ids = data.get('videoIds')
     convert_720 = data.get('convert720', False)
+    encoding_profile = data.get('encodingProfile') or DEFAULT_ENCODING_PROFILE
     
     if not video_ids or not isinstance(video_ids, list):
         return jsonify({"error": "videoIds must be a list"}), 400
     
-    job, error = VideoService.merge_videos(video_ids, convert_720)
+    if encoding_profile not in ENCODING_PROFILE_CHOICES:
+        return jsonify({"error": f"encodingProfile must be one of: {', '.join(ENCODING_PROFILE_CHOICES)}"}), 400
+    
+    job, error = VideoService.merge_videos(video_ids, convert_720, encoding_profile)
+    
+    if error == QUEUE_FULL_ERROR:
+        return jsonify({"error": error}), 429
     
     if error or not job:
         return jsonify({"error": error or "Merge failed"}), 400
@@ -117,20 +222,7 @@ def extract_frames():
 @videos_bp.route('/api/download/<path:filename>', methods=['GET'])
 def download_output(filename):
     from urllib.parse import unquote
-    decoded_filename = unquote(filename)
-    file_path = os.path.join(OUTPUT_DIR, decoded_filename)
-    
-    if not os.path.exists(file_path):
+    response = send_download(OUTPUT_DIR, unquote(filename))
+    if response is None:
         return jsonify({"error": "File not found"}), 404
-    
-    @after_this_request
-    def cleanup(response):
-        if any(prefix in decoded_filename for prefix in ['tiktok_', 'instagram_', 'facebook_', 'youtube_', 'twitter_', 'snapchat_', 'threads_', 'linkedin_', 'pinterest_', 'vimeo_', 'frame_']):
-            VideoService.cleanup_file_after_download(file_path)
-        return response
-    
-    return send_file(
-        file_path,
-        as_attachment=True,
-        download_name=decoded_filename
-    )
+    return response
@@ -1,7 +1,7 @@
 import os
-import subprocess
 from typing import Tuple, Optional
 from config import ALLOWED_EXTENSIONS, MAX_FILE_SIZE
+from utils.ffmpeg import FFmpegHelper
 
 
 class FileValidator:
@@ -45,20 +45,12 @@ class FileValidator:
             return False, "File not found"
         
         try:
-            result = subprocess.run([
-                "ffprobe",
-                "-v", "quiet",
-                "-print_format", "json",
-                "-show_streams",
-                file_path
-            ], capture_output=True, text=True, timeout=30)
-            
-            if result.returncode != 0:
+            # Shares the cached probe with FFmpegHelper, so validating costs no extra ffprobe
+            info = FFmpegHelper.get_video_info(file_path)
+            if not info:
                 return False, "Invalid video file"
             
-            import json
-            data = json.loads(result.stdout)
-            streams = data.get("streams", [])
+            streams = info.get("streams", [])
             
             has_video = any(s.get("codec_type") == "video" for s in streams)
             if not has_video:
@@ -66,8 +58,6 @@ class FileValidator:
             
             return True, None
             
-        except subprocess.TimeoutExpired:
-            return False, "Validation timeout"
         except Exception as e:
             return False, f"Validation error: {str(e)}"
     
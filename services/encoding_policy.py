@@ -0,0 +1,41 @@
+from typing import Optional
+
+from database import SessionLocal
+from services.job_executor import job_executor, download_executor
+from config import (ENCODING_PROFILES, BASE_ENCODING_PROFILE, DEFAULT_ENCODING_PROFILE,
+                    AUTO_PROFILE_BUSY_QUEUE)
+
+
+ENCODING_PROFILE_CHOICES = ('auto',) + tuple(ENCODING_PROFILES)
+
+
+class EncodingPolicy:
+    """Turns a requested encoding profile into the one a job actually uses"""
+
+    @staticmethod
+    def resolve(requested: Optional[str] = None) -> str:
+        requested = requested or DEFAULT_ENCODING_PROFILE
+        if requested in ENCODING_PROFILES:
+            return requested
+        if requested != 'auto':
+            return BASE_ENCODING_PROFILE
+        return EncodingPolicy.auto()
+
+    @staticmethod
+    def auto() -> str:
+        """The baseline settings, traded for speed while jobs are backing up. Social
+        downloads waiting for a 720p encode count as queued work too. Never 'quality':
+        see the note on ENCODING_PROFILES."""
+        queued = 0
+        if SessionLocal is not None:
+            db = SessionLocal()
+            try:
+                queued = job_executor.queue_depth(db) + download_executor.queue_depth(db)
+            except Exception as e:
+                print(f"Encoding policy queue check error: {e}")
+            finally:
+                db.close()
+
+        if queued >= AUTO_PROFILE_BUSY_QUEUE:
+            return 'fast'
+        return BASE_ENCODING_PROFILE
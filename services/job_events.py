@@ -0,0 +1,145 @@
+import os
+import json
+import queue
+import select
+import socket
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from database import engine
+from config import JOB_STREAM_MAX_CLIENTS, JOB_STREAM_QUEUE_SIZE
+
+
+# Put in a subscriber queue that overflowed: the stream should resend a full snapshot
+RESYNC = object()
+
+NOTIFY_CHANNEL = "clipflow_jobs"
+NOTIFY_MAX_PAYLOAD = 7900  # PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+
+
+class JobEventBus:
+    """Fans job state changes out to the open /api/jobs/stream connections.
+
+    Events are dicts with at least the job id (a full job, or only the fields
+    that changed, e.g. progress). On PostgreSQL every event is also sent with
+    NOTIFY, and a LISTEN thread delivers the events of the other server
+    processes, so a stream sees every job whatever process runs it. Events too
+    large for NOTIFY are sent as {"id", "reload": True} and reloaded by the
+    receiving stream."""
+
+    def __init__(self, max_clients: int = JOB_STREAM_MAX_CLIENTS, queue_size: int = JOB_STREAM_QUEUE_SIZE):
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._listener_started = False
+
+    @staticmethod
+    def _uses_notify() -> bool:
+        return engine is not None and engine.dialect.name == 'postgresql'
+
+    def subscribe(self) -> Optional[queue.Queue]:
+        """Queue receiving every event from now on, or None when too many streams are open"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscription = queue.Queue(self.queue_size)
+            self._subscribers.append(subscription)
+
+            if not self._listener_started and self._uses_notify():
+                self._listener_started = True
+                thread = threading.Thread(target=self._listen, name="job-events-listener")
+                thread.daemon = True
+                thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: queue.Queue):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: dict):
+        """Deliver event locally and to the other server processes; never raises"""
+        try:
+            self._deliver(event)
+            if self._uses_notify():
+                self._notify(event)
+        except Exception as e:
+            print(f"Job event publish error: {e}")
+
+    def _deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # A stalled client: drop its backlog, it gets a fresh snapshot instead
+                try:
+                    while True:
+                        subscription.get_nowait()
+                except queue.Empty:
+                    pass
+                subscription.put_nowait(RESYNC)
+
+    def _notify(self, event: dict):
+        payload = json.dumps({"origin": self.origin, "event": event})
+        if len(payload.encode()) > NOTIFY_MAX_PAYLOAD:
+            payload = json.dumps({"origin": self.origin, "event": {"id": event["id"], "reload": True}})
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {"channel": NOTIFY_CHANNEL, "payload": payload})
+            conn.commit()
+
+    def _receive(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") == self.origin or "event" not in message:
+            return
+        self._deliver(message["event"])
+
+    def _listen(self):
+        reconnecting = False
+        while True:
+            conn = None
+            try:
+                conn = engine.raw_connection()
+                conn.detach()
+                dbapi = conn.dbapi_connection
+                dbapi.autocommit = True
+                dbapi.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+                if reconnecting:
+                    # Notifications sent while disconnected are lost
+                    self._deliver(RESYNC)
+                reconnecting = True
+
+                while True:
+                    if select.select([dbapi], [], [], 5.0) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        self._receive(dbapi.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Job events listener error: {e}")
+                time.sleep(5)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+job_events = JobEventBus()
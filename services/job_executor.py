@@ -0,0 +1,287 @@
+import os
+import json
+import socket
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from database import SessionLocal, JobModel
+from utils.metrics import JOB_DURATION
+from utils.resource_usage import track_resources
+from services.job_events import job_events
+from config import (JOB_WORKERS, JOB_QUEUE_LIMIT, JOB_POLL_INTERVAL,
+                    JOB_HEARTBEAT_INTERVAL, JOB_HEARTBEAT_TIMEOUT, JOB_MAX_ATTEMPTS,
+                    SOCIAL_DOWNLOAD_WORKERS, SOCIAL_DOWNLOAD_QUEUE_LIMIT, SOCIAL_PLATFORM_LIMITS)
+
+
+QUEUE_FULL_ERROR = "Job queue is full, try again later"
+
+
+class JobExecutor:
+    """Bounded worker pool fed by the jobs table.
+
+    Pending rows are the queue: workers claim them with a conditional UPDATE so
+    several server processes can share one database. Running jobs are kept alive
+    with a heartbeat; 'processing' rows whose heartbeat went stale (server restart,
+    crash) are put back in the queue.
+
+    Jobs may carry a lane (e.g. the platform of a social download); lane_limits
+    caps how many jobs of a lane are 'processing' at once, counted in the database
+    so the cap holds across server processes. Two processes claiming at the same
+    instant can briefly exceed it by one."""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, queue_limit: int = JOB_QUEUE_LIMIT,
+                 poll_interval: float = JOB_POLL_INTERVAL, name: str = "job",
+                 lane_limits: Optional[Dict[str, int]] = None):
+        self.max_workers = max(1, max_workers)
+        self.queue_limit = queue_limit
+        self.poll_interval = poll_interval
+        self.name = name
+        self.lane_limits = dict(lane_limits or {})
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._handlers: Dict[str, Callable[[str], None]] = {}
+        self._periodic: List[dict] = []
+        self._running: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+
+    def register(self, job_type: str, handler: Callable[[str], None]):
+        """Route jobs of job_type to handler(job_id)"""
+        self._handlers[job_type] = handler
+
+    def add_periodic_task(self, name: str, interval: float, func: Callable[[], None]):
+        """Run func every interval seconds on the maintenance thread"""
+        self._periodic.append({"name": name, "interval": interval, "func": func, "last_run": 0.0})
+
+    def start(self):
+        if self._started or SessionLocal is None:
+            return
+        self._started = True
+
+        self.recover_orphans()
+
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"{self.name}-worker-{i + 1}")
+            thread.daemon = True
+            thread.start()
+
+        thread = threading.Thread(target=self._heartbeat_loop, name=f"{self.name}-heartbeat")
+        thread.daemon = True
+        thread.start()
+
+        thread = threading.Thread(target=self._maintenance_loop, name=f"{self.name}-maintenance")
+        thread.daemon = True
+        thread.start()
+
+    def submit(self, job_id: str):
+        """Wake a worker for a job that was just committed as 'pending'"""
+        self._wakeup.set()
+
+    def queue_depth(self, db) -> int:
+        return db.query(JobModel).filter(
+            JobModel.status == 'pending',
+            JobModel.type.in_(list(self._handlers))
+        ).count()
+
+    def admit(self, db) -> bool:
+        """Admission control: refuse new jobs once the queue is full"""
+        if self.queue_limit <= 0:
+            return True
+        return self.queue_depth(db) < self.queue_limit
+
+    def running_jobs(self) -> List[str]:
+        with self._lock:
+            return list(self._running)
+
+    def recover_orphans(self) -> int:
+        """Requeue 'processing' jobs whose worker stopped sending heartbeats"""
+        if SessionLocal is None:
+            return 0
+
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_HEARTBEAT_TIMEOUT)
+        db = SessionLocal()
+        try:
+            orphans = db.query(JobModel).filter(
+                JobModel.status == 'processing',
+                JobModel.type.in_(list(self._handlers)),
+                # A batch that has queued its items waits on their jobs, not on a worker
+                JobModel.items == None,
+                (JobModel.heartbeat_at == None) | (JobModel.heartbeat_at < cutoff)
+            ).all()
+
+            with self._lock:
+                local = set(self._running)
+
+            recovered = 0
+            events = []
+            for job in orphans:
+                if job.id in local:
+                    continue
+                if (job.attempts or 0) >= JOB_MAX_ATTEMPTS:
+                    job.status = 'error'
+                    job.error = 'Job was interrupted too many times'
+                else:
+                    job.status = 'pending'
+                    job.progress = 0
+                    job.worker_id = None
+                    recovered += 1
+                events.append({"id": job.id, "status": job.status, "progress": job.progress, "error": job.error})
+            db.commit()
+            for event in events:
+                job_events.publish(event)
+
+            if recovered:
+                print(f"Recovered {recovered} orphaned job(s)")
+                self._wakeup.set()
+            return recovered
+        except Exception as e:
+            print(f"Job recovery error: {e}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+    def lane_limit(self, lane: Optional[str]) -> Optional[int]:
+        if not lane or not self.lane_limits:
+            return None
+        return self.lane_limits.get(lane, self.lane_limits.get('default'))
+
+    def _lane_full(self, db, lane: Optional[str]) -> bool:
+        limit = self.lane_limit(lane)
+        if limit is None:
+            return False
+        running = db.query(JobModel).filter(
+            JobModel.status == 'processing',
+            JobModel.lane == lane
+        ).count()
+        return running >= limit
+
+    def _claim_next(self) -> Optional[Tuple[str, str]]:
+        db = SessionLocal()
+        try:
+            # Look further down the queue when lanes may hold back its head
+            depth = self.max_workers * (10 if self.lane_limits else 2)
+            candidates = db.query(JobModel.id, JobModel.type, JobModel.lane).filter(
+                JobModel.status == 'pending',
+                JobModel.type.in_(list(self._handlers))
+            ).order_by(JobModel.created_at.asc()).limit(depth).all()
+
+            full_lanes = set()
+            for job_id, job_type, lane in candidates:
+                if lane in full_lanes:
+                    continue
+                if self._lane_full(db, lane):
+                    full_lanes.add(lane)
+                    continue
+                now = datetime.utcnow()
+                claimed = db.query(JobModel).filter(
+                    JobModel.id == job_id,
+                    JobModel.status == 'pending'
+                ).update({
+                    JobModel.status: 'processing',
+                    JobModel.worker_id: self.worker_id,
+                    JobModel.started_at: now,
+                    JobModel.heartbeat_at: now,
+                    JobModel.attempts: func.coalesce(JobModel.attempts, 0) + 1,
+                }, synchronize_session=False)
+                db.commit()
+
+                if claimed == 1:
+                    return job_id, job_type
+            return None
+        except Exception as e:
+            print(f"Job claim error: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def _worker_loop(self):
+        while True:
+            claimed = self._claim_next()
+            if not claimed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            job_id, job_type = claimed
+            with self._lock:
+                self._running[job_id] = job_type
+            try:
+                with JOB_DURATION.time(type=job_type), track_resources() as usage:
+                    self._handlers[job_type](job_id)
+                self._save_resource_usage(job_id, usage.to_dict())
+            except Exception as e:
+                print(f"Job {job_id} handler error: {e}")
+            finally:
+                with self._lock:
+                    self._running.pop(job_id, None)
+                if self.lane_limits:
+                    # A lane slot was freed: let idle workers look at the queue again
+                    self._wakeup.set()
+
+    def _save_resource_usage(self, job_id: str, usage: dict):
+        db = SessionLocal()
+        try:
+            db.query(JobModel).filter(JobModel.id == job_id).update(
+                {JobModel.resource_usage: json.dumps(usage)}, synchronize_session=False)
+            db.commit()
+            job_events.publish({"id": job_id, "resourceUsage": usage})
+        except Exception as e:
+            print(f"Job {job_id} resource usage error: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _heartbeat(self):
+        job_ids = self.running_jobs()
+        if not job_ids:
+            return
+
+        db = SessionLocal()
+        try:
+            db.query(JobModel).filter(
+                JobModel.id.in_(job_ids),
+                JobModel.status == 'processing'
+            ).update({JobModel.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            print(f"Job heartbeat error: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self):
+        # Own thread so a slow periodic task cannot let heartbeats go stale and get
+        # live jobs requeued behind their worker's back
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            self._heartbeat()
+
+    def _maintenance_loop(self):
+        last_recovery = time.monotonic()
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+
+            now = time.monotonic()
+            if now - last_recovery >= JOB_HEARTBEAT_TIMEOUT:
+                last_recovery = now
+                self.recover_orphans()
+
+            for task in self._periodic:
+                if now - task["last_run"] < task["interval"]:
+                    continue
+                task["last_run"] = now
+                try:
+                    task["func"]()
+                except Exception as e:
+                    print(f"Periodic task {task['name']} error: {e}")
+
+job_executor = JobExecutor()
+download_executor = JobExecutor(SOCIAL_DOWNLOAD_WORKERS, SOCIAL_DOWNLOAD_QUEUE_LIMIT, name="download",
+                                lane_limits=SOCIAL_PLATFORM_LIMITS)
@@ -0,0 +1,49 @@
+from database import SessionLocal
+from services.job_executor import job_executor, download_executor
+from services.stats_service import StatsService
+from utils.metrics import (registry, JOB_QUEUE_DEPTH, JOBS_RUNNING, CACHE_LOOKUPS,
+                           ENCODE_SLOTS, ENCODE_WAIT, STATS_TOTALS)
+from utils.probe_cache import probe_cache
+from utils.artifact_cache import artifact_cache
+from utils.scheduler import encode_scheduler
+from config import METRICS_SNAPSHOT_INTERVAL
+
+
+class MetricsService:
+    """Feeds the metrics registry. Database values are read by a periodic task
+    on the maintenance thread, so a scrape of /metrics never touches the DB."""
+
+    @staticmethod
+    def refresh_snapshot():
+        if SessionLocal is None:
+            return
+        db = SessionLocal()
+        try:
+            JOB_QUEUE_DEPTH.set(job_executor.queue_depth(db) + download_executor.queue_depth(db))
+        finally:
+            db.close()
+        for counter, value in StatsService.get_totals().items():
+            STATS_TOTALS.set_total(value, counter=counter)
+
+    @staticmethod
+    def collect():
+        """Copy the in-memory state of the caches and the scheduler, on every scrape"""
+        JOBS_RUNNING.set(len(job_executor.running_jobs()) + len(download_executor.running_jobs()))
+
+        for name, cache in (("probe", probe_cache), ("artifact", artifact_cache)):
+            CACHE_LOOKUPS.set_total(cache.hits, cache=name, result="hit")
+            CACHE_LOOKUPS.set_total(cache.misses, cache=name, result="miss")
+
+        scheduler = encode_scheduler.stats()
+        ENCODE_SLOTS.set(scheduler["budget"], state="budget")
+        ENCODE_SLOTS.set(scheduler["inUse"], state="in_use")
+        ENCODE_WAIT.set(scheduler["averageWaitSeconds"], stat="average")
+        ENCODE_WAIT.set(scheduler["maxWaitSeconds"], stat="max")
+
+    @staticmethod
+    def render() -> str:
+        return registry.render()
+
+
+registry.add_collector(MetricsService.collect)
+job_executor.add_periodic_task('metrics_snapshot', METRICS_SNAPSHOT_INTERVAL, MetricsService.refresh_snapshot)
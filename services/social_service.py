@@ -1,20 +1,52 @@
 import os
 import re
+import sys
+import json
 import uuid
+import time
 import subprocess
-from typing import Optional, Tuple, Dict
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple, Dict, List
 
-from database import SessionLocal, TikTokDownloadModel, StatsModel
-from config import OUTPUT_DIR
+from database import (SessionLocal, JobModel, JobArchiveModel, BatchItemModel, TikTokDownloadModel, record_stats,
+                      record_cache_lookup)
+from utils import FileHandler, FFmpegHelper
+from utils.artifact_cache import artifact_cache
+from utils.scheduler import encode_scheduler, stream_encode_scheduler
+from utils.metrics import job_stage, count_bytes, CACHE_LOOKUPS
+from utils.media_key import canonical_media_key
+from utils.pagination import paginate
+from services.encoding_policy import EncodingPolicy
+from services.job_executor import download_executor, QUEUE_FULL_ERROR
+from services.job_events import job_events
+from services.video_service import VideoService
+from config import (BASE_DIR, OUTPUT_DIR, BASE_ENCODING_PROFILE, DEFAULT_ENCODING_PROFILE, PAGE_SIZE,
+                    PROGRESS_UPDATE_INTERVAL, SOCIAL_DOWNLOAD_TIMEOUT, SOCIAL_CACHE_TTL,
+                    SOCIAL_BATCH_MAX_ITEMS, SOCIAL_BATCH_FEED_INTERVAL, SOCIAL_STREAM_TRANSCODE, SOCIAL_STREAM_RETRIES,
+                    TEMPORARY_OUTPUT_RETENTION)
 
 try:
     import yt_dlp
 except ImportError:
     yt_dlp = None
 
+YTDLP_CHILD = os.path.join(BASE_DIR, "utils", "ytdlp_child.py")
+
+UNSUPPORTED_URL_ERROR = "URL not supported. Supported: TikTok, Instagram, Facebook, YouTube, Twitter/X, Snapchat, Threads, LinkedIn, Pinterest, Vimeo"
+BATCH_NOT_FOUND = "Batch not found"
+
+# Short side of the videos convert_to_720p produces
+TARGET_SHORT_SIDE = 720
+
 
 class SocialMediaService:
     
+    _flight_lock = threading.Lock()
+    
     PLATFORMS = {
         'tiktok': {
             'patterns': ['tiktok.com/', 'vm.tiktok.com/', 'vt.tiktok.com/'],
@@ -69,7 +101,17 @@ class SocialMediaService:
     }
     
     @staticmethod
-    def get_platform_options(platform: str) -> dict:
+    def get_platform_options(platform: str, max_side: Optional[int] = None) -> dict:
+        """yt-dlp options for platform. With max_side, formats are ranked so the best
+        stream whose short side is at most max_side comes first (H.264/AAC in MP4
+        preferred); a larger stream is only picked when the platform has nothing smaller."""
+        options = SocialMediaService._base_platform_options(platform)
+        if max_side:
+            options['format_sort'] = [f'res:{max_side}', 'vcodec:h264', 'acodec:aac', 'ext:mp4:m4a']
+        return options
+    
+    @staticmethod
+    def _base_platform_options(platform: str) -> dict:
         base_opts = {
             'quiet': True,
             'no_warnings': True,
@@ -168,175 +210,800 @@ class SocialMediaService:
         return sanitized if sanitized else 'media'
     
     @staticmethod
-    def convert_to_720p(input_path: str, output_path: str) -> bool:
+    def _unique_output(stem: str, ext: str) -> Tuple[str, str]:
+        """(filename, path) in OUTPUT_DIR for stem + ext, numbered if already taken"""
+        filename = f"{stem}{ext}"
+        path = os.path.join(OUTPUT_DIR, filename)
+        counter = 1
+        while os.path.exists(path):
+            filename = f"{stem}_{counter}{ext}"
+            path = os.path.join(OUTPUT_DIR, filename)
+            counter += 1
+        return filename, path
+    
+    @staticmethod
+    def meets_target(path: Optional[str], info: Optional[Dict] = None) -> bool:
+        """Whether a downloaded video already is what convert_to_720p would produce:
+        H.264 in MP4, AAC or no audio, short side at most TARGET_SHORT_SIDE.
+        Uses the probe of the file, or what yt-dlp reported when it cannot be probed
+        (or nothing was downloaded yet: path None)."""
+        info = info or {}
+        ext = os.path.splitext(path)[1].lower() if path else f".{info.get('ext')}"
+        if ext != '.mp4':
+            return False
+        summary = FFmpegHelper.get_media_summary(path) if path else {}
+        if summary.get("width") and summary.get("height"):
+            width, height = summary["width"], summary["height"]
+            vcodec, acodec = summary.get("codec"), summary.get("audio_codec")
+        else:
+            width, height = info.get("width"), info.get("height")
+            vcodec, acodec = info.get("vcodec"), info.get("acodec")
+            # yt-dlp reports codec strings ('avc1.64001F', 'mp4a.40.2', 'none')
+            vcodec = 'h264' if vcodec and vcodec.startswith(('avc1', 'h264')) else vcodec
+            acodec = None if acodec in (None, 'none') else ('aac' if acodec.startswith('mp4a') else acodec)
+        if not width or not height or vcodec != 'h264' or acodec not in (None, 'aac'):
+            return False
+        return min(width, height) <= TARGET_SHORT_SIDE
+    
+    @staticmethod
+    def _720p_args(encoding_profile: str) -> List[str]:
+        """ffmpeg output options of a 720p MP4 conversion"""
+        return [
+            "-vf", "scale='if(lt(iw,ih),720,trunc(720*iw/ih/2)*2)':'if(lt(iw,ih),trunc(720*ih/iw/2)*2,720)'",
+            "-c:v", "libx264",
+            *FFmpegHelper.encoding_args(encoding_profile),
+            "-c:a", "aac",
+            "-b:a", "192k",
+            "-movflags", "+faststart",
+        ]
+    
+    @staticmethod
+    def convert_to_720p(input_path: str, output_path: str,
+                        encoding_profile: str = BASE_ENCODING_PROFILE) -> bool:
         try:
+            cache_key = artifact_cache.make_key([FileHandler.hash_file(input_path)], "720p",
+                                                {"encoding_profile": encoding_profile})
+            cached = artifact_cache.restore(cache_key, [output_path]) is not None
+            record_cache_lookup(cached)
+            if cached:
+                return True
+            
             cmd = [
                 "ffmpeg",
                 "-y",
                 "-i", input_path,
-                "-vf", "scale='if(lt(iw,ih),720,trunc(720*iw/ih/2)*2)':'if(lt(iw,ih),trunc(720*ih/iw/2)*2,720)'",
-                "-c:v", "libx264",
-                "-preset", "medium",
-                "-crf", "23",
-                "-c:a", "aac",
-                "-b:a", "192k",
-                "-movflags", "+faststart",
+                *SocialMediaService._720p_args(encoding_profile),
                 output_path
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-            return result.returncode == 0 and os.path.exists(output_path)
+            with encode_scheduler.slot() as threads:
+                cmd = FFmpegHelper.with_threads(cmd, threads)
+                result = FFmpegHelper._run_process(cmd, 600)
+            if result.returncode != 0 or not os.path.exists(output_path):
+                return False
+            count_bytes("written", "720p", os.path.getsize(output_path))
+            artifact_cache.store(cache_key, [output_path])
+            return True
         except Exception as e:
             print(f"720p conversion error: {e}")
             return False
     
     @staticmethod
-    def download_media(url: str, convert_720: bool = False) -> Tuple[Optional[Dict], Optional[str]]:
+    def download_media(url: str, convert_720: bool = False,
+                       encoding_profile: str = DEFAULT_ENCODING_PROFILE) -> Tuple[Optional[Dict], Optional[str]]:
+        """Queue a 'social' job for url; the download itself runs on the download pool"""
         if yt_dlp is None:
             return None, "yt-dlp not installed"
         
         platform = SocialMediaService.detect_platform(url)
         if not platform:
-            return None, "URL not supported. Supported: TikTok, Instagram, Facebook, YouTube, Twitter/X, Snapchat, Threads, LinkedIn, Pinterest, Vimeo"
+            return None, UNSUPPORTED_URL_ERROR
         
+        db = SocialMediaService.get_db()
         try:
-            media_id = str(uuid.uuid4())[:8]
-            platform_prefix = SocialMediaService.PLATFORMS[platform]['prefix']
-            platform_name = SocialMediaService.PLATFORMS[platform]['name']
+            return SocialMediaService._enqueue(db, url, platform, bool(convert_720), encoding_profile)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _enqueue(db, url: str, platform: str, convert_720: bool, encoding_profile: str,
+                 admit: bool = True) -> Tuple[Optional[Dict], Optional[str]]:
+        """Job answering a download of url: served from the cache, joined to the running
+        download of the same media, or a new pending 'social' job; (job, error)"""
+        media_key = canonical_media_key(url, platform)
+        
+        # Single flight: the lookups and the insert of a new job happen under one lock,
+        # so identical requests in this process never start two downloads
+        with SocialMediaService._flight_lock:
+            cached = SocialMediaService._cached_download(db, media_key, convert_720)
+            if cached:
+                return SocialMediaService._serve_cached(db, cached, url, platform, convert_720), None
             
-            temp_template = os.path.join(OUTPUT_DIR, f"{platform_prefix}_{media_id}_temp.%(ext)s")
+            in_flight = db.query(JobModel).filter(
+                JobModel.type == 'social',
+                JobModel.media_key == media_key,
+                JobModel.convert_720 == convert_720,
+                JobModel.status.in_(['pending', 'processing'])
+            ).order_by(JobModel.created_at.asc()).first()
+            if in_flight:
+                CACHE_LOOKUPS.inc(cache="download", result="coalesced")
+                return {"id": in_flight.id, "type": "social", "status": in_flight.status,
+                        "platform": platform, "coalesced": True}, None
             
-            platform_opts = SocialMediaService.get_platform_options(platform)
-            ydl_opts = {
-                **platform_opts,
-                'outtmpl': temp_template,
-            }
+            if admit and not download_executor.admit(db):
+                return None, QUEUE_FULL_ERROR
+            
+            record_stats(db, download_cache_misses=1)
+            job_id = str(uuid.uuid4())
+            job = JobModel(
+                id=job_id,
+                type='social',
+                status='pending',
+                url=url,
+                platform=platform,
+                lane=platform,
+                media_key=media_key,
+                convert_720=convert_720,
+                encoding_profile=encoding_profile
+            )
+            db.add(job)
+            VideoService._commit_job(db, job)
+        
+        CACHE_LOOKUPS.inc(cache="download", result="miss")
+        download_executor.submit(job_id)
+        
+        return {"id": job_id, "type": "social", "status": "pending", "platform": platform}, None
+    
+    @staticmethod
+    def _cached_download(db, media_key: str, convert_720: bool) -> Optional[TikTokDownloadModel]:
+        """Most recent download of media_key within SOCIAL_CACHE_TTL whose file is still there"""
+        ttl = min(SOCIAL_CACHE_TTL, TEMPORARY_OUTPUT_RETENTION // 2)
+        if ttl <= 0:
+            return None
+        rows = db.query(TikTokDownloadModel).filter(
+            TikTokDownloadModel.media_key == media_key,
+            TikTokDownloadModel.converted_720p == convert_720,
+            TikTokDownloadModel.created_at >= datetime.utcnow() - timedelta(seconds=ttl)
+        ).order_by(TikTokDownloadModel.created_at.desc()).limit(3).all()
+        return next((row for row in rows if os.path.isfile(row.path)), None)
+    
+    @staticmethod
+    def _serve_cached(db, download: TikTokDownloadModel, url: str, platform: str, convert_720: bool) -> Dict:
+        """Answer a repeat request from an earlier download: a job completed on creation"""
+        media = {**SocialMediaService._download_to_dict(download), 'cached': True}
+        download.hits = (download.hits or 0) + 1
+        record_stats(db, total_tiktok_downloads=1, download_cache_hits=1)
+        job = JobModel(
+            id=str(uuid.uuid4()),
+            type='social',
+            status='completed',
+            progress=100,
+            url=url,
+            platform=platform,
+            lane=platform,
+            media_key=download.media_key,
+            convert_720=convert_720,
+            media=json.dumps(media),
+            output=download.filename
+        )
+        db.add(job)
+        VideoService._commit_job(db, job)
+        CACHE_LOOKUPS.inc(cache="download", result="hit")
+        return {"id": job.id, "type": "social", "status": "completed", "platform": platform,
+                "cached": True, "media": media}
+    
+    @staticmethod
+    def _transfer_writer(job_id: str, share: int) -> Callable[[dict], None]:
+        """Progress callback writing throttled yt-dlp progress to the job row;
+        the download accounts for the first `share` percent of the job"""
+        last_write = [0.0]
+        
+        def write(report: dict):
+            now = time.monotonic()
+            if report.get("status") != "finished" and now - last_write[0] < PROGRESS_UPDATE_INTERVAL:
+                return
+            last_write[0] = now
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                
-                if not info:
-                    return None, "Could not extract media info"
-                
-                temp_filename = ydl.prepare_filename(info)
-                
-                if not os.path.exists(temp_filename):
-                    for ext in ['mp4', 'webm', 'mkv', 'jpg', 'jpeg', 'png', 'webp', 'gif']:
-                        possible = os.path.join(OUTPUT_DIR, f"{platform_prefix}_{media_id}_temp.{ext}")
-                        if os.path.exists(possible):
-                            temp_filename = possible
-                            break
-                
-                if not os.path.exists(temp_filename):
-                    return None, "Download failed - file not found"
-                
-                title = info.get('title', f'{platform_name} Media')
-                sanitized_title = SocialMediaService.sanitize_filename(title)
-                ext = os.path.splitext(temp_filename)[1].lower()
-                
-                is_video = ext in ['.mp4', '.webm', '.mkv', '.mov', '.avi']
-                is_image = ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']
-                media_type = 'video' if is_video else ('image' if is_image else 'media')
-                
-                conversion_success = False
-                if convert_720 and is_video:
-                    converted_filename = f"{sanitized_title}_720p.mp4"
-                    converted_path = os.path.join(OUTPUT_DIR, converted_filename)
-                    
-                    counter = 1
-                    while os.path.exists(converted_path):
-                        converted_filename = f"{sanitized_title}_720p_{counter}.mp4"
-                        converted_path = os.path.join(OUTPUT_DIR, converted_filename)
-                        counter += 1
-                    
-                    if SocialMediaService.convert_to_720p(temp_filename, converted_path):
-                        os.remove(temp_filename)
-                        final_filename = converted_filename
-                        final_path = converted_path
-                        conversion_success = True
-                    else:
-                        final_filename = f"{sanitized_title}{ext}"
-                        final_path = os.path.join(OUTPUT_DIR, final_filename)
-                        counter = 1
-                        while os.path.exists(final_path):
-                            final_filename = f"{sanitized_title}_{counter}{ext}"
-                            final_path = os.path.join(OUTPUT_DIR, final_filename)
-                            counter += 1
-                        os.rename(temp_filename, final_path)
-                else:
-                    final_filename = f"{sanitized_title}{ext}"
-                    final_path = os.path.join(OUTPUT_DIR, final_filename)
-                    
-                    counter = 1
-                    while os.path.exists(final_path):
-                        final_filename = f"{sanitized_title}_{counter}{ext}"
-                        final_path = os.path.join(OUTPUT_DIR, final_filename)
-                        counter += 1
-                    
-                    os.rename(temp_filename, final_path)
-                
-                result = {
-                    'id': media_id,
-                    'filename': final_filename,
-                    'title': title,
-                    'uploader': info.get('uploader', info.get('channel', 'Unknown')),
-                    'duration': info.get('duration', 0),
-                    'view_count': info.get('view_count', 0),
-                    'like_count': info.get('like_count', 0),
-                    'platform': platform_name,
-                    'media_type': media_type,
-                    'converted_720p': conversion_success,
-                }
-                
-                db = SocialMediaService.get_db()
+            done = report.get("downloaded") or 0
+            total = report.get("total")
+            transfer = {"downloadedBytes": done, "totalBytes": total, "bytesPerSecond": report.get("speed")}
+            fields = {"transfer": json.dumps(transfer), "eta": report.get("eta")}
+            if total:
+                fields["progress"] = min(int(done * share / total), share)
+            
+            db = SocialMediaService.get_db()
+            try:
+                updated = db.query(JobModel).filter(
+                    JobModel.id == job_id,
+                    JobModel.status == 'processing'
+                ).update({getattr(JobModel, name): value for name, value in fields.items()},
+                         synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+            if updated:
+                job_events.publish({"id": job_id, "status": "processing", **fields, "transfer": transfer})
+        
+        return write
+    
+    @staticmethod
+    def _run_ytdlp(url: str, options: dict, on_progress: Optional[Callable[[dict], None]] = None,
+                   mode: str = "download") -> Tuple[Optional[Dict], Optional[str]]:
+        """Run yt-dlp on url in a child process (see utils/ytdlp_child.py for the modes):
+        (info, error), or (entries, error) for mode 'expand'"""
+        messages = {}
+        
+        def on_line(line: str):
+            try:
+                message = json.loads(line)
+            except ValueError:
+                return
+            if "progress" in message:
+                if on_progress is None:
+                    return
                 try:
-                    download = TikTokDownloadModel(
-                        id=media_id,
-                        url=url,
-                        filename=final_filename,
-                        title=result['title'],
-                        uploader=result['uploader'],
-                        duration=result['duration'],
-                        view_count=result['view_count'],
-                        like_count=result['like_count'],
-                        path=final_path,
-                        platform=result['platform'],
-                        media_type=result['media_type'],
-                        is_downloaded=False
-                    )
-                    db.add(download)
-                    
-                    stats = db.query(StatsModel).first()
-                    if stats:
-                        stats.total_tiktok_downloads += 1
-                    
-                    db.commit()
-                finally:
-                    db.close()
-                
-                return result, None
-                
+                    on_progress(message["progress"])
+                except Exception as e:
+                    print(f"Download progress error: {e}")
+            else:
+                messages.update(message)
+        
+        cmd = [sys.executable, YTDLP_CHILD, json.dumps({"url": url, "options": options, "mode": mode})]
+        try:
+            result = FFmpegHelper._run_process(cmd, SOCIAL_DOWNLOAD_TIMEOUT, on_line=on_line, tool="yt-dlp")
+        except subprocess.TimeoutExpired:
+            return None, "Download timed out"
+        
+        key = "entries" if mode == "expand" else "info"
+        if result.returncode == 0 and messages.get(key) is not None:
+            return messages[key], None
+        error = messages.get("error") or result.stderr.strip()[-300:] or "Could not extract media info"
+        return None, error
+    
+    @staticmethod
+    def _process_download(job_id: str):
+        db = SocialMediaService.get_db()
+        try:
+            job = db.query(JobModel).filter(JobModel.id == job_id).first()
+            if not job:
+                return
+            
+            job.status = 'processing'
+            job.progress = 0
+            VideoService._commit_job(db, job)
+            
+            # Another process may have downloaded the same media since this job was queued
+            cached = job.media_key and SocialMediaService._cached_download(db, job.media_key, bool(job.convert_720))
+            if cached:
+                cached.hits = (cached.hits or 0) + 1
+                record_stats(db, total_tiktok_downloads=1, download_cache_hits=1)
+                CACHE_LOOKUPS.inc(cache="download", result="hit")
+                result, error = {**SocialMediaService._download_to_dict(cached), 'cached': True}, None
+            else:
+                result, error = SocialMediaService._download(job)
+            if error:
+                job.status = 'error'
+                job.error = error
+            else:
+                job.media = json.dumps(result)
+                job.output = result['filename']
+                job.encoding_profile_used = result.get('encoding_profile')
+                job.status = 'completed'
+                job.progress = 100
+                job.eta = 0
+            VideoService._commit_job(db, job)
+            
         except Exception as e:
-            return None, f"Error: {str(e)}"
+            job.status = 'error'
+            job.error = f"Error: {str(e)}"
+            VideoService._commit_job(db, job)
+        finally:
+            SocialMediaService._refresh_batches(db, job_id)
+            db.close()
+    
+    @staticmethod
+    def _download(job: JobModel) -> Tuple[Optional[Dict], Optional[str]]:
+        """Download, optionally convert, and record the media of a social job; (result, error)"""
+        platform = job.platform
+        media_id = str(uuid.uuid4())[:8]
+        platform_prefix = SocialMediaService.PLATFORMS[platform]['prefix']
+        platform_name = SocialMediaService.PLATFORMS[platform]['name']
+        
+        temp_template = os.path.join(OUTPUT_DIR, f"{platform_prefix}_{media_id}_temp.%(ext)s")
+        
+        platform_opts = SocialMediaService.get_platform_options(platform, TARGET_SHORT_SIDE if job.convert_720 else None)
+        if job.convert_720 and SOCIAL_STREAM_TRANSCODE:
+            streamed = SocialMediaService._stream_720p(job, media_id, platform_opts)
+            if streamed:
+                return streamed, None
+        
+        ydl_opts = {
+            **platform_opts,
+            'outtmpl': temp_template,
+        }
+        
+        on_progress = SocialMediaService._transfer_writer(job.id, 90 if job.convert_720 else 99)
+        with job_stage("social_download", "download"):
+            info, error = SocialMediaService._run_ytdlp(job.url, ydl_opts, on_progress)
+        if error:
+            return None, error
+        
+        temp_filename = info.get("filename") or ""
+        
+        if not os.path.exists(temp_filename):
+            for ext in ['mp4', 'webm', 'mkv', 'jpg', 'jpeg', 'png', 'webp', 'gif']:
+                possible = os.path.join(OUTPUT_DIR, f"{platform_prefix}_{media_id}_temp.{ext}")
+                if os.path.exists(possible):
+                    temp_filename = possible
+                    break
+        
+        if not os.path.exists(temp_filename):
+            return None, "Download failed - file not found"
+        count_bytes("read", "download", os.path.getsize(temp_filename))
+        
+        title = info.get('title') or f'{platform_name} Media'
+        sanitized_title = SocialMediaService.sanitize_filename(title)
+        ext = os.path.splitext(temp_filename)[1].lower()
+        
+        is_video = ext in ['.mp4', '.webm', '.mkv', '.mov', '.avi']
+        is_image = ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']
+        media_type = 'video' if is_video else ('image' if is_image else 'media')
+        
+        resolution_path = None
+        profile_used = None
+        if job.convert_720 and is_video and SocialMediaService.meets_target(temp_filename, info):
+            # The platform delivered a suitable stream: keep it as the 720p result
+            final_filename, final_path = SocialMediaService._unique_output(f"{sanitized_title}_720p", ext)
+            os.rename(temp_filename, final_path)
+            resolution_path = 'source'
+        elif job.convert_720 and is_video:
+            converted_filename, converted_path = SocialMediaService._unique_output(f"{sanitized_title}_720p", ".mp4")
+            
+            profile_used = EncodingPolicy.resolve(job.encoding_profile or DEFAULT_ENCODING_PROFILE)
+            with job_stage("social_download", "encode"):
+                converted = SocialMediaService.convert_to_720p(temp_filename, converted_path, profile_used)
+            if converted:
+                os.remove(temp_filename)
+                final_filename = converted_filename
+                final_path = converted_path
+                resolution_path = 'transcode'
+            else:
+                final_filename, final_path = SocialMediaService._unique_output(sanitized_title, ext)
+                os.rename(temp_filename, final_path)
+                resolution_path = 'original'
+        else:
+            final_filename, final_path = SocialMediaService._unique_output(sanitized_title, ext)
+            os.rename(temp_filename, final_path)
+        
+        encoding_profile = profile_used if resolution_path == 'transcode' else None
+        return SocialMediaService._record_download(job, media_id, info, final_filename, final_path,
+                                                   media_type, resolution_path, encoding_profile), None
+    
+    @staticmethod
+    def _stream_720p(job: JobModel, media_id: str, platform_opts: dict) -> Optional[Dict]:
+        """720p conversion of the platform stream piped into ffmpeg as it downloads, so the
+        encode runs while the media downloads and the original never touches the disk. None when the format
+        cannot be streamed (separate video/audio streams, an image...), already is 720p
+        material, or the streamed encode failed: the caller then downloads and converts."""
+        with job_stage("social_download", "resolve"):
+            info, error = SocialMediaService._run_ytdlp(job.url, platform_opts, mode="resolve")
+        if error or not info.get("stream") or SocialMediaService.meets_target(None, info):
+            return None
+        
+        stream = info["stream"]
+        platform_name = SocialMediaService.PLATFORMS[job.platform]['name']
+        title = info.get('title') or f'{platform_name} Media'
+        final_filename, final_path = SocialMediaService._unique_output(
+            f"{SocialMediaService.sanitize_filename(title)}_720p", ".mp4")
+        profile_used = EncodingPolicy.resolve(job.encoding_profile or DEFAULT_ENCODING_PROFILE)
+        
+        # The stream URL, headers and cookies stay in this process: ffmpeg reads stdin
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-i", "pipe:0",
+            *SocialMediaService._720p_args(profile_used),
+            final_path
+        ]
+        
+        duration = info.get('duration') or 0
+        tracker = VideoService._progress_tracker(job.id, duration) if duration else None
+        if tracker:
+            tracker.add_task(0, duration)
+        read_failed = threading.Event()
+        try:
+            with job_stage("social_download", "stream_encode"):
+                result = FFmpegHelper._run(cmd, SOCIAL_DOWNLOAD_TIMEOUT, tracker, 0,
+                                           scheduler=stream_encode_scheduler,
+                                           feed=SocialMediaService._stream_feeder(stream, read_failed))
+            ok = result.returncode == 0 and not read_failed.is_set() and os.path.exists(final_path)
+            if not ok:
+                print(f"Streamed 720p conversion failed, downloading instead: {result.stderr.strip()[-300:]}")
+        except Exception as e:
+            print(f"Streamed 720p conversion failed, downloading instead: {e}")
+            ok = False
+        if not ok:
+            if os.path.exists(final_path):
+                os.remove(final_path)
+            return None
+        
+        count_bytes("written", "720p", os.path.getsize(final_path))
+        return SocialMediaService._record_download(job, media_id, info, final_filename, final_path, 'video',
+                                                   'stream', profile_used)
     
     @staticmethod
-    def get_all_downloads():
+    def _stream_feeder(stream: Dict, failed: threading.Event) -> Callable:
+        """ffmpeg stdin writer copying an http(s) stream fetched with its headers. A dropped
+        connection is resumed with a Range request, up to SOCIAL_STREAM_RETRIES times;
+        failed is set (before ffmpeg sees the end of its input) if the stream was cut short."""
+        def feed(out):
+            done = 0
+            retries = 0
+            while True:
+                headers = {**stream["headers"], "Accept-Encoding": "identity"}
+                if done:
+                    headers["Range"] = f"bytes={done}-"
+                try:
+                    request = urllib.request.Request(stream["url"], headers=headers)
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        if done and response.status != 206:
+                            print(f"Stream cut after {done} bytes cannot be resumed")
+                            failed.set()
+                            return
+                        while True:
+                            chunk = response.read(256 * 1024)
+                            if not chunk:
+                                if response.length:
+                                    # Connection closed before Content-Length bytes
+                                    raise http.client.IncompleteRead(b"", response.length)
+                                count_bytes("read", "download", done)
+                                return
+                            out.write(chunk)
+                            done += len(chunk)
+                except BrokenPipeError:
+                    raise
+                except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                    retries += 1
+                    if retries > SOCIAL_STREAM_RETRIES or isinstance(e, urllib.error.HTTPError):
+                        print(f"Stream read error after {done} bytes: {e}")
+                        failed.set()
+                        return
+                    time.sleep(retries)
+        
+        return feed
+    
+    @staticmethod
+    def _record_download(job: JobModel, media_id: str, info: Dict, final_filename: str, final_path: str,
+                         media_type: str, resolution_path: Optional[str],
+                         profile_used: Optional[str]) -> Dict:
+        """Add a finished download to the history; the job result"""
+        platform_name = SocialMediaService.PLATFORMS[job.platform]['name']
+        conversion_success = resolution_path in ('source', 'transcode', 'stream')
+        
+        result = {
+            'id': media_id,
+            'filename': final_filename,
+            'title': info.get('title') or f'{platform_name} Media',
+            'uploader': info.get('uploader') or info.get('channel') or 'Unknown',
+            'duration': info.get('duration') or 0,
+            'view_count': info.get('view_count') or 0,
+            'like_count': info.get('like_count') or 0,
+            'platform': platform_name,
+            'media_type': media_type,
+            'converted_720p': conversion_success,
+            'encoding_profile': profile_used,
+            'resolution_path': resolution_path,
+        }
+        
         db = SocialMediaService.get_db()
         try:
-            downloads = db.query(TikTokDownloadModel).order_by(TikTokDownloadModel.created_at.desc()).all()
-            return [{
-                'id': d.id,
-                'filename': d.filename,
-                'title': d.title,
-                'uploader': d.uploader,
-                'duration': d.duration,
-                'view_count': d.view_count,
-                'like_count': d.like_count,
-                'platform': d.platform,
-                'media_type': d.media_type,
-                'converted_720p': False  # Database doesn't store this flag yet, maybe add it later if needed
-            } for d in downloads]
+            download = TikTokDownloadModel(
+                id=media_id,
+                url=job.url,
+                filename=final_filename,
+                title=result['title'],
+                uploader=result['uploader'],
+                duration=result['duration'],
+                view_count=result['view_count'],
+                like_count=result['like_count'],
+                path=final_path,
+                platform=result['platform'],
+                media_type=result['media_type'],
+                media_key=job.media_key,
+                converted_720p=conversion_success,
+                is_downloaded=False
+            )
+            record_stats(db, total_tiktok_downloads=1)
+            db.add(download)
+            
+            with job_stage("social_download", "db_commit"):
+                db.commit()
         finally:
             db.close()
+        
+        return result
+    
+    @staticmethod
+    def create_batch(urls: Optional[List[str]] = None, playlist: Optional[str] = None, convert_720: bool = False,
+                     encoding_profile: str = DEFAULT_ENCODING_PROFILE) -> Tuple[Optional[Dict], Optional[str]]:
+        """Queue a 'social_batch' job downloading every URL of urls, or every entry of the
+        playlist/profile at playlist (listed by the download pool). The batch passes
+        admission once; its items then get a 'social' job each as the download queue
+        has room, cached or coalesced like single downloads, run SOCIAL_PLATFORM_LIMITS
+        at a time. (batch, error)"""
+        if yt_dlp is None:
+            return None, "yt-dlp not installed"
+        if bool(urls) == bool(playlist):
+            return None, "Provide either urls or playlist"
+        
+        if urls:
+            urls = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+            if len(urls) > SOCIAL_BATCH_MAX_ITEMS:
+                return None, f"A batch holds at most {SOCIAL_BATCH_MAX_ITEMS} URLs"
+        elif not playlist.startswith(('http://', 'https://')):
+            return None, "playlist must be an http(s) URL"
+        
+        db = SocialMediaService.get_db()
+        try:
+            if not download_executor.admit(db):
+                return None, QUEUE_FULL_ERROR
+            
+            batch = JobModel(
+                id=str(uuid.uuid4()),
+                type='social_batch',
+                status='pending',
+                url=playlist,
+                platform=playlist and SocialMediaService.detect_platform(playlist),
+                convert_720=bool(convert_720),
+                encoding_profile=encoding_profile
+            )
+            db.add(batch)
+            VideoService._commit_job(db, batch)
+            
+            if urls:
+                return SocialMediaService._queue_items(db, batch, urls), None
+            download_executor.submit(batch.id)
+            return SocialMediaService._batch_summary(db, batch), None
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _queue_items(db, batch: JobModel, urls: List[str]) -> Dict:
+        """Record the URLs of a batch as its items and queue those that fit; the batch summary"""
+        batch.items = json.dumps([{"url": url} for url in urls])
+        batch.status = 'processing'
+        VideoService._commit_job(db, batch)
+        SocialMediaService._feed_batch(db, batch)
+        # Cached items are already complete
+        return SocialMediaService._batch_summary(db, batch)
+    
+    @staticmethod
+    def _feed_batch(db, batch: JobModel):
+        """Give the waiting items of batch their 'social' job while the download queue
+        is under its limit; cached and coalesced items take no room in it. The feeder,
+        the periodic task and finishing jobs may feed a batch at the same time: the
+        items are written back only if nobody changed them meanwhile, else re-read."""
+        for _ in range(3):
+            old_items = batch.items
+            items = json.loads(old_items) if old_items else []
+            waiting = [item for item in items if not item.get("jobId") and not item.get("error")]
+            if not waiting:
+                return
+            
+            room = len(waiting)
+            if download_executor.queue_limit > 0:
+                room = download_executor.queue_limit - download_executor.queue_depth(db)
+            linked = []
+            for item in waiting:
+                if room <= 0:
+                    break
+                platform = SocialMediaService.detect_platform(item["url"]) or batch.platform
+                if not platform:
+                    item["error"] = UNSUPPORTED_URL_ERROR
+                    continue
+                job, error = SocialMediaService._enqueue(db, item["url"], platform, bool(batch.convert_720),
+                                                         batch.encoding_profile or DEFAULT_ENCODING_PROFILE,
+                                                         admit=False)
+                if not job:
+                    item["error"] = error
+                    continue
+                item["jobId"] = job["id"]
+                linked.append(job["id"])
+                if job["status"] == 'pending' and not job.get("coalesced"):
+                    room -= 1
+            
+            # A job queued here by a losing round is found again (coalesced) on the retry
+            updated = db.query(JobModel).filter(
+                JobModel.id == batch.id,
+                JobModel.items == old_items
+            ).update({JobModel.items: json.dumps(items)}, synchronize_session=False)
+            if not updated:
+                db.rollback()
+                continue
+            
+            for job_id in linked:
+                db.add(BatchItemModel(batch_id=batch.id, job_id=job_id))
+            db.expire(batch, ['items'])
+            VideoService._commit_job(db, batch)
+            return
+    
+    @staticmethod
+    def feed_batches():
+        """Queue waiting items of open batches, and catch up on items finished meanwhile"""
+        db = SocialMediaService.get_db()
+        try:
+            batches = db.query(JobModel).filter(
+                JobModel.type == 'social_batch',
+                JobModel.status == 'processing',
+                JobModel.items != None
+            ).order_by(JobModel.created_at.asc()).all()
+            for batch in batches:
+                SocialMediaService._feed_batch(db, batch)
+                SocialMediaService._batch_summary(db, batch)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _process_batch(job_id: str):
+        """List the playlist of a batch with yt-dlp, then queue its entries"""
+        db = SocialMediaService.get_db()
+        try:
+            batch = db.query(JobModel).filter(JobModel.id == job_id).first()
+            if not batch:
+                return
+            
+            batch.status = 'processing'
+            batch.progress = 0
+            VideoService._commit_job(db, batch)
+            
+            options = {
+                **SocialMediaService.get_platform_options(batch.platform),
+                'extract_flat': 'in_playlist',
+                'playlistend': SOCIAL_BATCH_MAX_ITEMS,
+            }
+            with job_stage("social_batch", "expand"):
+                entries, error = SocialMediaService._run_ytdlp(batch.url, options, mode="expand")
+            if not error and not entries:
+                error = "Playlist is empty"
+            if error:
+                batch.status = 'error'
+                batch.error = error
+                VideoService._commit_job(db, batch)
+                return
+            
+            urls = list(dict.fromkeys(entry["url"] for entry in entries))[:SOCIAL_BATCH_MAX_ITEMS]
+            SocialMediaService._queue_items(db, batch, urls)
+            
+        except Exception as e:
+            batch.status = 'error'
+            batch.error = f"Error: {str(e)}"
+            VideoService._commit_job(db, batch)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_batch(batch_id: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """A batch with the state of each of its items; (batch, error)"""
+        db = SocialMediaService.get_db()
+        try:
+            batch = db.query(JobModel).filter(
+                JobModel.id == batch_id,
+                JobModel.type == 'social_batch'
+            ).first()
+            if not batch:
+                return None, BATCH_NOT_FOUND
+            return SocialMediaService._batch_summary(db, batch), None
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _refresh_batches(db, job_id: str):
+        """Bring the open batches following job_id up to date once it finished"""
+        try:
+            batches = db.query(JobModel).join(BatchItemModel, BatchItemModel.batch_id == JobModel.id).filter(
+                BatchItemModel.job_id == job_id,
+                JobModel.status == 'processing'
+            ).distinct().all()
+            for batch in batches:
+                # The finished job may have made room for waiting items
+                SocialMediaService._feed_batch(db, batch)
+                SocialMediaService._batch_summary(db, batch)
+        except Exception as e:
+            print(f"Batch refresh error: {e}")
+            db.rollback()
+    
+    @staticmethod
+    def _batch_summary(db, batch: JobModel) -> Dict:
+        """Items of batch with the state of their jobs and the aggregate counts and progress.
+        The batch row is updated (and an event published) when its items moved on."""
+        items = json.loads(batch.items) if batch.items else []
+        job_ids = [item["jobId"] for item in items if item.get("jobId")]
+        jobs = {}
+        if job_ids:
+            for job in db.query(JobModel).filter(JobModel.id.in_(job_ids)):
+                jobs[job.id] = VideoService._job_to_dict(job)
+            archived = set(job_ids) - set(jobs)
+            if archived:
+                for row in db.query(JobArchiveModel).filter(JobArchiveModel.id.in_(archived)):
+                    jobs[row.id] = json.loads(row.data)
+        
+        results = []
+        counts = {status: 0 for status in ('pending', 'processing', 'completed', 'error')}
+        done = 0
+        for item in items:
+            job = jobs.get(item.get("jobId"))
+            if job:
+                result = {"url": item["url"], "jobId": job["id"], "status": job["status"],
+                          "progress": job["progress"] or 0, "transfer": job.get("transfer"),
+                          "media": job["media"], "error": job["error"]}
+            elif not item.get("jobId") and not item.get("error"):
+                # Waiting for room in the download queue
+                result = {"url": item["url"], "jobId": None, "status": 'pending', "progress": 0,
+                          "transfer": None, "media": None, "error": None}
+            else:
+                result = {"url": item["url"], "jobId": item.get("jobId"), "status": 'error', "progress": 0,
+                          "transfer": None, "media": None, "error": item.get("error") or "Job not found"}
+            finished = result["status"] in ('completed', 'error')
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            done += 100 if finished else result["progress"]
+            results.append(result)
+        
+        if batch.items is not None:
+            progress = done // len(items) if items else 100
+            status = 'completed' if counts['completed'] + counts['error'] == len(items) else 'processing'
+            if (batch.status, batch.progress) != (status, progress):
+                batch.status = status
+                batch.progress = progress
+                if status == 'completed':
+                    db.query(BatchItemModel).filter(BatchItemModel.batch_id == batch.id).delete(
+                        synchronize_session=False)
+                VideoService._commit_job(db, batch)
+        
+        return {
+            "id": batch.id,
+            "type": batch.type,
+            "status": batch.status,
+            "progress": batch.progress or 0,
+            "url": batch.url,
+            "total": len(items),
+            "counts": counts,
+            "items": results,
+            "error": batch.error,
+            "createdAt": batch.created_at.isoformat() if batch.created_at else None
+        }
+    
+    @staticmethod
+    def list_downloads(cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+                       since: Optional[datetime] = None) -> Tuple[List[Dict], Optional[str]]:
+        """One page of the download history, newest first; (downloads, next_cursor)"""
+        db = SocialMediaService.get_db()
+        try:
+            query = db.query(TikTokDownloadModel)
+            if since:
+                query = query.filter(TikTokDownloadModel.created_at >= since)
+            downloads, next_cursor = paginate(query, TikTokDownloadModel, cursor, limit)
+            return [SocialMediaService._download_to_dict(d) for d in downloads], next_cursor
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _download_to_dict(d: TikTokDownloadModel) -> Dict:
+        return {
+            'id': d.id,
+            'filename': d.filename,
+            'title': d.title,
+            'uploader': d.uploader,
+            'duration': d.duration,
+            'view_count': d.view_count,
+            'like_count': d.like_count,
+            'platform': d.platform,
+            'media_type': d.media_type,
+            'converted_720p': bool(d.converted_720p)
+        }
 
 
 SocialVideoService = SocialMediaService
+
+
+download_executor.register('social', SocialMediaService._process_download)
+download_executor.register('social_batch', SocialMediaService._process_batch)
+download_executor.add_periodic_task('feed_social_batches', SOCIAL_BATCH_FEED_INTERVAL, SocialMediaService.feed_batches)
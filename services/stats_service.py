@@ -0,0 +1,156 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+
+from database import (SessionLocal, StatsModel, StatsEventModel, StatsRollupModel, STATS_COUNTERS)
+from services.job_executor import job_executor
+from config import (STATS_AGGREGATE_INTERVAL, STATS_AGGREGATE_BATCH, STATS_HOURLY_RETENTION_DAYS)
+
+
+ROLLUP_PERIODS = ('hour', 'day')
+
+# API name of each counter
+STATS_FIELDS = {
+    "total_videos_split": "totalVideosSplit",
+    "total_segments_created": "totalSegmentsCreated",
+    "total_videos_merged": "totalVideosMerged",
+    "total_time_saved": "totalTimeSaved",
+    "total_tiktok_downloads": "totalTikTokDownloads",
+    "cache_hits": "cacheHits",
+    "cache_misses": "cacheMisses",
+    "download_cache_hits": "downloadCacheHits",
+    "download_cache_misses": "downloadCacheMisses",
+}
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if period == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+class StatsService:
+    """All-time totals and hourly/daily rollups, built from stats events"""
+
+    @staticmethod
+    def get_db():
+        return SessionLocal()
+
+    @staticmethod
+    def get_totals() -> Dict[str, float]:
+        """Aggregated totals plus the events not aggregated yet, by counter"""
+        db = StatsService.get_db()
+        try:
+            stats = db.query(StatsModel).first()
+            totals = {counter: (getattr(stats, counter) or 0) if stats else 0 for counter in STATS_COUNTERS}
+            pending = db.query(StatsEventModel.counter, func.sum(StatsEventModel.amount)).group_by(
+                StatsEventModel.counter).all()
+            for counter, amount in pending:
+                if counter in totals:
+                    totals[counter] += amount or 0
+            return totals
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_stats() -> dict:
+        totals = StatsService.get_totals()
+        result = {}
+        for counter, name in STATS_FIELDS.items():
+            value = totals[counter]
+            result[name] = value if counter == "total_time_saved" else int(value)
+        return result
+
+    @staticmethod
+    def get_rollups(period: str, since: Optional[datetime] = None,
+                    counter: Optional[str] = None) -> List[dict]:
+        """Rollup buckets of period, oldest first"""
+        db = StatsService.get_db()
+        try:
+            query = db.query(StatsRollupModel).filter(StatsRollupModel.period == period)
+            if since:
+                query = query.filter(StatsRollupModel.bucket_start >= bucket_start(since, period))
+            if counter:
+                query = query.filter(StatsRollupModel.counter == counter)
+            rows = query.order_by(StatsRollupModel.bucket_start.asc(), StatsRollupModel.counter.asc()).all()
+
+            buckets: Dict[datetime, dict] = {}
+            for row in rows:
+                bucket = buckets.setdefault(row.bucket_start, {"start": row.bucket_start.isoformat()})
+                bucket[STATS_FIELDS.get(row.counter, row.counter)] = row.value
+            return list(buckets.values())
+        finally:
+            db.close()
+
+    @staticmethod
+    def aggregate() -> int:
+        """Fold stats events into the totals and the rollups, then delete them.
+
+        The stats row is locked first (FOR UPDATE), so when several processes
+        run this task, one aggregates while the others wait and then find
+        nothing left to do. Returns the number of events folded."""
+        if SessionLocal is None:
+            return 0
+
+        db = StatsService.get_db()
+        folded = 0
+        try:
+            while True:
+                stats = db.query(StatsModel).with_for_update().first()
+                if stats is None:
+                    stats = StatsModel(**{counter: 0 for counter in STATS_COUNTERS})
+                    db.add(stats)
+                    db.flush()
+
+                events = db.query(StatsEventModel).order_by(StatsEventModel.id.asc()).limit(
+                    STATS_AGGREGATE_BATCH).all()
+                if not events:
+                    db.commit()
+                    break
+
+                rollups = defaultdict(float)
+                for event in events:
+                    if event.counter in STATS_COUNTERS:
+                        setattr(stats, event.counter, (getattr(stats, event.counter) or 0) + event.amount)
+                        created_at = event.created_at or datetime.utcnow()
+                        for period in ROLLUP_PERIODS:
+                            rollups[(period, bucket_start(created_at, period), event.counter)] += event.amount
+
+                for (period, start, counter), amount in rollups.items():
+                    row = db.query(StatsRollupModel).filter(
+                        StatsRollupModel.period == period,
+                        StatsRollupModel.bucket_start == start,
+                        StatsRollupModel.counter == counter
+                    ).first()
+                    if row:
+                        row.value = (row.value or 0) + amount
+                    else:
+                        db.add(StatsRollupModel(period=period, bucket_start=start, counter=counter, value=amount))
+
+                # By id list, not id range: ids are not committed in order
+                db.query(StatsEventModel).filter(
+                    StatsEventModel.id.in_([event.id for event in events])
+                ).delete(synchronize_session=False)
+                db.commit()
+                folded += len(events)
+
+            if STATS_HOURLY_RETENTION_DAYS > 0:
+                cutoff = datetime.utcnow() - timedelta(days=STATS_HOURLY_RETENTION_DAYS)
+                db.query(StatsRollupModel).filter(
+                    StatsRollupModel.period == 'hour',
+                    StatsRollupModel.bucket_start < cutoff
+                ).delete(synchronize_session=False)
+                db.commit()
+            return folded
+        except Exception as e:
+            print(f"Stats aggregation error: {e}")
+            db.rollback()
+            return folded
+        finally:
+            db.close()
+
+
+job_executor.add_periodic_task('aggregate_stats', STATS_AGGREGATE_INTERVAL, StatsService.aggregate)
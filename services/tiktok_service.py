@@ -2,7 +2,7 @@ import os
 import uuid
 from typing import Optional, Tuple, Dict
 
-from database import SessionLocal, TikTokDownloadModel, StatsModel
+from database import SessionLocal, TikTokDownloadModel, record_stats
 from config import OUTPUT_DIR
 
 try:
@@ -84,12 +84,9 @@ class TikTokService:
                         path=filename,
                         is_downloaded=False
                     )
+                    record_stats(db, total_tiktok_downloads=1)
                     db.add(download)
                     
-                    stats = db.query(StatsModel).first()
-                    if stats:
-                        stats.total_tiktok_downloads += 1
-                    
                     db.commit()
                 finally:
                     db.close()
@@ -0,0 +1,248 @@
+import os
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from werkzeug.exceptions import ClientDisconnected
+
+from database import SessionLocal, UploadSessionModel
+from utils import FileHandler
+from utils.metrics import job_stage, count_bytes
+from security import FileValidator
+from services.video_service import VideoService
+from services.job_executor import job_executor
+from config import UPLOAD_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_SESSION_TTL, UPLOAD_WRITE_TIMEOUT
+
+
+UPLOAD_NOT_FOUND = "Upload not found"
+OFFSET_MISMATCH = "Offset does not match the bytes received so far"
+UPLOAD_TOO_LARGE = "Chunk goes past the declared upload size"
+UPLOAD_INCOMPLETE = "Upload is not complete"
+
+# sha256 of each upload's bytes so far, fed as the chunks arrive: upload_id -> (offset, hasher).
+# Lost on restart or when chunks land on different processes; complete() then reads the file.
+_digests: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+_digests_lock = threading.Lock()
+
+
+class UploadService:
+    """Resumable chunked uploads.
+
+    A session is created with the final size, then chunks are PUT at increasing
+    offsets straight into the destination file in UPLOAD_DIR. The session row
+    records how many contiguous bytes arrived, so a client whose connection
+    dropped asks for the offset and continues from there."""
+
+    @staticmethod
+    def get_db():
+        return SessionLocal()
+
+    @staticmethod
+    def _to_dict(session: UploadSessionModel) -> dict:
+        return {
+            "uploadId": session.id,
+            "offset": session.received or 0,
+            "size": session.size,
+            "chunkSize": UPLOAD_CHUNK_SIZE,
+        }
+
+    @staticmethod
+    def create_session(original_name: str, size: int,
+                       is_temporary: bool = False) -> Tuple[Optional[dict], Optional[str]]:
+        valid, error = FileValidator.validate_extension(original_name)
+        if not valid:
+            return None, error
+
+        valid, error = FileValidator.validate_size(size)
+        if not valid:
+            return None, error
+
+        filename = FileHandler.generate_unique_filename(original_name)
+        file_path = os.path.join(UPLOAD_DIR, filename)
+        open(file_path, "wb").close()
+
+        db = UploadService.get_db()
+        try:
+            session = UploadSessionModel(
+                id=str(uuid.uuid4()),
+                filename=filename,
+                original_name=original_name,
+                path=file_path,
+                size=size,
+                received=0,
+                is_temporary=is_temporary
+            )
+            db.add(session)
+            db.commit()
+            return UploadService._to_dict(session), None
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_session(upload_id: str) -> Tuple[Optional[dict], Optional[str]]:
+        db = UploadService.get_db()
+        try:
+            session = db.query(UploadSessionModel).filter(UploadSessionModel.id == upload_id).first()
+            if not session:
+                return None, UPLOAD_NOT_FOUND
+            return UploadService._to_dict(session), None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _digest_at(upload_id: str, offset: int):
+        """A hasher holding the first offset bytes of the upload, or None if they were not seen"""
+        if offset == 0:
+            return hashlib.sha256()
+        with _digests_lock:
+            entry = _digests.get(upload_id)
+        if entry and entry[0] == offset:
+            return entry[1].copy()
+        return None
+
+    @staticmethod
+    def _save_digest(upload_id: str, offset: int, digest):
+        with _digests_lock:
+            if digest is None:
+                _digests.pop(upload_id, None)
+            else:
+                _digests[upload_id] = (offset, digest)
+
+    @staticmethod
+    def _forget_digest(upload_id: str):
+        with _digests_lock:
+            _digests.pop(upload_id, None)
+
+    @staticmethod
+    def write_chunk(upload_id: str, offset: int, stream) -> Tuple[Optional[dict], Optional[str]]:
+        """Write the request body at offset. The size limit is enforced while the
+        bytes arrive; whatever was written before a disconnect still counts."""
+        db = UploadService.get_db()
+        try:
+            session = db.query(UploadSessionModel).filter(UploadSessionModel.id == upload_id).first()
+            if not session:
+                return None, UPLOAD_NOT_FOUND
+
+            if offset != (session.received or 0):
+                return UploadService._to_dict(session), OFFSET_MISMATCH
+
+            # Claim the offset: of two PUTs at the same offset only one writes
+            now = datetime.utcnow()
+            claimed = db.query(UploadSessionModel).filter(
+                UploadSessionModel.id == upload_id,
+                UploadSessionModel.received == offset,
+                (UploadSessionModel.writing_since == None) |
+                (UploadSessionModel.writing_since < now - timedelta(seconds=UPLOAD_WRITE_TIMEOUT))
+            ).update({UploadSessionModel.writing_since: now}, synchronize_session=False)
+            db.commit()
+            if claimed != 1:
+                db.refresh(session)
+                return UploadService._to_dict(session), OFFSET_MISMATCH
+
+            digest = UploadService._digest_at(upload_id, offset)
+            written = 0
+            too_large = False
+            try:
+                with job_stage("upload", "upload"), open(session.path, "r+b") as f:
+                    f.seek(offset)
+                    while True:
+                        chunk = stream.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        if offset + written + len(chunk) > session.size:
+                            too_large = True
+                            break
+                        f.write(chunk)
+                        written += len(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+                    f.truncate(offset + written)
+            except (OSError, ClientDisconnected) as e:
+                print(f"Chunk write interrupted for upload {upload_id}: {e}")
+            finally:
+                # Whatever happened to the request, record the bytes written and free the offset
+                count_bytes("written", "upload", written)
+                db.query(UploadSessionModel).filter(
+                    UploadSessionModel.id == upload_id,
+                    UploadSessionModel.received == offset
+                ).update({
+                    UploadSessionModel.received: offset + written,
+                    UploadSessionModel.writing_since: None,
+                    UploadSessionModel.updated_at: datetime.utcnow(),
+                }, synchronize_session=False)
+                db.commit()
+                UploadService._save_digest(upload_id, offset + written, digest)
+            db.refresh(session)
+
+            if too_large:
+                return UploadService._to_dict(session), UPLOAD_TOO_LARGE
+            return UploadService._to_dict(session), None
+        finally:
+            db.close()
+
+    @staticmethod
+    def complete(upload_id: str) -> Tuple[Optional[dict], Optional[str]]:
+        db = UploadService.get_db()
+        try:
+            session = db.query(UploadSessionModel).filter(UploadSessionModel.id == upload_id).first()
+            if not session:
+                return None, UPLOAD_NOT_FOUND
+
+            if (session.received or 0) != session.size:
+                return None, UPLOAD_INCOMPLETE
+
+            digest = UploadService._digest_at(upload_id, session.size)
+            content_hash = digest.hexdigest() if digest else FileHandler.hash_file(session.path)
+
+            video, error = VideoService._register_upload(session.filename, session.path, session.original_name,
+                                                         content_hash, session.is_temporary, db=db)
+
+            # The session goes in the same commit as the video; a failed registration
+            # already removed the file, so the session goes with it
+            deleted = db.query(UploadSessionModel).filter(
+                UploadSessionModel.id == upload_id
+            ).delete(synchronize_session=False)
+            if deleted != 1:
+                # Completed concurrently by another request
+                db.rollback()
+                return None, UPLOAD_NOT_FOUND
+            db.commit()
+            UploadService._forget_digest(upload_id)
+            return video, error
+        finally:
+            db.close()
+
+    @staticmethod
+    def abort(upload_id: str) -> bool:
+        db = UploadService.get_db()
+        try:
+            session = db.query(UploadSessionModel).filter(UploadSessionModel.id == upload_id).first()
+            if not session:
+                return False
+            FileHandler.delete_file(session.path)
+            db.delete(session)
+            db.commit()
+            UploadService._forget_digest(upload_id)
+            return True
+        finally:
+            db.close()
+
+    @staticmethod
+    def expire_sessions():
+        """Drop uploads that have not received a chunk for UPLOAD_SESSION_TTL seconds"""
+        cutoff = datetime.utcnow() - timedelta(seconds=UPLOAD_SESSION_TTL)
+        db = UploadService.get_db()
+        try:
+            stale = db.query(UploadSessionModel).filter(UploadSessionModel.updated_at < cutoff).all()
+            for session in stale:
+                FileHandler.delete_file(session.path)
+                db.delete(session)
+                UploadService._forget_digest(session.id)
+            db.commit()
+        finally:
+            db.close()
+
+
+job_executor.add_periodic_task('expire_upload_sessions', 3600, UploadService.expire_sessions)
@@ -1,14 +1,28 @@
 import os
+import time
 import uuid
 import json
-from threading import Thread
 from typing import List, Optional, Tuple
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from database import SessionLocal, VideoModel, JobModel, StatsModel
-from utils import FFmpegHelper, FileHandler
+from database import (SessionLocal, VideoModel, StoredFileModel, JobModel, JobArchiveModel, TikTokDownloadModel, record_stats,
+                      record_cache_lookup)
+from utils import FFmpegHelper, FileHandler, ProgressTracker
+from utils.probe_cache import probe_cache
+from utils.artifact_cache import artifact_cache
+from utils.metrics import job_stage, count_bytes
+from utils.pagination import paginate
 from security import FileValidator
-from config import OUTPUT_DIR
+from services.job_executor import job_executor, QUEUE_FULL_ERROR
+from services.job_events import job_events
+from services.encoding_policy import EncodingPolicy
+from config import (OUTPUT_DIR, DEFAULT_SPLIT_MODE, KEYFRAME_SNAP_TOLERANCE, DEFAULT_ENCODING_PROFILE,
+                    PAGE_SIZE, JOB_RETENTION_DAYS, JOB_RETENTION_INTERVAL, JOB_ARCHIVE_BATCH,
+                    TEMPORARY_OUTPUT_PREFIXES, TEMPORARY_OUTPUT_RETENTION, TEMPORARY_OUTPUT_SWEEP_INTERVAL)
+
+
+JOB_STATUSES = ('pending', 'processing', 'completed', 'error')
+JOB_NOT_FOUND = "Job not found"
 
 
 class VideoService:
@@ -23,7 +37,18 @@ class VideoService:
         if not valid:
             return None, error
         
-        filename, file_path = FileHandler.save_upload(file, original_name)
+        with job_stage("upload", "upload"):
+            filename, file_path, content_hash = FileHandler.save_upload_hashed(file, original_name)
+        count_bytes("written", "upload", FileHandler.get_file_size(file_path))
+        return VideoService._register_upload(filename, file_path, original_name, content_hash, is_temporary)
+    
+    @staticmethod
+    def _register_upload(filename: str, file_path: str, original_name: str, content_hash: str,
+                         is_temporary: bool = False, db=None) -> Tuple[Optional[dict], Optional[str]]:
+        """Validate a file written to UPLOAD_DIR and record it as a video.
+        If the same content is already stored, the new copy is dropped and the
+        existing file and probe data are shared with the new row.
+        Given a db session, the rows join its transaction and the caller commits."""
         file_size = FileHandler.get_file_size(file_path)
         
         valid, error = FileValidator.validate_size(file_size)
@@ -31,61 +56,141 @@ class VideoService:
             FileHandler.delete_file(file_path)
             return None, error
         
-        valid, error = FileValidator.validate_video_file(file_path)
-        if not valid:
-            FileHandler.delete_file(file_path)
-            return None, error
-        
-        duration = FFmpegHelper.get_duration(file_path)
-        codec, resolution, bitrate = FFmpegHelper.get_codec_info(file_path)
-        
-        video_id = str(uuid.uuid4())
-        
-        db = VideoService.get_db()
+        own_session = db is None
+        if own_session:
+            db = VideoService.get_db()
         try:
+            existing = db.query(VideoModel).filter(VideoModel.content_hash == content_hash).first()
+            if (existing and existing.path != file_path and FileHandler.file_exists(existing.path)
+                    and VideoService._add_reference(db, existing.path)):
+                FileHandler.delete_file(file_path)
+                video = VideoModel(
+                    id=str(uuid.uuid4()),
+                    filename=existing.filename,
+                    original_name=original_name,
+                    size=existing.size,
+                    duration=existing.duration,
+                    path=existing.path,
+                    content_hash=content_hash,
+                    codec=existing.codec,
+                    resolution=existing.resolution,
+                    bitrate=existing.bitrate,
+                    fps=existing.fps,
+                    width=existing.width,
+                    height=existing.height,
+                    audio_codec=existing.audio_codec,
+                    keyframe_interval=existing.keyframe_interval,
+                    probe=existing.probe,
+                    is_temporary=is_temporary
+                )
+                db.add(video)
+                if own_session:
+                    with job_stage("upload", "db_commit"):
+                        db.commit()
+                return VideoService._video_to_dict(video), None
+            
+            with job_stage("upload", "probe"):
+                valid, error = FileValidator.validate_video_file(file_path)
+                if not valid:
+                    FileHandler.delete_file(file_path)
+                    return None, error
+                
+                # Validation already probed the file; this is served from the probe cache
+                summary = FFmpegHelper.get_media_summary(file_path)
+            resolution = None
+            if summary["width"] and summary["height"]:
+                resolution = f"{summary['width']}x{summary['height']}"
+            probe_entry = probe_cache.export(file_path)
+            
             video = VideoModel(
-                id=video_id,
+                id=str(uuid.uuid4()),
                 filename=filename,
                 original_name=original_name,
                 size=file_size,
-                duration=duration,
+                duration=summary["duration"] or 0,
                 path=file_path,
-                codec=codec,
+                content_hash=content_hash,
+                codec=summary["codec"],
                 resolution=resolution,
-                bitrate=bitrate,
+                bitrate=summary["bitrate"],
+                fps=summary["fps"],
+                width=summary["width"],
+                height=summary["height"],
+                audio_codec=summary["audio_codec"],
+                keyframe_interval=summary["keyframe_interval"],
+                probe=json.dumps(probe_entry) if probe_entry else None,
                 is_temporary=is_temporary
             )
             db.add(video)
-            db.commit()
+            db.add(StoredFileModel(path=file_path, content_hash=content_hash, refcount=1))
+            if own_session:
+                with job_stage("upload", "db_commit"):
+                    db.commit()
             
-            return {
-                "id": video.id,
-                "filename": video.filename,
-                "originalName": video.original_name,
-                "size": video.size,
-                "duration": video.duration,
-                "codec": video.codec,
-                "resolution": video.resolution,
-                "bitrate": video.bitrate
-            }, None
+            return VideoService._video_to_dict(video), None
         finally:
-            db.close()
+            if own_session:
+                db.close()
+    
+    @staticmethod
+    def _add_reference(db, path: str) -> bool:
+        """Count one more video on a stored file. False once its last reference was
+        dropped: the file is about to be unlinked and must not be shared."""
+        return db.query(StoredFileModel).filter(
+            StoredFileModel.path == path,
+            StoredFileModel.refcount > 0
+        ).update({StoredFileModel.refcount: StoredFileModel.refcount + 1}, synchronize_session=False) == 1
+    
+    @staticmethod
+    def _drop_reference(db, path: str) -> int:
+        """Count one video less on a stored file; the references left. The row is
+        locked by the UPDATE until commit, so no reference can be added meanwhile."""
+        db.query(StoredFileModel).filter(StoredFileModel.path == path).update(
+            {StoredFileModel.refcount: StoredFileModel.refcount - 1}, synchronize_session=False)
+        stored = db.query(StoredFileModel).filter(StoredFileModel.path == path).first()
+        if stored is None:
+            return db.query(VideoModel).filter(VideoModel.path == path).count()
+        if stored.refcount <= 0:
+            db.delete(stored)
+            return 0
+        return stored.refcount
+    
+    @staticmethod
+    def _video_to_dict(v: VideoModel) -> dict:
+        return {
+            "id": v.id,
+            "filename": v.filename,
+            "originalName": v.original_name,
+            "size": v.size,
+            "duration": v.duration,
+            "codec": v.codec,
+            "resolution": v.resolution,
+            "bitrate": v.bitrate,
+            "fps": v.fps,
+            "audioCodec": v.audio_codec,
+            "keyframeInterval": v.keyframe_interval
+        }
+    
+    @staticmethod
+    def _load_probe(video: VideoModel):
+        """Seed the probe cache from the probe stored with the video, so jobs skip ffprobe"""
+        if video.probe:
+            try:
+                probe_cache.load(video.path, json.loads(video.probe))
+            except ValueError:
+                pass
     
     @staticmethod
-    def get_all_videos() -> List[dict]:
+    def list_videos(cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+                    since: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of non-temporary videos, newest first; (videos, next_cursor)"""
         db = VideoService.get_db()
         try:
-            videos = db.query(VideoModel).filter(VideoModel.is_temporary == False).order_by(VideoModel.created_at.desc()).all()
-            return [{
-                "id": v.id,
-                "filename": v.filename,
-                "originalName": v.original_name,
-                "size": v.size,
-                "duration": v.duration,
-                "codec": v.codec,
-                "resolution": v.resolution,
-                "bitrate": v.bitrate
-            } for v in videos]
+            query = db.query(VideoModel).filter(VideoModel.is_temporary == False)
+            if since:
+                query = query.filter(VideoModel.created_at >= since)
+            videos, next_cursor = paginate(query, VideoModel, cursor, limit)
+            return [VideoService._video_to_dict(v) for v in videos], next_cursor
         finally:
             db.close()
     
@@ -105,15 +210,22 @@ class VideoService:
             if not video:
                 return False
             
-            FileHandler.delete_file(video.path)
+            # Deduplicated uploads share one stored file: only unlink it with the last reference
             db.delete(video)
+            db.flush()
+            references = VideoService._drop_reference(db, video.path)
             db.commit()
+            if references == 0:
+                FileHandler.delete_file(video.path)
             return True
         finally:
             db.close()
     
     @staticmethod
-    def split_video(video_id: str, segment_duration: int, convert_720: bool = False) -> Tuple[Optional[dict], Optional[str]]:
+    def split_video(video_id: str, segment_duration: int, convert_720: bool = False,
+                    split_mode: str = DEFAULT_SPLIT_MODE,
+                    keyframe_tolerance: Optional[float] = None,
+                    encoding_profile: str = DEFAULT_ENCODING_PROFILE) -> Tuple[Optional[dict], Optional[str]]:
         db = VideoService.get_db()
         try:
             video = db.query(VideoModel).filter(VideoModel.id == video_id).first()
@@ -126,6 +238,12 @@ class VideoService:
             if segment_duration > video.duration:
                 return None, "Segment duration exceeds video length"
             
+            if split_mode in ('fast', 'smart') and convert_720:
+                return None, f"The '{split_mode}' split copies streams and cannot convert to 720p"
+            
+            if not job_executor.admit(db):
+                return None, QUEUE_FULL_ERROR
+            
             job_id = str(uuid.uuid4())
             job = JobModel(
                 id=job_id,
@@ -133,19 +251,52 @@ class VideoService:
                 status='pending',
                 video_id=video_id,
                 segment_duration=segment_duration,
-                convert_720=convert_720
+                convert_720=convert_720,
+                split_mode=split_mode,
+                keyframe_tolerance=keyframe_tolerance,
+                encoding_profile=encoding_profile
             )
             db.add(job)
-            db.commit()
+            VideoService._commit_job(db, job)
             
-            thread = Thread(target=VideoService._process_split, args=(job_id,))
-            thread.daemon = True
-            thread.start()
+            job_executor.submit(job_id)
             
             return {"id": job_id, "type": "split", "status": "pending"}, None
         finally:
             db.close()
     
+    @staticmethod
+    def _commit_job(db, job: JobModel):
+        """Commit, then push the job's new state to the job event feed"""
+        db.flush()
+        event = VideoService._job_to_dict(job)
+        db.commit()
+        job_events.publish(event)
+    
+    @staticmethod
+    def _progress_tracker(job_id: str, total_duration: float) -> ProgressTracker:
+        """Progress tracker that writes throttled progress, speed and ETA to the job row"""
+        def write(percent, speed, eta):
+            fields = {
+                "progress": percent,
+                "speed": round(speed, 2) if speed else None,
+                "eta": round(eta, 1) if eta is not None else None,
+            }
+            db = VideoService.get_db()
+            try:
+                updated = db.query(JobModel).filter(
+                    JobModel.id == job_id,
+                    JobModel.status == 'processing'
+                ).update({getattr(JobModel, name): value for name, value in fields.items()},
+                         synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+            if updated:
+                job_events.publish({"id": job_id, "status": "processing", **fields})
+        
+        return ProgressTracker(total_duration, write)
+    
     @staticmethod
     def _process_split(job_id: str):
         db = VideoService.get_db()
@@ -156,60 +307,199 @@ class VideoService:
             
             job.status = 'processing'
             job.progress = 0
-            db.commit()
+            VideoService._commit_job(db, job)
             
             video = db.query(VideoModel).filter(VideoModel.id == job.video_id).first()
             if not video:
                 job.status = 'error'
                 job.error = 'Video not found'
-                db.commit()
+                VideoService._commit_job(db, job)
                 return
             
+            with job_stage("split", "probe"):
+                VideoService._load_probe(video)
+                content_hash = VideoService._content_hash(db, video)
             ext = FileHandler.get_extension(video.original_name) or "mp4"
             output_pattern = os.path.join(OUTPUT_DIR, f"split_{job.id}_segment_{{index}}.{ext}")
             
-            if job.convert_720:
-                outputs = FFmpegHelper.split_video_720p(
+            job.encoding_profile_used = EncodingPolicy.resolve(job.encoding_profile)
+            VideoService._commit_job(db, job)
+            
+            cache_key = None
+            if content_hash:
+                params = {
+                    "segment_duration": job.segment_duration,
+                    "convert_720": bool(job.convert_720),
+                    "split_mode": job.split_mode or DEFAULT_SPLIT_MODE,
+                    "ext": ext,
+                    "encoding_profile": job.encoding_profile_used,
+                }
+                if job.split_mode == 'fast':
+                    params["keyframe_tolerance"] = job.keyframe_tolerance
+                cache_key = artifact_cache.make_key([content_hash], "split", params)
+            
+            cached = VideoService._restore_split(cache_key, output_pattern) if cache_key else None
+            if cached:
+                outputs, segments, job.split_mode = cached
+            else:
+                with job_stage("split", "encode"):
+                    outputs, plan = VideoService._run_split_engine(job, video, output_pattern)
+                count_bytes("read", "split", video.size or 0)
+                
+                if not outputs:
+                    job.status = 'error'
+                    job.error = 'No segments created'
+                    VideoService._commit_job(db, job)
+                    return
+                
+                produced = set(outputs)
+                segments = []
+                cached_segments = []
+                for i, (start, duration) in enumerate(plan):
+                    name = os.path.basename(output_pattern.format(index=i + 1))
+                    if name in produced:
+                        segments.append({"output": name, "start": round(start, 6), "duration": round(duration, 6)})
+                        cached_segments.append({"index": i + 1, "start": round(start, 6), "duration": round(duration, 6)})
+                count_bytes("written", "split", sum(FileHandler.get_file_size(os.path.join(OUTPUT_DIR, s["output"]))
+                                                    for s in segments))
+                
+                if cache_key:
+                    artifact_cache.store(
+                        cache_key,
+                        [os.path.join(OUTPUT_DIR, s["output"]) for s in segments],
+                        {"split_mode": job.split_mode, "segments": cached_segments}
+                    )
+            if cache_key:
+                record_cache_lookup(bool(cached))
+            
+            with job_stage("split", "db_commit"):
+                job.outputs = json.dumps(outputs)
+                job.segments = json.dumps(segments)
+                job.status = 'completed'
+                job.progress = 100
+                job.eta = 0
+                record_stats(db, total_videos_split=1, total_segments_created=len(outputs),
+                             total_time_saved=video.duration)
+                VideoService._commit_job(db, job)
+                
+        except Exception as e:
+            job.status = 'error'
+            job.error = str(e)
+            VideoService._commit_job(db, job)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _content_hash(db, video: VideoModel) -> Optional[str]:
+        """Content hash of a video, computed and stored for rows uploaded before hashing"""
+        if not video.content_hash and os.path.exists(video.path):
+            video.content_hash = FileHandler.hash_file(video.path)
+            db.commit()
+        return video.content_hash
+    
+    @staticmethod
+    def _restore_split(cache_key: str, output_pattern: str) -> Optional[Tuple[List[str], List[dict], str]]:
+        """Link cached segments to this job's output names; (outputs, segments, split_mode) or None"""
+        manifest = artifact_cache.lookup(cache_key)
+        if not manifest:
+            return None
+        
+        meta = manifest.get("meta", {})
+        cached_segments = meta.get("segments", [])
+        destinations = [output_pattern.format(index=seg["index"]) for seg in cached_segments]
+        if not artifact_cache.restore(cache_key, destinations):
+            return None
+        
+        outputs = [os.path.basename(path) for path in destinations]
+        segments = [
+            {"output": name, "start": seg["start"], "duration": seg["duration"]}
+            for name, seg in zip(outputs, cached_segments)
+        ]
+        return outputs, segments, meta.get("split_mode")
+    
+    @staticmethod
+    def _run_split_engine(job: JobModel, video: VideoModel, output_pattern: str) -> Tuple[List[str], List[Tuple[float, float]]]:
+        """Run the split engine selected on the job; returns (outputs, plan).
+        job.split_mode is updated when an engine falls back to another one."""
+        plan = FFmpegHelper.get_segment_plan(job.segment_duration, video.duration)
+        
+        if job.split_mode == 'fast':
+            tolerance = job.keyframe_tolerance if job.keyframe_tolerance is not None else KEYFRAME_SNAP_TOLERANCE
+            keyframe_plan = FFmpegHelper.plan_keyframe_segments(
+                video.path,
+                job.segment_duration,
+                video.duration,
+                tolerance
+            )
+            if keyframe_plan is None:
+                # No keyframe close enough to a cut: fall back to the frame-accurate engine
+                job.split_mode = 'parallel'
+            else:
+                plan = keyframe_plan
+        
+        progress = VideoService._progress_tracker(job.id, sum(duration for _, duration in plan))
+        
+        if job.split_mode == 'smart':
+            temp_dir = FileHandler.create_temp_dir(f"smart_{job.id}_")
+            try:
+                outputs = FFmpegHelper.split_video_smart(
                     video.path,
                     output_pattern,
                     job.segment_duration,
-                    video.duration
+                    video.duration,
+                    temp_dir,
+                    progress=progress,
+                    encoding_profile=job.encoding_profile_used
                 )
-            else:
+            finally:
+                FileHandler.cleanup_temp_dir(temp_dir)
+            if outputs is None:
+                # Source can't be smart-cut (e.g. not H.264): use the frame-accurate engine
+                job.split_mode = 'parallel'
                 outputs = FFmpegHelper.split_video_lossless(
                     video.path,
                     output_pattern,
                     job.segment_duration,
-                    video.duration
+                    video.duration,
+                    progress=progress,
+                    encoding_profile=job.encoding_profile_used
                 )
-            
-            if not outputs:
-                job.status = 'error'
-                job.error = 'No segments created'
-                db.commit()
-                return
-            
-            job.outputs = json.dumps(outputs)
-            job.status = 'completed'
-            job.progress = 100
-            db.commit()
-            
-            stats = db.query(StatsModel).first()
-            if stats:
-                stats.total_videos_split += 1
-                stats.total_segments_created += len(outputs)
-                stats.total_time_saved += video.duration
-                db.commit()
-                
-        except Exception as e:
-            job.status = 'error'
-            job.error = str(e)
-            db.commit()
-        finally:
-            db.close()
+        elif job.split_mode == 'fast':
+            outputs = FFmpegHelper.split_video_stream_copy(video.path, output_pattern, plan, progress=progress)
+        elif job.split_mode == 'single_pass':
+            outputs = FFmpegHelper.split_video_single_pass(
+                video.path,
+                output_pattern,
+                job.segment_duration,
+                video.duration,
+                convert_720=bool(job.convert_720),
+                progress=progress,
+                encoding_profile=job.encoding_profile_used
+            )
+        elif job.convert_720:
+            outputs = FFmpegHelper.split_video_720p(
+                video.path,
+                output_pattern,
+                job.segment_duration,
+                video.duration,
+                progress=progress,
+                encoding_profile=job.encoding_profile_used
+            )
+        else:
+            outputs = FFmpegHelper.split_video_lossless(
+                video.path,
+                output_pattern,
+                job.segment_duration,
+                video.duration,
+                progress=progress,
+                encoding_profile=job.encoding_profile_used
+            )
+        
+        return outputs, plan
     
     @staticmethod
-    def merge_videos(video_ids: List[str], convert_720: bool = False) -> Tuple[Optional[dict], Optional[str]]:
+    def merge_videos(video_ids: List[str], convert_720: bool = False,
+                     encoding_profile: str = DEFAULT_ENCODING_PROFILE) -> Tuple[Optional[dict], Optional[str]]:
         if len(video_ids) < 2:
             return None, "Need at least 2 videos to merge"
         
@@ -220,20 +510,22 @@ class VideoService:
                 if not video:
                     return None, f"Video {vid} not found"
             
+            if not job_executor.admit(db):
+                return None, QUEUE_FULL_ERROR
+            
             job_id = str(uuid.uuid4())
             job = JobModel(
                 id=job_id,
                 type='merge',
                 status='pending',
                 video_ids=json.dumps(video_ids),
-                convert_720=convert_720
+                convert_720=convert_720,
+                encoding_profile=encoding_profile
             )
             db.add(job)
-            db.commit()
+            VideoService._commit_job(db, job)
             
-            thread = Thread(target=VideoService._process_merge, args=(job_id,))
-            thread.daemon = True
-            thread.start()
+            job_executor.submit(job_id)
             
             return {"id": job_id, "type": "merge", "status": "pending"}, None
         finally:
@@ -250,12 +542,12 @@ class VideoService:
             
             job.status = 'processing'
             job.progress = 0
-            db.commit()
-            
-            temp_dir = FileHandler.create_temp_dir(f"merge_{job_id}_")
+            VideoService._commit_job(db, job)
             
             video_ids = json.loads(job.video_ids) if job.video_ids else []
             input_files = []
+            content_hashes = []
+            input_bytes = 0
             total_duration = 0
             
             for vid in video_ids:
@@ -263,104 +555,249 @@ class VideoService:
                 if not video:
                     job.status = 'error'
                     job.error = f'Video {vid} not found'
-                    db.commit()
+                    VideoService._commit_job(db, job)
                     return
+                with job_stage("merge", "probe"):
+                    VideoService._load_probe(video)
+                    content_hashes.append(VideoService._content_hash(db, video))
                 input_files.append(video.path)
+                input_bytes += video.size or 0
                 total_duration += video.duration
             
             output_filename = f"merged_{job.id}.mp4"
             output_path = os.path.join(OUTPUT_DIR, output_filename)
             
-            if job.convert_720:
-                success = FFmpegHelper.merge_videos_720p(input_files, output_path, temp_dir)
-            else:
-                success = FFmpegHelper.merge_videos_lossless(input_files, output_path, temp_dir)
-            
-            if not success:
-                job.status = 'error'
-                job.error = 'Merge failed'
-                db.commit()
-                return
-            
-            job.output = output_filename
-            job.status = 'completed'
-            job.progress = 100
-            db.commit()
-            
-            stats = db.query(StatsModel).first()
-            if stats:
-                stats.total_videos_merged += 1
-                stats.total_time_saved += total_duration
-                db.commit()
+            job.encoding_profile_used = EncodingPolicy.resolve(job.encoding_profile)
+            VideoService._commit_job(db, job)
+            
+            cache_key = None
+            if all(content_hashes):
+                cache_key = artifact_cache.make_key(content_hashes, "merge", {
+                    "convert_720": bool(job.convert_720),
+                    "encoding_profile": job.encoding_profile_used,
+                })
+            
+            cached = bool(cache_key) and artifact_cache.restore(cache_key, [output_path]) is not None
+            if not cached:
+                temp_dir = FileHandler.create_temp_dir(f"merge_{job_id}_")
+                progress = VideoService._progress_tracker(job.id, total_duration)
+                if job.convert_720:
+                    with job_stage("merge", "encode"):
+                        success = FFmpegHelper.merge_videos_720p(input_files, output_path, temp_dir, progress=progress,
+                                                                 encoding_profile=job.encoding_profile_used)
+                else:
+                    with job_stage("merge", "concat"):
+                        success = FFmpegHelper.merge_videos_lossless(input_files, output_path, temp_dir, progress=progress,
+                                                                     encoding_profile=job.encoding_profile_used)
+                
+                if not success:
+                    job.status = 'error'
+                    job.error = 'Merge failed'
+                    VideoService._commit_job(db, job)
+                    return
+                
+                count_bytes("read", "merge", input_bytes)
+                count_bytes("written", "merge", FileHandler.get_file_size(output_path))
+                
+                if cache_key:
+                    artifact_cache.store(cache_key, [output_path])
+            if cache_key:
+                record_cache_lookup(cached)
+            
+            with job_stage("merge", "db_commit"):
+                job.output = output_filename
+                job.status = 'completed'
+                job.progress = 100
+                job.eta = 0
+                record_stats(db, total_videos_merged=1, total_time_saved=total_duration)
+                VideoService._commit_job(db, job)
                 
         except Exception as e:
             job.status = 'error'
             job.error = str(e)
-            db.commit()
+            VideoService._commit_job(db, job)
         finally:
             if temp_dir:
                 FileHandler.cleanup_temp_dir(temp_dir)
             db.close()
     
     @staticmethod
-    def get_all_jobs() -> List[dict]:
+    def _job_to_dict(j: JobModel) -> dict:
+        return {
+            "id": j.id,
+            "type": j.type,
+            "status": j.status,
+            "progress": j.progress,
+            "speed": j.speed,
+            "eta": j.eta,
+            "outputs": json.loads(j.outputs) if j.outputs else None,
+            "segments": json.loads(j.segments) if j.segments else None,
+            "splitMode": j.split_mode,
+            "encodingProfile": j.encoding_profile,
+            "encodingProfileUsed": j.encoding_profile_used,
+            "resourceUsage": json.loads(j.resource_usage) if j.resource_usage else None,
+            "url": j.url,
+            "platform": j.platform,
+            "transfer": json.loads(j.transfer) if j.transfer else None,
+            "media": json.loads(j.media) if j.media else None,
+            "output": j.output,
+            "error": j.error,
+            "createdAt": j.created_at.isoformat() if j.created_at else None
+        }
+    
+    @staticmethod
+    def list_jobs(cursor: Optional[str] = None, limit: int = PAGE_SIZE, status: Optional[str] = None,
+                  job_type: Optional[str] = None, since: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of jobs, newest first; (jobs, next_cursor)"""
         db = VideoService.get_db()
         try:
-            jobs = db.query(JobModel).order_by(JobModel.created_at.desc()).all()
-            return [{
-                "id": j.id,
-                "type": j.type,
-                "status": j.status,
-                "progress": j.progress,
-                "outputs": json.loads(j.outputs) if j.outputs else None,
-                "output": j.output,
-                "error": j.error
-            } for j in jobs]
+            query = db.query(JobModel)
+            if status:
+                query = query.filter(JobModel.status == status)
+            if job_type:
+                query = query.filter(JobModel.type == job_type)
+            if since:
+                query = query.filter(JobModel.created_at >= since)
+            jobs, next_cursor = paginate(query, JobModel, cursor, limit)
+            return [VideoService._job_to_dict(j) for j in jobs], next_cursor
         finally:
             db.close()
     
     @staticmethod
-    def get_stats() -> dict:
+    def get_job(job_id: str) -> Optional[dict]:
+        """A single job, looked up in the archive once retention has moved it"""
         db = VideoService.get_db()
         try:
-            stats = db.query(StatsModel).first()
-            if not stats:
-                return {
-                    "totalVideosSplit": 0,
-                    "totalSegmentsCreated": 0,
-                    "totalVideosMerged": 0,
-                    "totalTimeSaved": 0,
-                    "totalTikTokDownloads": 0
-                }
-            return {
-                "totalVideosSplit": stats.total_videos_split,
-                "totalSegmentsCreated": stats.total_segments_created,
-                "totalVideosMerged": stats.total_videos_merged,
-                "totalTimeSaved": stats.total_time_saved,
-                "totalTikTokDownloads": stats.total_tiktok_downloads
-            }
+            job = db.query(JobModel).filter(JobModel.id == job_id).first()
+            if job:
+                return VideoService._job_to_dict(job)
+            archived = db.query(JobArchiveModel).filter(JobArchiveModel.id == job_id).first()
+            return json.loads(archived.data) if archived else None
         finally:
             db.close()
     
     @staticmethod
-    def cleanup_file_after_download(file_path: str):
-        """Delete a file after it has been downloaded (for temporary files)"""
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception:
-                pass
+    def get_job_archive(job_id: str):
+        """Contents of the ZIP of a split job's segments: ((download name, entries), error).
+        entries starts with manifest.json, then each segment still on disk."""
+        job = VideoService.get_job(job_id)
+        if not job:
+            return None, JOB_NOT_FOUND
+        if job["status"] != 'completed' or not job["outputs"]:
+            return None, "Job has no outputs"
+        
+        timings = {seg["output"]: seg for seg in job["segments"] or []}
+        files, segments, missing = [], [], []
+        for index, name in enumerate(job["outputs"], start=1):
+            path = os.path.join(OUTPUT_DIR, name)
+            if not os.path.isfile(path):
+                missing.append(name)
+                continue
+            files.append((name, path))
+            seg = timings.get(name, {})
+            segments.append({"index": index, "file": name, "start": seg.get("start"), "duration": seg.get("duration")})
+        if not files:
+            return None, "Output files are no longer available"
+        
+        manifest = {
+            "job": job["id"],
+            "splitMode": job["splitMode"],
+            "createdAt": job["createdAt"],
+            "segments": segments,
+            "missing": missing
+        }
+        entries = [("manifest.json", json.dumps(manifest, indent=2).encode())] + files
+        return (f"clipflow_{job['id'][:8]}.zip", entries), None
+    
+    @staticmethod
+    def archive_old_jobs() -> int:
+        """Move completed and failed jobs older than JOB_RETENTION_DAYS to jobs_archive"""
+        if JOB_RETENTION_DAYS <= 0:
+            return 0
+        
+        cutoff = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+        db = VideoService.get_db()
+        archived = 0
+        try:
+            while True:
+                jobs = db.query(JobModel).filter(
+                    JobModel.status.in_(['completed', 'error']),
+                    JobModel.created_at < cutoff
+                ).order_by(JobModel.created_at.asc()).limit(JOB_ARCHIVE_BATCH).all()
+                if not jobs:
+                    break
+                
+                for job in jobs:
+                    db.merge(JobArchiveModel(
+                        id=job.id,
+                        type=job.type,
+                        status=job.status,
+                        data=json.dumps(VideoService._job_to_dict(job)),
+                        created_at=job.created_at
+                    ))
+                    db.delete(job)
+                db.commit()
+                archived += len(jobs)
+            
+            if archived:
+                print(f"Archived {archived} old job(s)")
+            return archived
+        except Exception as e:
+            print(f"Job archive error: {e}")
+            db.rollback()
+            return archived
+        finally:
+            db.close()
+    
+    @staticmethod
+    def sweep_temporary_outputs() -> int:
+        """Delete social downloads and extracted frames older than
+        TEMPORARY_OUTPUT_RETENTION. Returns the number of files removed."""
+        cutoff = time.time() - TEMPORARY_OUTPUT_RETENTION
+        paths = []
+        try:
+            paths = [entry.path for entry in os.scandir(OUTPUT_DIR)
+                     if entry.name.startswith(TEMPORARY_OUTPUT_PREFIXES)]
+        except FileNotFoundError:
+            pass
+        
+        # Finished social downloads are named after their title: found by their history row,
+        # which is marked swept once its file is gone so the next runs skip it
+        db = VideoService.get_db()
+        try:
+            rows = db.query(TikTokDownloadModel.id, TikTokDownloadModel.path).filter(
+                TikTokDownloadModel.swept_at == None,
+                TikTokDownloadModel.created_at < datetime.utcnow() - timedelta(seconds=TEMPORARY_OUTPUT_RETENTION)
+            ).all()
+            paths.extend(path for _, path in rows if path)
+            
+            removed = 0
+            for path in set(paths):
+                try:
+                    if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+            
+            # Rows whose file is still there (written again since) are looked at again next run
+            swept = [row_id for row_id, path in rows if not path or not os.path.exists(path)]
+            if swept:
+                db.query(TikTokDownloadModel).filter(TikTokDownloadModel.id.in_(swept)).update(
+                    {TikTokDownloadModel.swept_at: datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+        finally:
+            db.close()
+        return removed
     
     @staticmethod
     def extract_frames(file, original_name: str):
         """Extract first and last frames from a video"""
-        import subprocess
-        
         valid, error = FileValidator.validate_extension(original_name)
         if not valid:
             return None, error
         
-        filename, file_path = FileHandler.save_upload(file, original_name)
+        filename, file_path, content_hash = FileHandler.save_upload_hashed(file, original_name)
         
         file_size = FileHandler.get_file_size(file_path)
         valid, error = FileValidator.validate_size(file_size)
@@ -368,6 +805,23 @@ class VideoService:
             FileHandler.delete_file(file_path)
             return None, error
         
+        frame_id = str(uuid.uuid4())[:8]
+        first_frame_name = f"frame_{frame_id}_first.jpg"
+        last_frame_name = f"frame_{frame_id}_last.jpg"
+        first_frame_path = os.path.join(OUTPUT_DIR, first_frame_name)
+        last_frame_path = os.path.join(OUTPUT_DIR, last_frame_name)
+        
+        cache_key = artifact_cache.make_key([content_hash], "frames")
+        manifest = artifact_cache.restore(cache_key, [first_frame_path, last_frame_path])
+        record_cache_lookup(manifest is not None)
+        if manifest is not None:
+            FileHandler.delete_file(file_path)
+            return {
+                "firstFrame": first_frame_name,
+                "lastFrame": last_frame_name,
+                "duration": manifest.get("meta", {}).get("duration", 0)
+            }, None
+        
         valid, error = FileValidator.validate_video_file(file_path)
         if not valid:
             FileHandler.delete_file(file_path)
@@ -379,12 +833,6 @@ class VideoService:
             return None, "Could not determine video duration"
         
         base_name = os.path.splitext(original_name)[0]
-        frame_id = str(uuid.uuid4())[:8]
-        
-        first_frame_name = f"frame_{frame_id}_first.jpg"
-        last_frame_name = f"frame_{frame_id}_last.jpg"
-        first_frame_path = os.path.join(OUTPUT_DIR, first_frame_name)
-        last_frame_path = os.path.join(OUTPUT_DIR, last_frame_name)
         
         try:
             cmd_first = [
@@ -395,7 +843,7 @@ class VideoService:
                 "-q:v", "2",
                 first_frame_path
             ]
-            result_first = subprocess.run(cmd_first, capture_output=True, timeout=60)
+            result_first = FFmpegHelper._run_process(cmd_first, 60)
             
             if result_first.returncode != 0 or not os.path.exists(first_frame_path):
                 FileHandler.delete_file(file_path)
@@ -410,7 +858,7 @@ class VideoService:
                 "-q:v", "2",
                 last_frame_path
             ]
-            result_last = subprocess.run(cmd_last, capture_output=True, timeout=60)
+            result_last = FFmpegHelper._run_process(cmd_last, 60)
             
             if result_last.returncode != 0 or not os.path.exists(last_frame_path):
                 FileHandler.delete_file(file_path)
@@ -418,6 +866,7 @@ class VideoService:
                 return None, "Failed to extract last frame"
             
             FileHandler.delete_file(file_path)
+            artifact_cache.store(cache_key, [first_frame_path, last_frame_path], {"duration": duration})
             
             return {
                 "firstFrame": first_frame_name,
@@ -430,3 +879,10 @@ class VideoService:
             FileHandler.delete_file(first_frame_path)
             FileHandler.delete_file(last_frame_path)
             return None, f"Frame extraction error: {str(e)}"
+
+
+job_executor.register('split', VideoService._process_split)
+job_executor.register('merge', VideoService._process_merge)
+job_executor.add_periodic_task('archive_old_jobs', JOB_RETENTION_INTERVAL, VideoService.archive_old_jobs)
+job_executor.add_periodic_task('sweep_temporary_outputs', TEMPORARY_OUTPUT_SWEEP_INTERVAL,
+                               VideoService.sweep_temporary_outputs)
@@ -3,6 +3,8 @@ const API_BASE = '/api';
 let splitVideo = null;
 let mergeQueue = [];
 let jobs = [];
+let jobStream = null;
+let jobStreamFailed = false;
 let tiktokDownloads = [];
 
 document.addEventListener('DOMContentLoaded', async () => {
@@ -16,7 +18,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     await cleanupOnLoad();
     
     loadStats();
-    pollJobs();
+    watchJobs();
     loadHistory();
 });
 
@@ -155,9 +157,11 @@ function initSplit() {
     btnSplit.addEventListener('click', () => {
         const segmentDuration = parseInt(durationInput.value);
         const convert720 = document.getElementById('split-convert-720').checked;
+        const splitMode = document.getElementById('split-mode').value;
+        const encodingProfile = document.getElementById('split-encoding-profile').value;
         
         if (splitVideo && segmentDuration > 0) {
-            doSplitVideo(splitVideo.id, segmentDuration, convert720);
+            doSplitVideo(splitVideo.id, segmentDuration, convert720, splitMode, encodingProfile);
         }
     });
 }
@@ -173,42 +177,81 @@ async function uploadVideoForSplit(file) {
     uploadZone.classList.add('hidden');
     filenameEl.textContent = file.name;
     
-    const formData = new FormData();
-    formData.append('video', file);
-    
-    const xhr = new XMLHttpRequest();
-    
-    xhr.upload.addEventListener('progress', (e) => {
-        if (e.lengthComputable) {
-            const percent = Math.round((e.loaded / e.total) * 100);
+    try {
+        const video = await uploadFileChunked(file, (percent) => {
             percentEl.textContent = `${percent}%`;
             barEl.style.width = `${percent}%`;
-        }
-    });
-    
-    xhr.onload = async () => {
+        });
+        splitVideo = video;
+        updateSplitUI();
+    } catch (err) {
+        console.error('Error uploading for split:', err);
+        alert(err.message || 'Erreur lors de l\'upload');
+        uploadZone.classList.remove('hidden');
+    } finally {
         progressDiv.classList.add('hidden');
         percentEl.textContent = '0%';
         barEl.style.width = '0%';
-        
-        if (xhr.status === 200) {
-            const video = JSON.parse(xhr.responseText);
-            splitVideo = video;
-            updateSplitUI();
-        } else {
-            alert('Erreur lors de l\'upload');
-            uploadZone.classList.remove('hidden');
-        }
-    };
+    }
+}
+
+const UPLOAD_MAX_RETRIES = 5;
+
+async function uploadFileChunked(file, onProgress) {
+    const initRes = await fetch(`${API_BASE}/videos/uploads`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size })
+    });
+    const session = await initRes.json();
+    if (!initRes.ok) {
+        throw new Error(session.error || 'Erreur lors de l\'upload');
+    }
     
-    xhr.onerror = () => {
-        alert('Erreur lors de l\'upload');
-        progressDiv.classList.add('hidden');
-        uploadZone.classList.remove('hidden');
-    };
+    const uploadUrl = `${API_BASE}/videos/uploads/${session.uploadId}`;
+    let offset = session.offset;
+    let retries = 0;
     
-    xhr.open('POST', `${API_BASE}/videos/upload`);
-    xhr.send(formData);
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + session.chunkSize);
+        try {
+            const res = await fetch(`${uploadUrl}?offset=${offset}`, { method: 'PUT', body: chunk });
+            const data = await res.json();
+            if (res.ok || res.status === 409) {
+                // 409: the server has a different offset, resume from it
+                offset = data.offset;
+                retries = 0;
+            } else if (res.status >= 500) {
+                throw new Error(data.error);
+            } else {
+                throw Object.assign(new Error(data.error), { fatal: true });
+            }
+        } catch (err) {
+            if (err.fatal || ++retries > UPLOAD_MAX_RETRIES) {
+                fetch(uploadUrl, { method: 'DELETE' }).catch(() => {});
+                throw err;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+            try {
+                const statusRes = await fetch(uploadUrl);
+                if (statusRes.ok) {
+                    offset = (await statusRes.json()).offset;
+                }
+            } catch (statusErr) {
+                // Still offline, the next attempt will retry
+            }
+        }
+        if (onProgress) {
+            onProgress(Math.round((offset / file.size) * 100));
+        }
+    }
+    
+    const completeRes = await fetch(`${uploadUrl}/complete`, { method: 'POST' });
+    const video = await completeRes.json();
+    if (!completeRes.ok) {
+        throw new Error(video.error || 'Erreur lors de l\'upload');
+    }
+    return video;
 }
 
 function updateSplitUI() {
@@ -260,7 +303,7 @@ function updateSplitUI() {
     boxesEl.innerHTML = boxes.join('');
 }
 
-async function doSplitVideo(videoId, segmentDuration, convert720) {
+async function doSplitVideo(videoId, segmentDuration, convert720, splitMode, encodingProfile) {
     const btnSplit = document.getElementById('btn-split');
     const originalContent = btnSplit.innerHTML;
     btnSplit.disabled = true;
@@ -273,7 +316,7 @@ async function doSplitVideo(videoId, segmentDuration, convert720) {
         const res = await fetch(`${API_BASE}/videos/split`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ videoId, segmentDuration, convert720 })
+            body: JSON.stringify({ videoId, segmentDuration, convert720, splitMode, encodingProfile })
         });
         
         const data = await res.json();
@@ -281,7 +324,9 @@ async function doSplitVideo(videoId, segmentDuration, convert720) {
         if (data.jobId) {
             splitVideo = null;
             updateSplitUI();
-            pollJobs();
+            watchJobs();
+        } else if (data.error) {
+            alert(data.error);
         }
     } catch (err) {
         console.error('Split error:', err);
@@ -323,16 +368,8 @@ function initMerge() {
 
 async function handleMergeFiles(files) {
     for (const file of files) {
-        const formData = new FormData();
-        formData.append('video', file);
-        
         try {
-            const res = await fetch(`${API_BASE}/videos/upload`, {
-                method: 'POST',
-                body: formData
-            });
-            
-            const video = await res.json();
+            const video = await uploadFileChunked(file);
             mergeQueue.push(video);
             renderMergeQueue();
         } catch (err) {
@@ -406,7 +443,9 @@ async function mergeVideos() {
         if (data.jobId) {
             mergeQueue = [];
             renderMergeQueue();
-            pollJobs();
+            watchJobs();
+        } else if (data.error) {
+            alert(data.error);
         }
     } catch (err) {
         console.error('Merge error:', err);
@@ -453,21 +492,45 @@ async function downloadTikTok(url) {
     </span>`;
     loadingDiv.classList.remove('hidden');
     
+    // Several pasted URLs (a pasted list may lose its line breaks) go out as one batch
+    const urls = url.split(/\s+|(?=https?:\/\/)/).filter(Boolean);
+    
     try {
-        const res = await fetch(`${API_BASE}/social/download`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ url, convert720 })
-        });
+        const res = urls.length > 1
+            ? await fetch(`${API_BASE}/social/batches`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ urls, convert720 })
+            })
+            : await fetch(`${API_BASE}/social/download`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ url, convert720 })
+            });
         
         const data = await res.json();
         
         if (data.error) {
             alert(data.error);
+        } else if (data.batchId) {
+            // One job per item; their progress arrives with the job updates
+            data.items.filter(item => item.jobId).forEach(item => {
+                upsertJob({ id: item.jobId, type: 'social', status: item.status, progress: item.progress,
+                            media: item.media, error: item.error, url: item.url });
+            });
+            const rejected = data.items.filter(item => !item.jobId);
+            if (rejected.length) {
+                alert(rejected.map(item => `${item.url} : ${item.error}`).join('\n'));
+            }
+            renderJobs();
+            urlInput.value = '';
+            if (jobStreamFailed) pollJobs();
         } else {
-            tiktokDownloads.unshift(data);
-            renderTikTokDownloads();
+            // The download runs as a job: its progress and result arrive with the job updates
+            upsertJob({ ...data, url });
+            renderJobs();
             urlInput.value = '';
+            if (jobStreamFailed) pollJobs();
         }
     } catch (err) {
         console.error('Social download error:', err);
@@ -587,6 +650,50 @@ function renderTikTokDownloads() {
     `}).join('');
 }
 
+function watchJobs() {
+    if (jobStreamFailed || !window.EventSource) {
+        pollJobs();
+        return;
+    }
+    if (jobStream) return;
+    
+    let failures = 0;
+    jobStream = new EventSource(`${API_BASE}/jobs/stream`);
+    
+    jobStream.addEventListener('snapshot', e => {
+        failures = 0;
+        jobs = JSON.parse(e.data);
+        renderJobs();
+    });
+    
+    jobStream.addEventListener('job', e => {
+        failures = 0;
+        upsertJob(JSON.parse(e.data));
+        renderJobs();
+    });
+    
+    jobStream.onerror = () => {
+        // EventSource reconnects by itself after the server closes a stream;
+        // only fall back to polling when it keeps failing or gives up
+        failures += 1;
+        if (jobStream.readyState === EventSource.CLOSED || failures >= 3) {
+            jobStream.close();
+            jobStream = null;
+            jobStreamFailed = true;
+            pollJobs();
+        }
+    };
+}
+
+function upsertJob(update) {
+    const existing = jobs.find(j => j.id === update.id);
+    if (existing) {
+        Object.assign(existing, update);
+    } else {
+        jobs.unshift(update);
+    }
+}
+
 async function pollJobs() {
     try {
         const res = await fetch(`${API_BASE}/jobs`);
@@ -611,6 +718,57 @@ function renderJobs() {
     
     splitJobsEl.innerHTML = splitJobs.map(j => renderJobCard(j)).join('');
     mergeJobsEl.innerHTML = mergeJobs.map(j => renderJobCard(j)).join('');
+    renderSocialJobs();
+}
+
+function renderSocialJobs() {
+    const socialJobs = jobs.filter(j => j.type === 'social');
+    
+    let added = false;
+    socialJobs.filter(j => j.status === 'completed' && j.media).forEach(j => {
+        if (!tiktokDownloads.some(d => d.id === j.media.id)) {
+            tiktokDownloads.unshift(j.media);
+            added = true;
+        }
+    });
+    if (added) renderTikTokDownloads();
+    
+    document.getElementById('social-jobs').innerHTML = socialJobs
+        .filter(j => j.status !== 'completed')
+        .map(j => renderSocialJobCard(j)).join('');
+}
+
+function renderSocialJobCard(job) {
+    const transfer = job.transfer || {};
+    const details = [];
+    if (transfer.downloadedBytes) {
+        details.push(transfer.totalBytes ?
+            `${formatFileSize(transfer.downloadedBytes)} / ${formatFileSize(transfer.totalBytes)}` :
+            formatFileSize(transfer.downloadedBytes));
+    }
+    if (transfer.bytesPerSecond) details.push(`${formatFileSize(transfer.bytesPerSecond)}/s`);
+    if (job.eta != null && job.status === 'processing') details.push(`${formatDuration(job.eta)} restant`);
+    
+    return `
+        <div class="social-download-card bg-white/80 dark:bg-night-800/50 backdrop-blur-lg rounded-xl p-4 border border-night-200 dark:border-night-700 mb-3" data-testid="social-job-${job.id}">
+            <div class="flex items-center justify-between gap-3">
+                <div class="min-w-0">
+                    <p class="font-medium truncate text-night-900 dark:text-white">${escapeHtml(job.url || 'Média')}</p>
+                    <p class="text-xs text-night-500 dark:text-night-400">
+                        ${job.status === 'error' ? 'Erreur' : job.status === 'pending' ? 'En attente...' : 'Téléchargement...'}
+                        ${details.length ? ` · ${details.join(' · ')}` : ''}
+                    </p>
+                </div>
+                ${job.status === 'processing' ? `<span class="text-lg font-bold text-purple-500">${job.progress || 0}%</span>` : ''}
+            </div>
+            ${job.status === 'processing' ? `
+                <div class="mt-3 h-2 bg-night-200 dark:bg-night-700 rounded-full overflow-hidden">
+                    <div class="h-full bg-purple-500 transition-all duration-300 rounded-full" style="width: ${job.progress || 0}%"></div>
+                </div>
+            ` : ''}
+            ${job.status === 'error' && job.error ? `<p class="mt-2 text-sm text-danger">${escapeHtml(job.error)}</p>` : ''}
+        </div>
+    `;
 }
 
 function renderJobCard(job) {
@@ -628,14 +786,25 @@ function renderJobCard(job) {
         if (job.type === 'split' && job.outputs) {
             downloadButtons = `
                 <div class="flex flex-wrap gap-2 mt-3">
-                    ${job.outputs.map((o, i) => `
-                        <a href="${API_BASE}/download/${encodeURIComponent(o)}" class="inline-flex items-center gap-1 bg-primary/20 text-primary px-3 py-1 rounded-lg text-sm hover:bg-primary/30 transition-all duration-200" data-testid="download-segment-${i}">
+                    ${job.outputs.map((o, i) => {
+                        const seg = (job.segments || []).find(s => s.output === o);
+                        const title = seg ? `${formatDuration(seg.start)} – ${formatDuration(seg.start + seg.duration)}` : '';
+                        return `
+                        <a href="${API_BASE}/download/${encodeURIComponent(o)}" title="${title}" class="inline-flex items-center gap-1 bg-primary/20 text-primary px-3 py-1 rounded-lg text-sm hover:bg-primary/30 transition-all duration-200" data-testid="download-segment-${i}">
                             <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
                                 <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"/>
                             </svg>
                             Segment ${i + 1}
                         </a>
-                    `).join('')}
+                    `}).join('')}
+                    ${job.outputs.length > 1 ? `
+                        <a href="${API_BASE}/jobs/${encodeURIComponent(job.id)}/archive" class="inline-flex items-center gap-1 bg-success/20 text-success px-3 py-1 rounded-lg text-sm hover:bg-success/30 transition-all duration-200" data-testid="download-archive">
+                            <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 16v1a3 3 0 003 3h10a3 3 0 003-3v-1m-4-4l-4 4m0 0l-4-4m4 4V4"/>
+                            </svg>
+                            Tout télécharger (ZIP)
+                        </a>
+                    ` : ''}
                 </div>
             `;
         } else if (job.type === 'merge' && job.output) {
@@ -665,6 +834,7 @@ function renderJobCard(job) {
                 ${job.status === 'processing' ? `
                     <div class="text-right">
                         <span class="text-lg font-bold text-primary">${job.progress || 0}%</span>
+                        ${job.speed ? `<p class="text-xs text-night-500 dark:text-night-400">${job.speed.toFixed(1)}×${job.eta != null ? ` · ${formatDuration(job.eta)} restant` : ''}</p>` : ''}
                     </div>
                 ` : ''}
             </div>
@@ -674,7 +844,7 @@ function renderJobCard(job) {
                 </div>
             ` : ''}
             ${downloadButtons}
-            ${job.status === 'error' && job.error ? `<p class="mt-2 text-sm text-danger">${job.error}</p>` : ''}
+            ${job.status === 'error' && job.error ? `<p class="mt-2 text-sm text-danger">${escapeHtml(job.error)}</p>` : ''}
         </div>
     `;
 }
@@ -731,6 +901,11 @@ function formatFileSize(bytes) {
     return (bytes / (1024 * 1024)).toFixed(1) + ' MB';
 }
 
+function escapeHtml(value) {
+    const entities = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+    return String(value).replace(/[&<>"']/g, c => entities[c]);
+}
+
 let framesVideo = null;
 
 function initFrames() {
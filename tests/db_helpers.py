@@ -0,0 +1,34 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """TestCase on an empty in-memory database. self.Session opens sessions on it and
+    is patched in as the SessionLocal of every module listed in SESSION_MODULES."""
+
+    SESSION_MODULES = ()
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        for module in self.SESSION_MODULES:
+            patcher = patch(f'{module}.SessionLocal', self.Session)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def add_rows(self, *rows):
+        db = self.Session()
+        db.add_all(rows)
+        db.commit()
+        db.close()
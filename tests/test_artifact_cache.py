@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.artifact_cache import ArtifactCache
+
+
+class TestArtifactCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = ArtifactCache(os.path.join(self.tmp.name, ".cache"), max_bytes=1024)
+
+    def _write(self, name, size):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return path
+
+    def test_key_depends_on_inputs_operation_and_params(self):
+        key = ArtifactCache.make_key(["abc"], "split", {"segment_duration": 10})
+        self.assertEqual(key, ArtifactCache.make_key(["abc"], "split", {"segment_duration": 10}))
+        self.assertNotEqual(key, ArtifactCache.make_key(["abc"], "split", {"segment_duration": 20}))
+        self.assertNotEqual(key, ArtifactCache.make_key(["abc"], "merge", {"segment_duration": 10}))
+        self.assertNotEqual(ArtifactCache.make_key(["a", "b"], "merge"), ArtifactCache.make_key(["b", "a"], "merge"))
+
+    def test_store_and_restore_under_new_names(self):
+        outputs = [self._write("seg_1.mp4", 10), self._write("seg_2.mp4", 20)]
+        self.assertTrue(self.cache.store("k", outputs, {"split_mode": "fast"}))
+
+        for path in outputs:
+            os.remove(path)
+
+        destinations = [os.path.join(self.tmp.name, f"job2_{i}.mp4") for i in range(2)]
+        manifest = self.cache.restore("k", destinations)
+        self.assertEqual(manifest["meta"], {"split_mode": "fast"})
+        self.assertEqual([os.path.getsize(p) for p in destinations], [10, 20])
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.restore("missing", [os.path.join(self.tmp.name, "out.mp4")]))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.store("old", [self._write("a.mp4", 400)])
+        self.cache.store("recent", [self._write("b.mp4", 400)])
+        manifest = os.path.join(self.tmp.name, ".cache", "old", ArtifactCache.MANIFEST)
+        os.utime(manifest, (1, 1))
+        self.cache.lookup("recent")
+
+        self.cache.store("new", [self._write("c.mp4", 400)])
+
+        self.assertIsNone(self.cache.lookup("old"))
+        self.assertIsNotNone(self.cache.lookup("recent"))
+        self.assertIsNotNone(self.cache.lookup("new"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import threading
+import time
+import subprocess
+from unittest.mock import patch
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg import FFmpegHelper
+from utils.scheduler import EncodeScheduler, encode_scheduler
+from config import ENCODING_PROFILES
+
+
+class TestEncodeScheduler(unittest.TestCase):
+
+    def test_lone_encode_gets_capped_budget(self):
+        scheduler = EncodeScheduler(budget=32, max_threads=16)
+        with scheduler.slot() as threads:
+            self.assertEqual(threads, 16)
+            self.assertEqual(scheduler.stats()["inUse"], 16)
+        self.assertEqual(scheduler.stats()["inUse"], 0)
+
+    def test_batch_shares_budget(self):
+        scheduler = EncodeScheduler(budget=32, max_threads=16)
+        with scheduler.demand(8) as task_done:
+            with scheduler.slot() as threads:
+                self.assertEqual(threads, 4)
+            for _ in range(7):
+                task_done()
+            # Only one encode of the batch left: it may use more of the budget
+            with scheduler.slot() as threads:
+                self.assertEqual(threads, 16)
+
+    def test_waits_when_budget_is_used(self):
+        scheduler = EncodeScheduler(budget=2, max_threads=2)
+        granted = []
+
+        def second():
+            with scheduler.slot() as threads:
+                granted.append(threads)
+
+        with scheduler.slot():
+            thread = threading.Thread(target=second)
+            thread.start()
+            time.sleep(0.05)
+            self.assertEqual(granted, [])
+            self.assertEqual(scheduler.stats()["waiting"], 1)
+        thread.join(1)
+
+        self.assertEqual(granted, [2])
+        self.assertGreater(scheduler.stats()["maxWaitSeconds"], 0)
+
+
+class TestThreadOption(unittest.TestCase):
+
+    def test_replaces_output_threads(self):
+        cmd = ["ffmpeg", "-threads", "2", "-i", "in.mp4", "-c:v", "libx264", "-threads", "1", "out.mp4"]
+        self.assertEqual(
+            FFmpegHelper.with_threads(cmd, 6),
+            ["ffmpeg", "-threads", "2", "-i", "in.mp4", "-c:v", "libx264", "-threads", "6", "out.mp4"]
+        )
+
+    def test_stream_copy_is_not_an_encode(self):
+        self.assertFalse(FFmpegHelper.is_encode(["ffmpeg", "-i", "in.mp4", "-c", "copy", "out.mp4"]))
+        self.assertTrue(FFmpegHelper.is_encode(["ffmpeg", "-i", "in.mp4", "-c:a", "copy", "out.mp4"]))
+
+    def test_audio_copy_with_video_encode_is_an_encode(self):
+        cmd = ["ffmpeg", "-i", "in.mp4", "-c:v", "libx264", "-c:a", "copy", "out.mp4"]
+        self.assertTrue(FFmpegHelper.is_encode(cmd))
+        cmd = ["ffmpeg", "-i", "in.mp4", "-c", "copy", "-c:v", "libx264", "out.mp4"]
+        self.assertTrue(FFmpegHelper.is_encode(cmd))
+
+    def test_video_copy_with_audio_encode_is_not_an_encode(self):
+        cmd = ["ffmpeg", "-i", "in.mp4", "-c:v", "copy", "-c:a", "aac", "out.mp4"]
+        self.assertFalse(FFmpegHelper.is_encode(cmd))
+        self.assertFalse(FFmpegHelper.is_encode(["ffmpeg", "-i", "in.mp4", "-vn", "-c:a", "aac", "out.m4a"]))
+
+    def test_precise_reencode_goes_through_the_scheduler(self):
+        with patch.object(FFmpegHelper, '_run_process',
+                          return_value=subprocess.CompletedProcess([], 1, "", "")) as run, \
+                patch.object(encode_scheduler, 'slot', wraps=encode_scheduler.slot) as slot:
+            FFmpegHelper._split_with_reencode_precise("in.mp4", "out.mp4", 0.0, 5.0, encoding_profile="fast")
+
+        slot.assert_called_once()
+        cmd = run.call_args.args[0]
+        self.assertEqual(cmd[cmd.index("-preset") + 1], ENCODING_PROFILES["fast"]["preset"])
+        self.assertIn("-threads", cmd)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.encoding_policy import EncodingPolicy
+from utils.ffmpeg import FFmpegHelper
+from config import ENCODING_PROFILES, AUTO_PROFILE_BUSY_QUEUE, FFMPEG_PRESET, FFMPEG_CRF
+
+
+class TestEncodingPolicy(unittest.TestCase):
+
+    def _auto(self, queued, downloads=0):
+        with patch('services.encoding_policy.SessionLocal', MagicMock()), \
+             patch('services.encoding_policy.job_executor') as executor, \
+             patch('services.encoding_policy.download_executor') as download_executor:
+            executor.queue_depth.return_value = queued
+            download_executor.queue_depth.return_value = downloads
+            return EncodingPolicy.resolve('auto')
+
+    def test_named_profiles_are_kept(self):
+        for name in ENCODING_PROFILES:
+            self.assertEqual(EncodingPolicy.resolve(name), name)
+
+    def test_auto_follows_load(self):
+        self.assertEqual(self._auto(0), 'balanced')
+        self.assertEqual(self._auto(AUTO_PROFILE_BUSY_QUEUE - 1), 'balanced')
+        self.assertEqual(self._auto(AUTO_PROFILE_BUSY_QUEUE), 'fast')
+
+    def test_auto_counts_queued_downloads(self):
+        self.assertEqual(self._auto(1, downloads=AUTO_PROFILE_BUSY_QUEUE - 1), 'fast')
+
+    def test_idle_default_is_the_previous_baseline(self):
+        self.assertEqual(FFmpegHelper.encoding_args(self._auto(0)),
+                         ["-preset", FFMPEG_PRESET, "-crf", FFMPEG_CRF])
+        self.assertEqual((FFMPEG_PRESET, FFMPEG_CRF), ("medium", "23"))
+
+    def test_encoding_args(self):
+        fast = ENCODING_PROFILES['fast']
+        self.assertEqual(FFmpegHelper.encoding_args('fast'), ["-preset", fast["preset"], "-crf", fast["crf"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import sys
+import os
+import time
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from db_helpers import DatabaseTestCase
+from database import TikTokDownloadModel
+from utils.file_serving import send_download, content_disposition
+from services.video_service import VideoService
+
+
+class TestSendDownload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        with open(os.path.join(self.directory, "tiktok_clip.mp4"), "wb") as f:
+            f.write(bytes(range(256)) * 4)
+
+        self.app = Flask(__name__)
+
+        @self.app.route('/dl/<path:filename>')
+        def dl(filename):
+            return send_download(self.directory, filename) or ("missing", 404)
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_range_request_is_partial(self):
+        response = self.client.get('/dl/tiktok_clip.mp4', headers={"Range": "bytes=100-199"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, (bytes(range(256)) * 4)[100:200])
+        self.assertEqual(response.headers["Content-Range"], "bytes 100-199/1024")
+        response.close()
+
+    def test_etag_revalidation(self):
+        response = self.client.get('/dl/tiktok_clip.mp4')
+        etag = response.headers["ETag"]
+        response.close()
+
+        response = self.client.get('/dl/tiktok_clip.mp4', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        response.close()
+        # Still there for a second download
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "tiktok_clip.mp4")))
+
+    def test_path_outside_directory_is_refused(self):
+        with self.app.test_request_context():
+            self.assertIsNone(send_download(self.directory, "../etc/passwd"))
+            self.assertIsNone(send_download(self.directory, "missing.mp4"))
+
+    def test_x_accel_mode(self):
+        with self.app.test_request_context(), \
+                patch('utils.file_serving.FILE_SERVING_MODE', 'x-accel'), \
+                patch('utils.file_serving.X_ACCEL_LOCATIONS', {self.directory: "/_protected/outputs/"}):
+            response = send_download(self.directory, "tiktok_clip.mp4", "vidéo été.mp4")
+        self.assertEqual(response.headers["X-Accel-Redirect"], "/_protected/outputs/tiktok_clip.mp4")
+        self.assertEqual(response.mimetype, "video/mp4")
+        self.assertEqual(response.get_data(), b"")
+        self.assertIn("filename*=UTF-8''vid%C3%A9o%20%C3%A9t%C3%A9.mp4", response.headers["Content-Disposition"])
+
+    def test_content_disposition_plain_name(self):
+        self.assertEqual(content_disposition("clip.mp4"), 'attachment; filename="clip.mp4"')
+
+
+class TestSweepTemporaryOutputs(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.video_service',)
+
+    def test_only_old_temporary_files_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            old = time.time() - 7200
+            for name, mtime in (("tiktok_old.mp4", old), ("frame_x_first.jpg", old),
+                                ("tiktok_new.mp4", None), ("segment_old.mp4", old)):
+                path = os.path.join(directory, name)
+                open(path, "wb").close()
+                if mtime:
+                    os.utime(path, (mtime, mtime))
+
+            with patch('services.video_service.OUTPUT_DIR', directory), \
+                    patch('services.video_service.TEMPORARY_OUTPUT_RETENTION', 3600):
+                self.assertEqual(VideoService.sweep_temporary_outputs(), 2)
+            self.assertEqual(sorted(os.listdir(directory)), ["segment_old.mp4", "tiktok_new.mp4"])
+
+    def test_social_downloads_are_found_by_history_row(self):
+        with tempfile.TemporaryDirectory() as directory:
+            old = time.time() - 7200
+            path = os.path.join(directory, "Some_video_title.mp4")
+            open(path, "wb").close()
+            os.utime(path, (old, old))
+
+            self.add_rows(TikTokDownloadModel(id="d1", url="u", filename="Some_video_title.mp4", path=path,
+                                              created_at=datetime.utcnow() - timedelta(hours=2)))
+
+            with patch('services.video_service.OUTPUT_DIR', directory), \
+                    patch('services.video_service.TEMPORARY_OUTPUT_RETENTION', 3600):
+                self.assertEqual(VideoService.sweep_temporary_outputs(), 1)
+            self.assertFalse(os.path.exists(path))
+
+        db = self.Session()
+        self.assertIsNotNone(db.query(TikTokDownloadModel).first().swept_at)
+        db.close()
+
+    def test_history_rows_with_a_live_file_are_kept_in_the_scan(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "Rewritten.mp4")
+            open(path, "wb").close()
+            self.add_rows(TikTokDownloadModel(id="d1", url="u", filename="Rewritten.mp4", path=path,
+                                              created_at=datetime.utcnow() - timedelta(hours=2)),
+                          TikTokDownloadModel(id="d2", url="u", filename="Gone.mp4",
+                                              path=os.path.join(directory, "Gone.mp4"),
+                                              created_at=datetime.utcnow() - timedelta(hours=2)))
+
+            with patch('services.video_service.OUTPUT_DIR', directory), \
+                    patch('services.video_service.TEMPORARY_OUTPUT_RETENTION', 3600):
+                self.assertEqual(VideoService.sweep_temporary_outputs(), 0)
+            self.assertTrue(os.path.exists(path))
+
+        db = self.Session()
+        swept = {row.id: row.swept_at for row in db.query(TikTokDownloadModel)}
+        db.close()
+        self.assertIsNone(swept["d1"])
+        self.assertIsNotNone(swept["d2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import io
+import json
+import zipfile
+import tempfile
+from unittest.mock import patch
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from db_helpers import DatabaseTestCase
+from database import JobModel
+from routes.jobs import jobs_bp
+
+
+class TestJobArchive(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.video_service',)
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        for name, size in (("clip_part001.mp4", 3000), ("clip_part002.mp4", 5000)):
+            with open(os.path.join(self.tmp.name, name), "wb") as f:
+                f.write(os.urandom(size))
+
+        outputs = ["clip_part001.mp4", "clip_part002.mp4", "clip_part003.mp4"]
+        self.add_rows(
+            JobModel(id="job-1", type='split', status='completed', progress=100,
+                     outputs=json.dumps(outputs),
+                     segments=json.dumps([{"output": name, "start": i * 30.0, "duration": 30.0}
+                                          for i, name in enumerate(outputs)])),
+            JobModel(id="job-2", type='split', status='processing', progress=40),
+        )
+
+        self.patchers = [
+            patch('services.video_service.OUTPUT_DIR', self.tmp.name),
+        ]
+        for p in self.patchers:
+            p.start()
+
+        app = Flask(__name__)
+        app.register_blueprint(jobs_bp)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_archive_contains_segments_and_manifest(self):
+        response = self.client.get('/api/jobs/job-1/archive')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/zip')
+        self.assertIn('clipflow_job-1.zip', response.headers['Content-Disposition'])
+
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ["manifest.json", "clip_part001.mp4", "clip_part002.mp4"])
+        self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()))
+        with open(os.path.join(self.tmp.name, "clip_part002.mp4"), "rb") as f:
+            self.assertEqual(archive.read("clip_part002.mp4"), f.read())
+
+        manifest = json.loads(archive.read("manifest.json"))
+        self.assertEqual([(s["index"], s["start"], s["duration"]) for s in manifest["segments"]],
+                         [(1, 0.0, 30.0), (2, 30.0, 30.0)])
+        self.assertEqual(manifest["missing"], ["clip_part003.mp4"])
+
+    def test_unfinished_or_unknown_job(self):
+        self.assertEqual(self.client.get('/api/jobs/job-2/archive').status_code, 400)
+        self.assertEqual(self.client.get('/api/jobs/nope/archive').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import json
+from unittest.mock import patch
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from db_helpers import DatabaseTestCase
+from database import JobModel
+from services.job_events import JobEventBus, RESYNC, job_events
+from routes.jobs import jobs_bp
+
+
+class TestJobEventBus(unittest.TestCase):
+
+    def test_events_reach_every_subscriber(self):
+        bus = JobEventBus(max_clients=5, queue_size=10)
+        first, second = bus.subscribe(), bus.subscribe()
+        bus.publish({"id": "a", "progress": 10})
+
+        self.assertEqual(first.get_nowait(), {"id": "a", "progress": 10})
+        self.assertEqual(second.get_nowait(), {"id": "a", "progress": 10})
+
+        bus.unsubscribe(second)
+        bus.publish({"id": "a", "progress": 20})
+        self.assertEqual(first.get_nowait()["progress"], 20)
+        self.assertTrue(second.empty())
+
+    def test_client_limit(self):
+        bus = JobEventBus(max_clients=1)
+        self.assertIsNotNone(bus.subscribe())
+        self.assertIsNone(bus.subscribe())
+
+    def test_stalled_subscriber_gets_resync(self):
+        bus = JobEventBus(queue_size=2)
+        subscription = bus.subscribe()
+        for i in range(3):
+            bus.publish({"id": "a", "progress": i})
+
+        self.assertIs(subscription.get_nowait(), RESYNC)
+        self.assertTrue(subscription.empty())
+
+    def test_notifications_from_this_process_are_ignored(self):
+        bus = JobEventBus()
+        subscription = bus.subscribe()
+
+        bus._receive(json.dumps({"origin": bus.origin, "event": {"id": "a"}}))
+        self.assertTrue(subscription.empty())
+
+        bus._receive(json.dumps({"origin": "other:1", "event": {"id": "b"}}))
+        self.assertEqual(subscription.get_nowait(), {"id": "b"})
+
+
+class TestJobStream(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.video_service',)
+
+    def setUp(self):
+        super().setUp()
+        self.add_rows(JobModel(id="job-1", type='split', status='processing', progress=5))
+
+        self.patchers = [
+            patch('routes.jobs.JOB_STREAM_MAX_SECONDS', 0.5),
+            patch('routes.jobs.JOB_STREAM_KEEPALIVE', 0.1),
+        ]
+        for p in self.patchers:
+            p.start()
+
+        app = Flask(__name__)
+        app.register_blueprint(jobs_bp)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+
+    def test_stream_sends_snapshot_then_changes(self):
+        response = self.client.get('/api/jobs/stream', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+
+        chunks = response.response
+        self.assertTrue(next(chunks).startswith(b"retry:"))
+        snapshot = next(chunks).decode()
+        self.assertTrue(snapshot.startswith("event: snapshot\n"))
+        self.assertEqual(json.loads(snapshot.split("data: ", 1)[1])[0]["id"], "job-1")
+
+        job_events.publish({"id": "job-1", "progress": 50})
+        update = next(chunks).decode()
+        self.assertTrue(update.startswith("event: job\n"))
+        self.assertEqual(json.loads(update.split("data: ", 1)[1])["progress"], 50)
+
+        rest = b"".join(chunks)
+        self.assertIn(b": keepalive", rest)
+        self.assertEqual(job_events.subscriber_count(), 0)
+
+    def test_large_notification_is_reloaded(self):
+        response = self.client.get('/api/jobs/stream', buffered=False)
+        chunks = response.response
+        next(chunks)
+        next(chunks)
+
+        job_events.publish({"id": "job-1", "reload": True})
+        update = next(chunks).decode()
+        self.assertEqual(json.loads(update.split("data: ", 1)[1])["status"], "processing")
+        b"".join(chunks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_helpers import DatabaseTestCase
+from database import JobModel
+from services.job_executor import JobExecutor
+from config import JOB_HEARTBEAT_TIMEOUT, JOB_MAX_ATTEMPTS
+
+
+class TestJobExecutor(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.job_executor',)
+
+    def setUp(self):
+        super().setUp()
+        self.executor = self._executor()
+
+    def _executor(self, **kwargs):
+        executor = JobExecutor(max_workers=1, queue_limit=2, **kwargs)
+        executor.register('split', lambda job_id: None)
+        return executor
+
+    def _add(self, job_id, status='pending', minutes_ago=0, **fields):
+        self.add_rows(JobModel(id=job_id, type='split', status=status,
+                               created_at=datetime.utcnow() - timedelta(minutes=minutes_ago), **fields))
+
+    def _job(self, job_id):
+        db = self.Session()
+        try:
+            return db.query(JobModel).filter(JobModel.id == job_id).first()
+        finally:
+            db.close()
+
+    def _stale(self):
+        return datetime.utcnow() - timedelta(seconds=JOB_HEARTBEAT_TIMEOUT + 5)
+
+    def test_admit_until_queue_limit(self):
+        db = self.Session()
+        try:
+            self._add("a")
+            self.assertTrue(self.executor.admit(db))
+            self._add("b")
+            self.assertFalse(self.executor.admit(db))
+        finally:
+            db.close()
+
+    def test_admit_ignores_other_job_types_and_running_jobs(self):
+        self.add_rows(JobModel(id="social", type='social', status='pending'))
+        self._add("running", status='processing')
+        self._add("a")
+        db = self.Session()
+        try:
+            self.assertEqual(self.executor.queue_depth(db), 1)
+            self.assertTrue(self.executor.admit(db))
+        finally:
+            db.close()
+
+    def test_claim_takes_oldest_and_marks_it(self):
+        self._add("new", minutes_ago=1)
+        self._add("old", minutes_ago=5)
+
+        self.assertEqual(self.executor._claim_next(), ("old", 'split'))
+        job = self._job("old")
+        self.assertEqual(job.status, 'processing')
+        self.assertEqual(job.worker_id, self.executor.worker_id)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.heartbeat_at)
+
+    def test_two_claimers_one_winner(self):
+        self._add("only")
+        other = self._executor()
+        won = []
+
+        # The other claimer takes the job between our read of the queue and our UPDATE
+        def claim_first(db, lane):
+            won.append(other._claim_next())
+            return False
+        self.executor._lane_full = claim_first
+
+        self.assertIsNone(self.executor._claim_next())
+        self.assertEqual(won, [("only", 'split')])
+        self.assertEqual(self._job("only").attempts, 1)
+
+    def test_lane_cap(self):
+        executor = self._executor(lane_limits={'default': 1})
+        self._add("running", status='processing', lane='tiktok')
+        self._add("waiting", lane='tiktok')
+
+        self.assertIsNone(executor._claim_next())
+        self.assertEqual(self._job("waiting").status, 'pending')
+
+    def test_stale_heartbeat_is_requeued(self):
+        self._add("orphan", status='processing', heartbeat_at=self._stale(), attempts=1, progress=40,
+                  worker_id="gone:1")
+
+        self.assertEqual(self.executor.recover_orphans(), 1)
+        job = self._job("orphan")
+        self.assertEqual((job.status, job.progress, job.worker_id), ('pending', 0, None))
+
+    def test_fresh_heartbeat_is_left_alone(self):
+        self._add("alive", status='processing', heartbeat_at=datetime.utcnow(), attempts=1)
+
+        self.assertEqual(self.executor.recover_orphans(), 0)
+        self.assertEqual(self._job("alive").status, 'processing')
+
+    def test_too_many_attempts_is_an_error(self):
+        self._add("flaky", status='processing', heartbeat_at=self._stale(), attempts=JOB_MAX_ATTEMPTS)
+
+        self.assertEqual(self.executor.recover_orphans(), 0)
+        job = self._job("flaky")
+        self.assertEqual(job.status, 'error')
+        self.assertEqual(job.error, 'Job was interrupted too many times')
+
+    def test_locally_running_job_is_skipped(self):
+        self._add("mine", status='processing', heartbeat_at=self._stale(), attempts=1)
+        self.executor._running["mine"] = 'split'
+
+        self.assertEqual(self.executor.recover_orphans(), 0)
+        self.assertEqual(self._job("mine").status, 'processing')
+
+    def test_heartbeat_refreshes_running_jobs(self):
+        stale = self._stale()
+        self._add("mine", status='processing', heartbeat_at=stale)
+        self._add("theirs", status='processing', heartbeat_at=stale)
+        self.executor._running["mine"] = 'split'
+
+        self.executor._heartbeat()
+
+        self.assertGreater(self._job("mine").heartbeat_at, stale)
+        self.assertEqual(self._job("theirs").heartbeat_at, stale)
+        self.assertEqual(self.executor.recover_orphans(), 1)
+        self.assertEqual(self._job("mine").status, 'processing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg import FFmpegHelper
+
+
+class TestKeyframeSnapping(unittest.TestCase):
+    def test_cuts_move_to_nearest_keyframe(self):
+        keyframes = [0.0, 2.1, 4.0, 9.8, 12.0, 20.4]
+        snapped = FFmpegHelper.snap_cut_points([10.0, 20.0], keyframes, tolerance=1.0)
+        self.assertEqual(snapped, [9.8, 20.4])
+
+    def test_cut_without_keyframe_in_tolerance_returns_none(self):
+        keyframes = [0.0, 5.0, 15.0]
+        self.assertIsNone(FFmpegHelper.snap_cut_points([10.0], keyframes, tolerance=2.0))
+
+    def test_cuts_snapping_to_same_keyframe_are_merged(self):
+        keyframes = [0.0, 10.0, 30.0]
+        snapped = FFmpegHelper.snap_cut_points([1.0, 9.0, 11.0], keyframes, tolerance=1.5)
+        self.assertEqual(snapped, [10.0])
+
+    @patch('utils.ffmpeg.FFmpegHelper.get_keyframes')
+    def test_plan_reports_actual_boundaries(self, mock_keyframes):
+        mock_keyframes.return_value = [0.0, 9.9, 20.2, 29.9]
+        plan = FFmpegHelper.plan_keyframe_segments("in.mp4", 10, 35.0, tolerance=0.5)
+        starts = [round(start, 3) for start, _ in plan]
+        durations = [round(duration, 3) for _, duration in plan]
+        self.assertEqual(starts, [0.0, 9.9, 20.2, 29.9])
+        self.assertEqual(durations, [9.9, 10.3, 9.7, 5.1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+import subprocess
+import sys
+import os
+import tempfile
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg import FFmpegHelper
+
+
+def probe(width=1920, height=1080, rate="30/1", audio=True, duration="10.0"):
+    streams = [{
+        "index": 0, "codec_type": "video", "codec_name": "h264", "profile": "High",
+        "width": width, "height": height, "pix_fmt": "yuv420p",
+        "avg_frame_rate": rate, "time_base": "1/15360",
+    }]
+    if audio:
+        streams.append({
+            "index": 1, "codec_type": "audio", "codec_name": "aac",
+            "sample_rate": "48000", "channels": 2, "channel_layout": "stereo",
+        })
+    return {"streams": streams, "format": {"duration": duration}}
+
+
+class TestMergeAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.probes = {}
+
+    def _inputs(self, probes):
+        files = []
+        for i, info in enumerate(probes):
+            path = os.path.join(self.tmp.name, f"clip_{i}.mp4")
+            open(path, "wb").close()
+            self.probes[path] = info
+            files.append(path)
+        return files
+
+    def _get_info(self, path):
+        return self.probes.get(path, probe(duration="100.0"))
+
+    def test_dominant_signature_and_outliers(self):
+        files = self._inputs([probe(), probe(width=1280, height=720), probe(), probe(audio=False)])
+        with patch.object(FFmpegHelper, 'get_video_info', side_effect=self._get_info):
+            target, outliers = FFmpegHelper.analyze_merge_inputs(files)
+        self.assertEqual((target["width"], target["height"]), (1920, 1080))
+        self.assertEqual(outliers, [1, 3])
+
+    def test_unprobeable_input_disables_analysis(self):
+        files = self._inputs([probe(), {}])
+        with patch.object(FFmpegHelper, 'get_video_info', side_effect=self._get_info):
+            self.assertIsNone(FFmpegHelper.analyze_merge_inputs(files))
+
+    def test_missing_audio_gets_silent_track(self):
+        files = self._inputs([probe(), probe(audio=False)])
+        with patch.object(FFmpegHelper, 'get_video_info', side_effect=self._get_info):
+            cmd = FFmpegHelper._normalize_cmd(files[1], "out.mp4", FFmpegHelper.stream_signature(probe()))
+        self.assertIn("anullsrc=channel_layout=stereo:sample_rate=48000", cmd)
+        self.assertIn("1:a:0", cmd)
+        self.assertIn("-shortest", cmd)
+
+    def test_merge_transcodes_only_outliers(self):
+        files = self._inputs([probe()] * 9 + [probe(width=1280, height=720)])
+        commands = []
+
+        def fake_run(cmd, timeout, progress=None, task=None, offset=0.0):
+            commands.append(cmd)
+            open(cmd[-1], "wb").close()
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        with patch.object(FFmpegHelper, 'get_video_info', side_effect=self._get_info), \
+             patch.object(FFmpegHelper, '_run', side_effect=fake_run):
+            output = os.path.join(self.tmp.name, "merged.mp4")
+            self.assertTrue(FFmpegHelper.merge_videos_lossless(files, output, self.tmp.name))
+
+        transcodes = [c for c in commands if "-c:v" in c]
+        self.assertEqual(len(transcodes), 1)
+        self.assertEqual(transcodes[0][transcodes[0].index("-i") + 1], files[9])
+
+        with open(os.path.join(self.tmp.name, "concat_list.txt")) as f:
+            listed = f.read()
+        self.assertIn("normalized_9.mp4", listed)
+        self.assertIn("clip_0.mp4", listed)
+
+
+if __name__ == '__main__':
+    unittest.main()
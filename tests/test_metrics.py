@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.metrics import MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_renders_labels(self):
+        counter = self.registry.counter("bytes_total", "Bytes", ("direction",))
+        counter.inc(10, direction="read")
+        counter.inc(5, direction="read")
+        counter.inc(2, direction='wr"ite')
+
+        text = self.registry.render()
+        self.assertIn("# TYPE bytes_total counter", text)
+        self.assertIn('bytes_total{direction="read"} 15', text)
+        self.assertIn('bytes_total{direction="wr\\"ite"} 2', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, route="a")
+
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{route="a",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="a",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{route="a",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum{route="a"} 4.05', text)
+        self.assertIn('latency_seconds_count{route="a"} 4', text)
+
+    def test_wrong_labels_are_rejected(self):
+        histogram = self.registry.histogram("stage_seconds", "Stage", ("type", "stage"))
+        with self.assertRaises(ValueError):
+            histogram.observe(1.0, type="split")
+
+    def test_collectors_run_before_render(self):
+        gauge = self.registry.gauge("queue_depth", "Queue")
+        self.registry.add_collector(lambda: gauge.set(7))
+        self.assertIn("queue_depth 7", self.registry.render())
+
+    def test_failing_collector_does_not_break_scrape(self):
+        gauge = self.registry.gauge("up", "Up")
+        gauge.set(1)
+        self.registry.add_collector(lambda: 1 / 0)
+        self.assertIn("up 1", self.registry.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_helpers import DatabaseTestCase
+from database import JobModel, JobArchiveModel
+from services.video_service import VideoService
+from utils.pagination import encode_cursor, decode_cursor, page_args
+
+
+class TestPagination(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.video_service',)
+
+    def setUp(self):
+        super().setUp()
+        self.now = datetime.utcnow()
+        db = self.Session()
+        for i in range(7):
+            # Pairs of jobs share a timestamp so the id tie-break is exercised
+            db.add(JobModel(id=f"job-{i}", type='split' if i % 2 else 'merge',
+                            status='completed' if i < 5 else 'pending',
+                            created_at=self.now - timedelta(minutes=i // 2)))
+        db.commit()
+        db.close()
+
+    def test_cursor_round_trip(self):
+        created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+        self.assertEqual(decode_cursor(encode_cursor(created_at, "abc")), (created_at, "abc"))
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor")
+
+    def test_pages_cover_every_job_once(self):
+        seen = []
+        cursor = None
+        while True:
+            jobs, cursor = VideoService.list_jobs(cursor=cursor, limit=3)
+            seen += [j["id"] for j in jobs]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_filters(self):
+        jobs, cursor = VideoService.list_jobs(status='pending')
+        self.assertEqual({j["id"] for j in jobs}, {"job-5", "job-6"})
+        self.assertIsNone(cursor)
+
+        jobs, _ = VideoService.list_jobs(job_type='split')
+        self.assertTrue(all(j["type"] == 'split' for j in jobs))
+
+        jobs, _ = VideoService.list_jobs(since=self.now - timedelta(seconds=30))
+        self.assertEqual({j["id"] for j in jobs}, {"job-0", "job-1"})
+
+    def test_page_args_validation(self):
+        self.assertEqual(page_args({"limit": "500"}, 50, 200)[0]["limit"], 200)
+        self.assertIsNotNone(page_args({"limit": "0"}, 50, 200)[1])
+        self.assertIsNotNone(page_args({"cursor": "%%%"}, 50, 200)[1])
+        self.assertIsNotNone(page_args({"since": "yesterday"}, 50, 200)[1])
+
+    @patch('services.video_service.JOB_RETENTION_DAYS', 30 / 86400)
+    def test_old_finished_jobs_are_archived(self):
+        archived = VideoService.archive_old_jobs()
+
+        # job-2..job-4 are finished and a minute or more old; job-5/6 are still pending
+        self.assertEqual(archived, 3)
+        db = self.Session()
+        self.assertEqual(db.query(JobArchiveModel).count(), 3)
+        self.assertEqual(db.query(JobModel).count(), 4)
+        db.close()
+
+        job = VideoService.get_job("job-3")
+        self.assertEqual(job["status"], 'completed')
+
+
+if __name__ == '__main__':
+    unittest.main()
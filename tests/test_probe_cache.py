@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import json
+import sys
+import os
+import tempfile
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg import FFmpegHelper
+from utils.probe_cache import ProbeCache
+
+PROBE_OUTPUT = {
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+         "avg_frame_rate": "30000/1001"},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac"},
+    ],
+    "format": {"duration": "12.5", "bit_rate": "4000000"},
+    "packets": [
+        {"stream_index": 0, "pts_time": "0.000000", "flags": "K__"},
+        {"stream_index": 1, "pts_time": "0.010000", "flags": "K__"},
+        {"stream_index": 0, "pts_time": "0.033367", "flags": "___"},
+        {"stream_index": 0, "pts_time": "2.002000", "flags": "K__"},
+        {"stream_index": 0, "pts_time": "4.004000", "flags": "K__"},
+    ],
+}
+
+
+class TestProbeCache(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".mp4")
+        os.write(handle, b"video")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    @patch('utils.ffmpeg.probe_cache', new_callable=ProbeCache)
+    @patch('utils.ffmpeg.FFmpegHelper._spawn')
+    def test_file_is_probed_once(self, mock_run, _cache):
+        mock_run.return_value = MagicMock(returncode=0, stdout=json.dumps(PROBE_OUTPUT))
+
+        FFmpegHelper.get_video_info(self.path)
+        FFmpegHelper.get_duration(self.path)
+        summary = FFmpegHelper.get_media_summary(self.path)
+
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(summary["duration"], 12.5)
+        self.assertEqual(summary["fps"], 29.97)
+        self.assertEqual(summary["audio_codec"], "aac")
+        self.assertEqual(summary["keyframe_interval"], 2.002)
+
+    def test_changed_file_misses(self):
+        cache = ProbeCache()
+        cache.put(self.path, {"format": {}})
+        self.assertIsNotNone(cache.get(self.path))
+
+        with open(self.path, "ab") as f:
+            f.write(b"more bytes")
+        self.assertIsNone(cache.get(self.path))
+
+    def test_exported_entry_reloads_only_for_same_file(self):
+        cache = ProbeCache()
+        cache.put(self.path, {"format": {"duration": "1"}})
+        entry = cache.export(self.path)
+
+        fresh = ProbeCache()
+        self.assertTrue(fresh.load(self.path, entry))
+        self.assertEqual(fresh.get(self.path), {"format": {"duration": "1"}})
+
+        entry["size"] += 1
+        self.assertFalse(ProbeCache().load(self.path, entry))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.progress import ProgressTracker, parse_progress_block
+
+
+class TestProgressParsing(unittest.TestCase):
+    def test_parses_out_time_and_speed(self):
+        block = ["frame=120\n", "out_time_us=4000000\n", "out_time=00:00:04.000000\n", "speed=1.52x\n", "progress=continue\n"]
+        self.assertEqual(parse_progress_block(block), (4.0, 1.52))
+
+    def test_speed_not_available(self):
+        block = ["out_time=00:01:02.500000\n", "speed=N/A\n", "progress=continue\n"]
+        self.assertEqual(parse_progress_block(block), (62.5, None))
+
+
+class TestProgressTracker(unittest.TestCase):
+    def test_aggregates_parallel_tasks(self):
+        updates = []
+        tracker = ProgressTracker(30.0, lambda *args: updates.append(args), interval=0)
+        for task in range(3):
+            tracker.add_task(task, 10.0)
+
+        tracker.update(0, 5.0, speed=2.0)
+        tracker.update(1, 4.0, speed=1.0)
+        percent, speed, eta = updates[-1]
+        self.assertEqual(percent, 30)
+        self.assertEqual(speed, 3.0)
+        self.assertAlmostEqual(eta, 7.0)
+
+    def test_task_progress_is_capped_and_never_reports_100(self):
+        updates = []
+        tracker = ProgressTracker(10.0, lambda *args: updates.append(args), interval=0)
+        tracker.add_task(0, 10.0)
+        tracker.update(0, 12.0, speed=1.0)
+        tracker.finish_task(0)
+        self.assertEqual(updates[-1][0], 99)
+
+    def test_updates_are_throttled(self):
+        updates = []
+        tracker = ProgressTracker(10.0, lambda *args: updates.append(args), interval=60)
+        tracker.add_task(0, 10.0)
+        for out_time in range(1, 6):
+            tracker.update(0, float(out_time), speed=1.0)
+        self.assertEqual(len(updates), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
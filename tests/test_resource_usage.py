@@ -0,0 +1,54 @@
+import unittest
+import subprocess
+import sys
+import os
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg import FFmpegHelper
+from utils.resource_usage import track_resources
+
+BURN_CPU = "sum(i * i for i in range(300000)); print('done')"
+
+
+class TestResourceUsage(unittest.TestCase):
+
+    def test_child_usage_is_charged_to_tracker(self):
+        with track_resources() as usage:
+            result = FFmpegHelper._spawn([sys.executable, "-c", BURN_CPU], 30)
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout.strip(), "done")
+
+        totals = usage.to_dict()
+        tool = os.path.basename(sys.executable)
+        self.assertEqual(totals["processes"], 1)
+        self.assertGreater(totals["userCpuSeconds"] + totals["systemCpuSeconds"], 0)
+        self.assertGreater(totals["maxRssMb"], 0)
+        self.assertGreater(totals["wallSeconds"], 0)
+        self.assertEqual(totals["tools"][tool]["processes"], 1)
+
+    def test_exit_code_is_kept(self):
+        result = FFmpegHelper._spawn([sys.executable, "-c", "import sys; sys.exit(3)"], 30)
+        self.assertEqual(result.returncode, 3)
+
+    def test_children_of_pool_threads_are_counted(self):
+        def run(index):
+            return str(FFmpegHelper._spawn([sys.executable, "-c", "pass"], 30).returncode)
+
+        with track_resources() as usage:
+            results = FFmpegHelper._map_parallel(run, [(i,) for i in range(3)])
+
+        self.assertEqual(results, ["0", "0", "0"])
+        self.assertEqual(usage.to_dict()["processes"], 3)
+
+    def test_timeout_is_raised_and_accounted(self):
+        with track_resources() as usage:
+            with self.assertRaises(subprocess.TimeoutExpired):
+                FFmpegHelper._spawn([sys.executable, "-c", "import time; time.sleep(10)"], 0.5)
+        self.assertEqual(usage.to_dict()["processes"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+import subprocess
+import sys
+import os
+import tempfile
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg import FFmpegHelper
+
+
+def fake_segment_muxer(returncode=0, segments=3):
+    """Stand-in for FFmpegHelper._run writing `segments` files the way the segment muxer does"""
+    def run(cmd, timeout, progress=None, task=None, offset=0.0):
+        pattern = cmd[-1]
+        for i in range(1, segments + 1):
+            with open(pattern.replace("%%", "%") % i, "wb") as f:
+                f.write(b"segment")
+        return subprocess.CompletedProcess(cmd, returncode, "", "")
+    return run
+
+
+def option(cmd, name):
+    return cmd[cmd.index(name) + 1]
+
+
+class TestSinglePassSplit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pattern = os.path.join(self.tmp.name, "split_job_segment_{index}.mp4")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_segment_muxer_command(self):
+        with patch.object(FFmpegHelper, '_run', side_effect=fake_segment_muxer()) as run:
+            outputs = FFmpegHelper.split_video_single_pass("in.mp4", self.pattern, 10, 25.0)
+
+        cmd = run.call_args.args[0]
+        self.assertEqual(option(cmd, "-i"), "in.mp4")
+        self.assertEqual(option(cmd, "-f"), "segment")
+        self.assertEqual(option(cmd, "-segment_times"), "10.000000,20.000000")
+        self.assertEqual(option(cmd, "-segment_start_number"), "1")
+        self.assertEqual(option(cmd, "-force_key_frames"), "expr:eq(mod(n,30),0)")
+        self.assertEqual((option(cmd, "-c:v"), option(cmd, "-c:a")), ("libx264", "aac"))
+        self.assertNotIn("-vf", cmd)
+        self.assertEqual(cmd[-1], os.path.join(self.tmp.name, "split_job_segment_%d.mp4"))
+        self.assertEqual(outputs, [f"split_job_segment_{i}.mp4" for i in (1, 2, 3)])
+
+    def test_720p_adds_scale_filter(self):
+        with patch.object(FFmpegHelper, '_run', side_effect=fake_segment_muxer()) as run:
+            FFmpegHelper.split_video_single_pass("in.mp4", self.pattern, 10, 25.0, convert_720=True)
+        self.assertIn("scale=", option(run.call_args.args[0], "-vf"))
+
+    def test_failed_pass_removes_segments(self):
+        with patch.object(FFmpegHelper, '_run', side_effect=fake_segment_muxer(returncode=1)):
+            outputs = FFmpegHelper.split_video_single_pass("in.mp4", self.pattern, 10, 25.0)
+        self.assertEqual(outputs, [])
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_stream_copy_split_copies_both_streams(self):
+        plan = [(0.0, 9.9), (9.9, 10.3), (20.2, 4.8)]
+        with patch.object(FFmpegHelper, '_run', side_effect=fake_segment_muxer()) as run:
+            outputs = FFmpegHelper.split_video_stream_copy("in.mp4", self.pattern, plan)
+
+        cmd = run.call_args.args[0]
+        self.assertEqual(option(cmd, "-c"), "copy")
+        self.assertEqual(option(cmd, "-f"), "segment")
+        self.assertEqual(option(cmd, "-segment_times"), "9.900000,20.200000")
+        self.assertEqual(len(outputs), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch
+import shutil
+import subprocess
+import sys
+import os
+import tempfile
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.ffmpeg import FFmpegHelper
+
+
+def option(cmd, name):
+    return cmd[cmd.index(name) + 1]
+
+
+class TestSmartCutCommands(unittest.TestCase):
+    ENCODE_ARGS = ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-r", "30/1"]
+
+    def _cut(self, next_keyframe, start=3.0, duration=3.0):
+        with patch.object(FFmpegHelper, '_run_split_cmd', side_effect=lambda cmd, output, *args: output) as run:
+            output = FFmpegHelper._smart_cut_segment("in.mp4", "out.mp4", start, duration, next_keyframe,
+                                                     self.ENCODE_ARGS, "/tmp/smart_2")
+        self.assertEqual(output, "out.mp4")
+        return [call.args for call in run.call_args_list]
+
+    def test_head_is_encoded_video_only(self):
+        (head, _, _, _), _, _ = self._cut(next_keyframe=4.0)
+        self.assertEqual((option(head, "-ss"), option(head, "-t")), ("3.000000", "1.000000"))
+        self.assertIn("-an", head)
+        self.assertEqual(option(head, "-r"), "30/1")
+        self.assertEqual(option(head, "-f"), "mpegts")
+
+    def test_tail_is_copied_after_the_head(self):
+        _, (tail, _, _, _, offset), _ = self._cut(next_keyframe=4.0)
+        self.assertEqual((option(tail, "-ss"), option(tail, "-t")), ("4.000000", "2.000000"))
+        self.assertEqual(option(tail, "-c:v"), "copy")
+        self.assertIn("-an", tail)
+        self.assertEqual(option(tail, "-output_ts_offset"), "1.000000")
+        self.assertEqual(offset, 1.0)
+
+    def test_stitch_encodes_audio_of_whole_segment(self):
+        _, _, (stitch, _) = self._cut(next_keyframe=4.0)
+        self.assertEqual(stitch[stitch.index("-i") + 1], "concat:/tmp/smart_2_head.ts|/tmp/smart_2_tail.ts")
+        self.assertEqual((option(stitch, "-ss"), option(stitch, "-t")), ("3.000000", "3.000000"))
+        self.assertEqual([stitch[i + 1] for i, arg in enumerate(stitch) if arg == "-map"], ["0:v", "1:a?"])
+        self.assertEqual((option(stitch, "-c:v"), option(stitch, "-c:a")), ("copy", "aac"))
+
+    def test_no_keyframe_in_segment_encodes_it_whole(self):
+        (head, _, _, _), (stitch, _) = self._cut(next_keyframe=None)
+        self.assertEqual(option(head, "-t"), "3.000000")
+        self.assertEqual(stitch[stitch.index("-i") + 1], "concat:/tmp/smart_2_head.ts")
+
+    def test_cut_on_keyframe_is_a_plain_copy(self):
+        (cmd, _, _, _), = self._cut(next_keyframe=3.0)
+        self.assertEqual(option(cmd, "-c"), "copy")
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg/ffprobe not installed")
+class TestSmartCutOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source.mp4")
+        # 10s at 30fps with a keyframe every 2s, so 3s cuts mostly fall between keyframes
+        subprocess.run([
+            "ffmpeg", "-v", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc2=size=320x240:rate=30",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+            "-t", "10", "-c:v", "libx264", "-g", "60", "-keyint_min", "60", "-sc_threshold", "0",
+            "-pix_fmt", "yuv420p", "-c:a", "aac", self.source
+        ], check=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _probe(self, path, stream, entry):
+        result = subprocess.run(["ffprobe", "-v", "error", "-select_streams", stream,
+                                 "-show_entries", entry, "-of", "csv=p=0", path],
+                                capture_output=True, text=True, check=True)
+        return [float(value) for value in result.stdout.split() if value not in ("", "N/A")]
+
+    def test_segments_have_planned_duration_and_monotonic_timestamps(self):
+        pattern = os.path.join(self.tmp.name, "out_{index}.mp4")
+        outputs = FFmpegHelper.split_video_smart(self.source, pattern, 3, 10.0, self.tmp.name)
+        self.assertEqual(len(outputs), 4)
+
+        plan = FFmpegHelper.get_segment_plan(3, 10.0)
+        for output, (_, duration) in zip(outputs, plan):
+            path = os.path.join(self.tmp.name, output)
+            video_dts = self._probe(path, "v", "packet=dts_time")
+            self.assertTrue(all(b > a for a, b in zip(video_dts, video_dts[1:])), output)
+            audio_dts = self._probe(path, "a", "packet=dts_time")
+            self.assertTrue(all(b > a for a, b in zip(audio_dts, audio_dts[1:])), output)
+
+            self.assertAlmostEqual(self._probe(path, "v", "stream=duration")[0], duration, delta=0.1)
+            self.assertAlmostEqual(self._probe(path, "a", "stream=duration")[0], duration, delta=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,553 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+import threading
+from datetime import datetime, timedelta
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_helpers import DatabaseTestCase
+from database import JobModel, TikTokDownloadModel, StatsEventModel, BatchItemModel
+from services.job_executor import JobExecutor
+from utils import FFmpegHelper
+from services.social_service import SocialMediaService
+from utils.media_key import canonical_media_key
+from utils.scheduler import stream_encode_scheduler
+from config import TEMPORARY_OUTPUT_RETENTION
+
+
+class TestLaneLimits(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.job_executor',)
+
+    def setUp(self):
+        super().setUp()
+        self.executor = JobExecutor(max_workers=2, lane_limits={'default': 1, 'youtube': 2})
+        self.executor.register('social', lambda job_id: None)
+
+    def _add(self, job_id, lane, status='pending', minutes_ago=0):
+        self.add_rows(JobModel(id=job_id, type='social', status=status, lane=lane,
+                               created_at=datetime.utcnow() - timedelta(minutes=minutes_ago)))
+
+    def test_full_lane_is_skipped(self):
+        self._add("fb-running", 'facebook', status='processing')
+        self._add("fb-waiting", 'facebook', minutes_ago=5)
+        self._add("tt-waiting", 'tiktok', minutes_ago=1)
+
+        self.assertEqual(self.executor._claim_next(), ("tt-waiting", 'social'))
+        self.assertIsNone(self.executor._claim_next())
+
+    def test_platform_limit_overrides_default(self):
+        self._add("yt-running", 'youtube', status='processing')
+        self._add("yt-waiting", 'youtube')
+
+        self.assertEqual(self.executor._claim_next(), ("yt-waiting", 'social'))
+
+
+class TestSocialDownloadJob(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.social_service', 'services.video_service')
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source.mp4")
+        with open(self.source, "wb") as f:
+            f.write(os.urandom(200000))
+        self.outputs = os.path.join(self.tmp.name, "outputs")
+        os.makedirs(self.outputs)
+
+        self.patchers = [
+            patch('services.social_service.OUTPUT_DIR', self.outputs),
+            patch('services.social_service.PROGRESS_UPDATE_INTERVAL', 0),
+            # file:// URLs let yt-dlp run without network access
+            patch.object(SocialMediaService, 'get_platform_options',
+                         staticmethod(lambda platform, max_side=None: {'quiet': True, 'enable_file_urls': True})),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp.cleanup()
+
+    def _run_job(self, url, convert_720=False):
+        db = self.Session()
+        db.add(JobModel(id="job-1", type='social', status='processing', url=url, platform='tiktok', lane='tiktok',
+                        convert_720=convert_720))
+        db.commit()
+        db.close()
+
+        SocialMediaService._process_download("job-1")
+
+        db = self.Session()
+        try:
+            return db.query(JobModel).filter(JobModel.id == "job-1").first()
+        finally:
+            db.close()
+
+    def test_download_runs_in_child_and_completes_job(self):
+        job = self._run_job("file://" + self.source)
+
+        self.assertEqual(job.status, 'completed', job.error)
+        self.assertEqual(job.progress, 100)
+        media = json.loads(job.media)
+        self.assertEqual(media["filename"], "source.mp4")
+        self.assertEqual(job.output, "source.mp4")
+        self.assertTrue(os.path.exists(os.path.join(self.outputs, "source.mp4")))
+        self.assertEqual(json.loads(job.transfer)["downloadedBytes"], 200000)
+
+        db = self.Session()
+        self.assertEqual(db.query(TikTokDownloadModel).first().id, media["id"])
+        db.close()
+
+    def test_suitable_source_stream_skips_transcode(self):
+        with patch.object(SocialMediaService, 'meets_target', return_value=True), \
+                patch.object(SocialMediaService, 'convert_to_720p') as convert:
+            job = self._run_job("file://" + self.source, convert_720=True)
+
+        convert.assert_not_called()
+        media = json.loads(job.media)
+        self.assertEqual(media["resolution_path"], 'source')
+        self.assertTrue(media["converted_720p"])
+        self.assertEqual(media["filename"], "source_720p.mp4")
+
+    def test_unsuitable_source_stream_is_transcoded(self):
+        def fake_convert(input_path, output_path, profile):
+            shutil.copy(input_path, output_path)
+            return True
+
+        with patch.object(SocialMediaService, 'meets_target', return_value=False), \
+                patch.object(SocialMediaService, 'convert_to_720p', side_effect=fake_convert):
+            job = self._run_job("file://" + self.source, convert_720=True)
+
+        media = json.loads(job.media)
+        self.assertEqual(media["resolution_path"], 'transcode')
+        self.assertIsNotNone(media["encoding_profile"])
+
+    def test_streamed_conversion_skips_the_download(self):
+        info = {"title": "Clip", "duration": 12.0, "ext": "mp4", "width": 1920, "height": 1080,
+                "stream": {"url": "https://cdn.example.com/clip.mp4", "protocol": "https",
+                           "headers": {"User-Agent": "UA"}}}
+
+        def fake_encode(cmd, timeout, progress=None, task=None, scheduler=None, feed=None):
+            with open(cmd[-1], "wb") as f:
+                f.write(b"720p")
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        with patch.object(SocialMediaService, '_run_ytdlp', return_value=(info, None)) as run, \
+                patch.object(FFmpegHelper, '_run', side_effect=fake_encode) as encode:
+            job = self._run_job("https://www.tiktok.com/@user/video/1", convert_720=True)
+
+        self.assertEqual(job.status, 'completed', job.error)
+        self.assertEqual([c.kwargs["mode"] for c in run.call_args_list], ["resolve"])
+        cmd = encode.call_args.args[0]
+        # Stream URL and headers stay out of the command line
+        self.assertEqual(cmd[cmd.index("-i") + 1], "pipe:0")
+        self.assertNotIn("-headers", cmd)
+        self.assertFalse(any("cdn.example.com" in arg for arg in cmd))
+        self.assertIsNotNone(encode.call_args.kwargs["feed"])
+        self.assertIs(encode.call_args.kwargs["scheduler"], stream_encode_scheduler)
+        media = json.loads(job.media)
+        self.assertEqual((media["resolution_path"], media["filename"]), ('stream', "Clip_720p.mp4"))
+        self.assertTrue(media["converted_720p"])
+
+    def test_failed_stream_falls_back_to_download(self):
+        run_ytdlp = SocialMediaService._run_ytdlp
+
+        def run(url, options, on_progress=None, mode="download"):
+            if mode == "resolve":
+                return {"title": "Clip", "ext": "mp4", "stream": {"url": "https://cdn.example.com/x.mp4",
+                                                                   "protocol": "https", "headers": {}}}, None
+            return run_ytdlp(url, options, on_progress, mode)
+
+        def failed_encode(cmd, timeout, progress=None, task=None, scheduler=None, feed=None):
+            open(cmd[-1], "wb").close()
+            return subprocess.CompletedProcess(cmd, 1, "", "403 Forbidden")
+
+        def fake_convert(input_path, output_path, profile):
+            shutil.copy(input_path, output_path)
+            return True
+
+        with patch.object(SocialMediaService, '_run_ytdlp', side_effect=run), \
+                patch.object(FFmpegHelper, '_run', side_effect=failed_encode), \
+                patch.object(SocialMediaService, 'meets_target', return_value=False), \
+                patch.object(SocialMediaService, 'convert_to_720p', side_effect=fake_convert):
+            job = self._run_job("file://" + self.source, convert_720=True)
+
+        self.assertEqual(job.status, 'completed', job.error)
+        self.assertEqual(json.loads(job.media)["resolution_path"], 'transcode')
+        self.assertEqual(os.listdir(self.outputs), ["source_720p.mp4"])
+
+    def test_download_error_fails_job(self):
+        job = self._run_job("notaurl")
+
+        self.assertEqual(job.status, 'error')
+        self.assertIn("not a valid URL", job.error)
+
+
+class TestDownloadCache(DatabaseTestCase):
+
+    URL = "https://www.tiktok.com/@user/video/7234567890123456789?is_from_webapp=1"
+    SESSION_MODULES = ('services.social_service', 'services.video_service')
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patchers = [
+            patch('services.social_service.download_executor.submit'),
+            patch('services.social_service.download_executor.admit', return_value=True),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp.cleanup()
+
+    def _jobs(self):
+        db = self.Session()
+        try:
+            return db.query(JobModel).count()
+        finally:
+            db.close()
+
+    def test_canonical_key_ignores_url_variants(self):
+        self.assertEqual(canonical_media_key("https://youtu.be/dQw4w9WgXcQ?si=abc"),
+                         canonical_media_key("https://www.youtube.com/shorts/dQw4w9WgXcQ"))
+        self.assertEqual(canonical_media_key(self.URL), "tiktok:7234567890123456789")
+        self.assertEqual(canonical_media_key("https://fb.watch/abc/?mibextid=1", 'facebook'),
+                         canonical_media_key("https://www.fb.watch/abc", 'facebook'))
+
+    def test_identical_requests_join_the_running_download(self):
+        first, error = SocialMediaService.download_media(self.URL)
+        self.assertIsNone(error)
+        second, _ = SocialMediaService.download_media(self.URL.split("?")[0])
+        self.assertEqual(second["id"], first["id"])
+        self.assertTrue(second["coalesced"])
+
+        # Another 720p choice is another file
+        third, _ = SocialMediaService.download_media(self.URL, convert_720=True)
+        self.assertNotEqual(third["id"], first["id"])
+        self.assertEqual(self._jobs(), 2)
+
+    def test_recent_download_is_served_from_its_file(self):
+        path = os.path.join(self.tmp.name, "clip.mp4")
+        open(path, "wb").close()
+        db = self.Session()
+        db.add(TikTokDownloadModel(id="d1", url=self.URL, filename="clip.mp4", path=path, platform='TikTok',
+                                   media_key="tiktok:7234567890123456789", converted_720p=False))
+        db.commit()
+        db.close()
+
+        job, error = SocialMediaService.download_media(self.URL)
+        self.assertIsNone(error)
+        self.assertEqual(job["status"], 'completed')
+        self.assertTrue(job["cached"])
+        self.assertEqual(job["media"]["id"], "d1")
+
+        db = self.Session()
+        self.assertEqual(db.query(TikTokDownloadModel).first().hits, 1)
+        self.assertEqual(json.loads(db.query(JobModel).first().media)["filename"], "clip.mp4")
+        db.close()
+
+        # Gone from disk: downloaded again
+        os.remove(path)
+        job, _ = SocialMediaService.download_media(self.URL)
+        self.assertEqual(job["status"], 'pending')
+
+    def _counters(self):
+        db = self.Session()
+        try:
+            return {counter: amount for counter, amount in
+                    db.query(StatsEventModel.counter, StatsEventModel.amount).all()}
+        finally:
+            db.close()
+
+    def _add_download(self, **fields):
+        path = os.path.join(self.tmp.name, "clip.mp4")
+        open(path, "wb").close()
+        self.add_rows(TikTokDownloadModel(id="d1", url=self.URL, filename="clip.mp4", path=path,
+                                          media_key="tiktok:7234567890123456789", converted_720p=False,
+                                          **fields))
+
+    def test_lookups_have_their_own_counters(self):
+        SocialMediaService.download_media(self.URL)
+        self.assertEqual(self._counters(), {"download_cache_misses": 1})
+
+        self._add_download()
+        SocialMediaService.download_media(self.URL)
+        self.assertEqual(self._counters(), {"download_cache_misses": 1, "download_cache_hits": 1,
+                                            "total_tiktok_downloads": 1})
+
+    def test_hit_found_by_the_worker_is_counted(self):
+        SocialMediaService.download_media(self.URL)
+        db = self.Session()
+        job_id = db.query(JobModel.id).scalar()
+        db.query(StatsEventModel).delete()
+        db.commit()
+        db.close()
+        # Downloaded by another process while the job was queued
+        self._add_download()
+
+        SocialMediaService._process_download(job_id)
+        self.assertEqual(self._counters(), {"total_tiktok_downloads": 1, "download_cache_hits": 1})
+
+    def test_cache_ttl_leaves_time_to_fetch_before_the_sweep(self):
+        self._add_download(created_at=datetime.utcnow() - timedelta(seconds=TEMPORARY_OUTPUT_RETENTION // 2 + 60))
+        with patch('services.social_service.SOCIAL_CACHE_TTL', TEMPORARY_OUTPUT_RETENTION):
+            job, _ = SocialMediaService.download_media(self.URL)
+        self.assertEqual(job["status"], 'pending')
+
+    def test_expired_download_is_not_reused(self):
+        path = os.path.join(self.tmp.name, "clip.mp4")
+        open(path, "wb").close()
+        db = self.Session()
+        db.add(TikTokDownloadModel(id="d1", url=self.URL, filename="clip.mp4", path=path,
+                                   media_key="tiktok:7234567890123456789", converted_720p=False,
+                                   created_at=datetime.utcnow() - timedelta(days=2)))
+        db.commit()
+        db.close()
+
+        job, _ = SocialMediaService.download_media(self.URL)
+        self.assertEqual(job["status"], 'pending')
+
+
+class TestSocialBatch(DatabaseTestCase):
+
+    URLS = ["https://www.tiktok.com/@user/video/7234567890123456789",
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://example.com/not-a-platform"]
+    SESSION_MODULES = ('services.social_service', 'services.video_service', 'services.job_executor')
+
+    def setUp(self):
+        super().setUp()
+        self.patchers = [
+            patch('services.social_service.download_executor.submit'),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+
+    def _finish(self, job_id, status):
+        db = self.Session()
+        db.query(JobModel).filter(JobModel.id == job_id).update({JobModel.status: status})
+        db.commit()
+        SocialMediaService._refresh_batches(db, job_id)
+        db.close()
+
+    def test_urls_are_queued_as_social_jobs(self):
+        batch, error = SocialMediaService.create_batch(self.URLS + [self.URLS[0] + " "])
+        self.assertIsNone(error)
+        self.assertEqual(batch["status"], 'processing')
+        self.assertEqual(batch["total"], 3)
+        self.assertEqual(batch["counts"], {"pending": 2, "processing": 0, "completed": 0, "error": 1})
+        self.assertIsNone(batch["items"][2]["jobId"])
+        self.assertIn("URL not supported", batch["items"][2]["error"])
+
+        db = self.Session()
+        lanes = sorted(job.lane for job in db.query(JobModel).filter(JobModel.type == 'social'))
+        db.close()
+        self.assertEqual(lanes, ['tiktok', 'youtube'])
+
+    def test_batch_completes_with_its_items(self):
+        batch, _ = SocialMediaService.create_batch(self.URLS[:2])
+        first, second = (item["jobId"] for item in batch["items"])
+
+        self._finish(first, 'completed')
+        batch, _ = SocialMediaService.get_batch(batch["id"])
+        self.assertEqual((batch["status"], batch["progress"]), ('processing', 50))
+
+        self._finish(second, 'error')
+        db = self.Session()
+        row = db.query(JobModel).filter(JobModel.id == batch["id"]).first()
+        db.close()
+        self.assertEqual((row.status, row.progress), ('completed', 100))
+
+    def test_playlist_is_expanded_by_the_pool(self):
+        batch, error = SocialMediaService.create_batch(playlist="https://www.youtube.com/playlist?list=PL1")
+        self.assertIsNone(error)
+        self.assertEqual((batch["status"], batch["total"]), ('pending', 0))
+
+        entries = [{"url": "https://www.youtube.com/watch?v=aaaaaaaaaaa"},
+                   {"url": "https://www.youtube.com/watch?v=bbbbbbbbbbb"}]
+        with patch.object(SocialMediaService, '_run_ytdlp', return_value=(entries, None)) as run:
+            SocialMediaService._process_batch(batch["id"])
+        self.assertEqual(run.call_args.kwargs["mode"], "expand")
+
+        batch, _ = SocialMediaService.get_batch(batch["id"])
+        self.assertEqual(batch["status"], 'processing')
+        self.assertEqual([item["url"] for item in batch["items"]], [e["url"] for e in entries])
+
+    def _social_jobs(self):
+        db = self.Session()
+        try:
+            return db.query(JobModel).filter(JobModel.type == 'social').count()
+        finally:
+            db.close()
+
+    def _links(self):
+        db = self.Session()
+        try:
+            return db.query(BatchItemModel).count()
+        finally:
+            db.close()
+
+    def test_items_wait_for_room_in_the_download_queue(self):
+        urls = [f"https://youtu.be/video{i:06d}" for i in range(3)]
+        with patch('services.social_service.download_executor.queue_limit', 2):
+            batch, error = SocialMediaService.create_batch(urls)
+            self.assertIsNone(error)
+            self.assertEqual(self._social_jobs(), 2)
+            self.assertEqual(batch["counts"]["pending"], 3)
+            self.assertEqual([item["jobId"] is None for item in batch["items"]], [False, False, True])
+
+            # Nothing finished: still no room
+            SocialMediaService.feed_batches()
+            self.assertEqual(self._social_jobs(), 2)
+
+            self._finish(batch["items"][0]["jobId"], 'completed')
+            self.assertEqual(self._social_jobs(), 3)
+            batch, _ = SocialMediaService.get_batch(batch["id"])
+            self.assertTrue(all(item["jobId"] for item in batch["items"]))
+
+    def test_concurrent_feeders_link_each_item_once(self):
+        urls = [f"https://youtu.be/video{i:06d}" for i in range(3)]
+        enqueue = SocialMediaService._enqueue
+        raced = []
+
+        # The periodic task feeds the batch while a finishing job is feeding it too
+        def enqueue_after_other_feeder(*args, **kwargs):
+            if not raced:
+                raced.append(True)
+                SocialMediaService.feed_batches()
+            return enqueue(*args, **kwargs)
+
+        with patch('services.social_service.download_executor.queue_limit', 2):
+            batch, _ = SocialMediaService.create_batch(urls)
+            with patch.object(SocialMediaService, '_enqueue', side_effect=enqueue_after_other_feeder):
+                self._finish(batch["items"][0]["jobId"], 'completed')
+
+        self.assertEqual(raced, [True])
+        self.assertEqual(self._social_jobs(), 3)
+        self.assertEqual(self._links(), 3)
+        batch, _ = SocialMediaService.get_batch(batch["id"])
+        self.assertTrue(all(item["jobId"] for item in batch["items"]))
+
+    def test_coalesced_item_refreshes_the_batch(self):
+        single, _ = SocialMediaService.download_media(self.URLS[0])
+        batch, _ = SocialMediaService.create_batch(self.URLS[:1])
+        self.assertEqual(batch["items"][0]["jobId"], single["id"])
+
+        self._finish(single["id"], 'completed')
+        db = self.Session()
+        row = db.query(JobModel).filter(JobModel.id == batch["id"]).first()
+        db.close()
+        self.assertEqual(row.status, 'completed')
+        # Links are only kept while the batch is open
+        self.assertEqual(self._links(), 0)
+
+    def test_queued_batch_is_not_taken_for_an_orphan(self):
+        SocialMediaService.create_batch(self.URLS[:1])
+        executor = JobExecutor(max_workers=1)
+        executor.register('social_batch', lambda job_id: None)
+        self.assertEqual(executor.recover_orphans(), 0)
+
+    def test_either_urls_or_playlist(self):
+        self.assertIsNotNone(SocialMediaService.create_batch()[1])
+        self.assertIsNotNone(SocialMediaService.create_batch(self.URLS, "https://youtube.com/@channel")[1])
+        with patch('services.social_service.SOCIAL_BATCH_MAX_ITEMS', 1):
+            self.assertIn("at most 1", SocialMediaService.create_batch(self.URLS)[1])
+
+
+class FlakyMediaHandler(BaseHTTPRequestHandler):
+    """Serves BODY, dropping the first connection halfway; answers Range requests"""
+
+    BODY = bytes(range(256)) * 64
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(dict(self.headers))
+        start = int(self.headers["Range"][6:-1]) if self.headers.get("Range") else 0
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Length", str(len(self.BODY) - start))
+        self.end_headers()
+        if len(self.requests) == 1:
+            self.wfile.write(self.BODY[:len(self.BODY) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(self.BODY[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestStreamFeeder(unittest.TestCase):
+
+    def setUp(self):
+        FlakyMediaHandler.requests = []
+        self.server = HTTPServer(("127.0.0.1", 0), FlakyMediaHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_copies_the_stream_with_its_headers_and_resumes(self):
+        stream = {"url": f"http://127.0.0.1:{self.server.server_port}/clip.mp4", "protocol": "http",
+                  "headers": {"Cookie": "session=secret"}}
+        failed = threading.Event()
+        out = tempfile.TemporaryFile()
+        self.addCleanup(out.close)
+
+        with patch('services.social_service.time.sleep'):
+            SocialMediaService._stream_feeder(stream, failed)(out)
+
+        out.seek(0)
+        self.assertEqual(out.read(), FlakyMediaHandler.BODY)
+        self.assertFalse(failed.is_set())
+        self.assertEqual([r.get("Cookie") for r in FlakyMediaHandler.requests], ["session=secret"] * 2)
+        self.assertEqual(FlakyMediaHandler.requests[1]["Range"], f"bytes={len(FlakyMediaHandler.BODY) // 2}-")
+
+
+class TestResolutionPolicy(unittest.TestCase):
+
+    def test_format_sort_only_when_capped(self):
+        self.assertNotIn('format_sort', SocialMediaService.get_platform_options('youtube'))
+        options = SocialMediaService.get_platform_options('youtube', 720)
+        self.assertEqual(options['format_sort'][0], 'res:720')
+        self.assertEqual(options['format'], 'best[ext=mp4]/best')
+
+    @patch('services.social_service.FFmpegHelper.get_media_summary')
+    def test_meets_target_uses_short_side_and_codecs(self, summary):
+        summary.return_value = {"width": 720, "height": 1280, "codec": "h264", "audio_codec": "aac"}
+        self.assertTrue(SocialMediaService.meets_target("clip.mp4"))
+        self.assertFalse(SocialMediaService.meets_target("clip.webm"))
+
+        summary.return_value = {"width": 1080, "height": 1920, "codec": "h264", "audio_codec": "aac"}
+        self.assertFalse(SocialMediaService.meets_target("clip.mp4"))
+
+        summary.return_value = {"width": 1280, "height": 720, "codec": "vp9", "audio_codec": None}
+        self.assertFalse(SocialMediaService.meets_target("clip.mp4"))
+
+    @patch('services.social_service.FFmpegHelper.get_media_summary', return_value={})
+    def test_meets_target_falls_back_to_ytdlp_info(self, summary):
+        info = {"width": 1280, "height": 720, "vcodec": "avc1.64001F", "acodec": "mp4a.40.2"}
+        self.assertTrue(SocialMediaService.meets_target("clip.mp4", info))
+        self.assertFalse(SocialMediaService.meets_target("clip.mp4", {**info, "height": 1080, "width": 1920}))
+
+
+if __name__ == '__main__':
+    unittest.main()
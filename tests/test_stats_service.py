@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_helpers import DatabaseTestCase
+from database import StatsModel, StatsEventModel, record_stats
+from services.stats_service import StatsService
+
+
+class TestStatsService(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.stats_service',)
+
+    def _record(self, created_at=None, **counters):
+        db = self.Session()
+        record_stats(db, **counters)
+        if created_at:
+            for obj in db.new:
+                obj.created_at = created_at
+        db.commit()
+        db.close()
+
+    def test_unknown_counter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            record_stats(self.Session(), total_bogus=1)
+
+    def test_pending_events_count_before_aggregation(self):
+        self._record(total_videos_split=1, total_segments_created=4, total_time_saved=12.5)
+        stats = StatsService.get_stats()
+        self.assertEqual(stats["totalVideosSplit"], 1)
+        self.assertEqual(stats["totalSegmentsCreated"], 4)
+        self.assertEqual(stats["totalTimeSaved"], 12.5)
+
+    def test_aggregate_folds_events_into_totals_and_rollups(self):
+        day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        start = day.strftime("%Y-%m-%dT")
+        self._record(day.replace(hour=9, minute=5), total_videos_merged=1)
+        self._record(day.replace(hour=9, minute=50), total_videos_merged=1)
+        self._record(day.replace(hour=14), total_videos_merged=1, cache_hits=1)
+
+        before = StatsService.get_stats()
+        self.assertEqual(StatsService.aggregate(), 4)
+        self.assertEqual(StatsService.get_stats(), before)
+
+        db = self.Session()
+        self.assertEqual(db.query(StatsEventModel).count(), 0)
+        self.assertEqual(db.query(StatsModel).first().total_videos_merged, 3)
+        db.close()
+
+        hourly = StatsService.get_rollups('hour', counter='total_videos_merged')
+        self.assertEqual([(b["start"], b["totalVideosMerged"]) for b in hourly],
+                         [(start + "09:00:00", 2), (start + "14:00:00", 1)])
+        daily = StatsService.get_rollups('day')
+        self.assertEqual(daily, [{"start": start + "00:00:00", "totalVideosMerged": 3, "cacheHits": 1}])
+
+    def test_aggregate_adds_to_existing_buckets(self):
+        moment = datetime.utcnow() - timedelta(minutes=1)
+        self._record(moment, total_tiktok_downloads=1)
+        StatsService.aggregate()
+        self._record(moment, total_tiktok_downloads=2)
+        StatsService.aggregate()
+
+        daily = StatsService.get_rollups('day', since=moment)
+        self.assertEqual(daily[-1]["totalTikTokDownloads"], 3)
+        self.assertEqual(StatsService.get_stats()["totalTikTokDownloads"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+from unittest.mock import patch
+import io
+import sys
+import os
+import hashlib
+import tempfile
+from datetime import datetime, timedelta
+
+from werkzeug.wsgi import LimitedStream
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_helpers import DatabaseTestCase
+from database import UploadSessionModel, VideoModel
+from services import upload_service
+from services.upload_service import UploadService, OFFSET_MISMATCH, UPLOAD_TOO_LARGE, UPLOAD_INCOMPLETE
+from config import UPLOAD_WRITE_TIMEOUT
+
+
+def dropped_body(data, declared):
+    """Request body whose client disconnected after sending data out of declared bytes"""
+    return LimitedStream(io.BytesIO(data), declared)
+
+
+class TestUploadService(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.upload_service', 'services.video_service')
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+
+        summary = {"duration": 4.0, "codec": "h264", "bitrate": None, "fps": 30.0, "width": None,
+                   "height": None, "audio_codec": None, "keyframe_interval": None}
+        patches = [
+            patch('services.upload_service.UPLOAD_DIR', self.tmp.name),
+            patch('services.video_service.FileValidator.validate_video_file', return_value=(True, None)),
+            patch('services.video_service.FFmpegHelper.get_media_summary', return_value=summary),
+            patch('services.video_service.probe_cache.export', return_value=None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _create(self, size):
+        session, error = UploadService.create_session("clip.mp4", size)
+        self.assertIsNone(error)
+        return session["uploadId"]
+
+    def test_chunks_resume_from_offset(self):
+        upload_id = self._create(10)
+
+        session, error = UploadService.write_chunk(upload_id, 0, io.BytesIO(b"01234"))
+        self.assertIsNone(error)
+        self.assertEqual(session["offset"], 5)
+
+        # A retried chunk at a stale offset is refused with the current offset
+        session, error = UploadService.write_chunk(upload_id, 0, io.BytesIO(b"01234"))
+        self.assertEqual(error, OFFSET_MISMATCH)
+        self.assertEqual(session["offset"], 5)
+
+        session, error = UploadService.write_chunk(upload_id, 5, io.BytesIO(b"56789"))
+        self.assertIsNone(error)
+        self.assertEqual(session["offset"], 10)
+
+    def test_rejects_bytes_past_declared_size(self):
+        upload_id = self._create(4)
+        session, error = UploadService.write_chunk(upload_id, 0, io.BytesIO(b"0123456789"))
+        self.assertEqual(error, UPLOAD_TOO_LARGE)
+        self.assertEqual(session["offset"], 0)
+
+    def test_disconnect_keeps_received_bytes(self):
+        upload_id = self._create(10)
+        session, error = UploadService.write_chunk(upload_id, 0, dropped_body(b"0123", 10))
+        self.assertIsNone(error)
+        self.assertEqual(session["offset"], 4)
+
+        status, _ = UploadService.get_session(upload_id)
+        self.assertEqual(status["offset"], 4)
+
+        # The client resumes right away at the offset it was given
+        session, error = UploadService.write_chunk(upload_id, status["offset"], io.BytesIO(b"456789"))
+        self.assertIsNone(error)
+        self.assertEqual(session["offset"], 10)
+        video, error = UploadService.complete(upload_id)
+        self.assertIsNone(error)
+        self.assertEqual(self._video_hashes(), [hashlib.sha256(b"0123456789").hexdigest()])
+
+    def test_complete_requires_all_bytes(self):
+        upload_id = self._create(10)
+        UploadService.write_chunk(upload_id, 0, io.BytesIO(b"01234"))
+        video, error = UploadService.complete(upload_id)
+        self.assertIsNone(video)
+        self.assertEqual(error, UPLOAD_INCOMPLETE)
+
+
+    def _session(self, upload_id):
+        db = self.Session()
+        try:
+            return db.query(UploadSessionModel).filter(UploadSessionModel.id == upload_id).first()
+        finally:
+            db.close()
+
+    def _set_writing_since(self, upload_id, when):
+        db = self.Session()
+        db.query(UploadSessionModel).filter(UploadSessionModel.id == upload_id).update(
+            {UploadSessionModel.writing_since: when})
+        db.commit()
+        db.close()
+
+    def _video_hashes(self):
+        db = self.Session()
+        try:
+            return [content_hash for content_hash, in db.query(VideoModel.content_hash).all()]
+        finally:
+            db.close()
+
+    def test_complete_hashes_chunks_as_they_arrive(self):
+        upload_id = self._create(10)
+        UploadService.write_chunk(upload_id, 0, io.BytesIO(b"01234"))
+        UploadService.write_chunk(upload_id, 5, io.BytesIO(b"56789"))
+
+        with patch('services.upload_service.FileHandler.hash_file') as hash_file:
+            video, error = UploadService.complete(upload_id)
+        hash_file.assert_not_called()
+        self.assertIsNone(error)
+        self.assertEqual(self._video_hashes(), [hashlib.sha256(b"0123456789").hexdigest()])
+        self.assertIsNone(self._session(upload_id))
+
+    def test_complete_reads_the_file_without_a_running_hash(self):
+        upload_id = self._create(10)
+        UploadService.write_chunk(upload_id, 0, io.BytesIO(b"0123456789"))
+        upload_service._digests.clear()
+
+        video, error = UploadService.complete(upload_id)
+        self.assertIsNone(error)
+        self.assertEqual(self._video_hashes(), [hashlib.sha256(b"0123456789").hexdigest()])
+
+    def test_failed_registration_keeps_the_session(self):
+        upload_id = self._create(4)
+        UploadService.write_chunk(upload_id, 0, io.BytesIO(b"0123"))
+
+        with patch('services.upload_service.VideoService._register_upload', side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                UploadService.complete(upload_id)
+        self.assertIsNotNone(self._session(upload_id))
+        self.assertEqual(self._video_hashes(), [])
+
+    def test_concurrent_chunk_at_same_offset_is_refused(self):
+        upload_id = self._create(10)
+        # Another request is writing at offset 0
+        self._set_writing_since(upload_id, datetime.utcnow())
+
+        session, error = UploadService.write_chunk(upload_id, 0, io.BytesIO(b"01234"))
+        self.assertEqual(error, OFFSET_MISMATCH)
+        self.assertEqual(session["offset"], 0)
+
+    def test_abandoned_chunk_write_is_taken_over(self):
+        upload_id = self._create(10)
+        self._set_writing_since(upload_id, datetime.utcnow() - timedelta(seconds=UPLOAD_WRITE_TIMEOUT + 1))
+
+        session, error = UploadService.write_chunk(upload_id, 0, io.BytesIO(b"01234"))
+        self.assertIsNone(error)
+        self.assertEqual(session["offset"], 5)
+        self.assertIsNone(self._session(upload_id).writing_since)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+
+# Add root directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_helpers import DatabaseTestCase
+from database import VideoModel, StoredFileModel
+from services.video_service import VideoService
+
+SUMMARY = {"duration": 12.0, "codec": "h264", "bitrate": 1000000, "fps": 30.0, "width": 1280,
+           "height": 720, "audio_codec": "aac", "keyframe_interval": 2.0}
+
+
+class TestUploadDedup(DatabaseTestCase):
+
+    SESSION_MODULES = ('services.video_service',)
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        patches = [
+            patch('services.video_service.FileValidator.validate_video_file', return_value=(True, None)),
+            patch('services.video_service.FFmpegHelper.get_media_summary', return_value=SUMMARY),
+            patch('services.video_service.probe_cache.export', return_value=None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _upload(self, name, content=b"same video bytes"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        video, error = VideoService._register_upload(name, path, name, "hash-of-" + content.decode())
+        self.assertIsNone(error)
+        return video
+
+    def _paths(self):
+        db = self.Session()
+        try:
+            return [path for path, in db.query(VideoModel.path).all()]
+        finally:
+            db.close()
+
+    def _refcount(self, path):
+        db = self.Session()
+        try:
+            stored = db.query(StoredFileModel).filter(StoredFileModel.path == path).first()
+            return stored.refcount if stored else None
+        finally:
+            db.close()
+
+    def test_same_content_twice_stores_one_file(self):
+        self._upload("first.mp4")
+        self._upload("second.mp4")
+
+        paths = self._paths()
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(os.listdir(self.tmp.name), ["first.mp4"])
+        self.assertEqual(self._refcount(paths[0]), 2)
+
+    def test_deleting_one_copy_keeps_the_file(self):
+        first = self._upload("first.mp4")
+        self._upload("second.mp4")
+        path = self._paths()[0]
+
+        self.assertTrue(VideoService.delete_video(first["id"]))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self._refcount(path), 1)
+
+    def test_deleting_the_last_copy_removes_the_file(self):
+        first = self._upload("first.mp4")
+        second = self._upload("second.mp4")
+        path = self._paths()[0]
+
+        VideoService.delete_video(first["id"])
+        VideoService.delete_video(second["id"])
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNone(self._refcount(path))
+
+    def test_file_being_deleted_is_not_shared(self):
+        self._upload("first.mp4")
+        path = self._paths()[0]
+        # The last reference was dropped but the file is not unlinked yet
+        db = self.Session()
+        db.query(StoredFileModel).update({StoredFileModel.refcount: 0})
+        db.commit()
+        db.close()
+
+        self._upload("second.mp4")
+        self.assertEqual(sorted(self._paths()), sorted([path, os.path.join(self.tmp.name, "second.mp4")]))
+
+    def test_different_content_is_not_shared(self):
+        self._upload("first.mp4")
+        self._upload("second.mp4", content=b"other video bytes")
+        self.assertEqual(len(set(self._paths())), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
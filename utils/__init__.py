@@ -1,4 +1,5 @@
 from .ffmpeg import FFmpegHelper
 from .file_handler import FileHandler
+from .progress import ProgressTracker
 
-__all__ = ['FFmpegHelper', 'FileHandler']
+__all__ = ['FFmpegHelper', 'FileHandler', 'ProgressTracker']
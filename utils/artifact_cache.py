@@ -0,0 +1,151 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+from config import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES
+
+
+class ArtifactCache:
+    """Content-addressed store of finished outputs.
+
+    An entry is a directory named after the hash of (input content hashes,
+    operation, parameters) holding the output files and a manifest. Files are
+    hardlinked in and out of the cache, so a hit costs no copy and outputs
+    deleted after download leave the cached copy intact. The manifest mtime
+    is bumped on every hit and drives LRU eviction."""
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, root: str = ARTIFACT_CACHE_DIR, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content_hashes: List[str], operation: str, params: Optional[Dict] = None) -> str:
+        payload = json.dumps({
+            "inputs": list(content_hashes),
+            "operation": operation,
+            "params": params or {},
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    @staticmethod
+    def _link(src: str, dst: str):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """Manifest of a complete entry ({"files": [...], "meta": {...}}) or None"""
+        manifest_path = os.path.join(self._entry_dir(key), self.MANIFEST)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            os.utime(manifest_path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        entry_dir = self._entry_dir(key)
+        if not all(os.path.exists(os.path.join(entry_dir, name)) for name in manifest.get("files", [])):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return manifest
+
+    def restore(self, key: str, destinations: List[str]) -> Optional[Dict]:
+        """Link the entry's files to destinations (same order as stored).
+        Returns the manifest, or None on a miss."""
+        manifest = self.lookup(key)
+        if manifest is None or len(manifest["files"]) != len(destinations):
+            return None
+
+        entry_dir = self._entry_dir(key)
+        created = []
+        try:
+            for name, dst in zip(manifest["files"], destinations):
+                if os.path.exists(dst):
+                    os.remove(dst)
+                self._link(os.path.join(entry_dir, name), dst)
+                created.append(dst)
+        except OSError as e:
+            print(f"Artifact cache restore error: {e}")
+            for path in created:
+                if os.path.exists(path):
+                    os.remove(path)
+            return None
+        return manifest
+
+    def store(self, key: str, files: List[str], meta: Optional[Dict] = None) -> bool:
+        """Add files to the cache under key. The entry is built in a scratch directory
+        and renamed into place, so readers never see a partial entry."""
+        if self.max_bytes <= 0:
+            return False
+
+        os.makedirs(self.root, exist_ok=True)
+        scratch = os.path.join(self.root, f".tmp_{uuid.uuid4().hex}")
+        try:
+            os.makedirs(scratch)
+            names = []
+            for i, path in enumerate(files):
+                name = f"{i:04d}_{os.path.basename(path)}"
+                self._link(path, os.path.join(scratch, name))
+                names.append(name)
+            with open(os.path.join(scratch, self.MANIFEST), "w") as f:
+                json.dump({"files": names, "meta": meta or {}}, f)
+
+            entry_dir = self._entry_dir(key)
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(scratch, entry_dir)
+        except OSError as e:
+            print(f"Artifact cache store error: {e}")
+            shutil.rmtree(scratch, ignore_errors=True)
+            return False
+
+        self.evict()
+        return True
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                names = os.listdir(self.root)
+            except OSError:
+                return
+            for name in names:
+                entry_dir = os.path.join(self.root, name)
+                manifest_path = os.path.join(entry_dir, self.MANIFEST)
+                if name.startswith(".") or not os.path.exists(manifest_path):
+                    continue
+                size = 0
+                for file_name in os.listdir(entry_dir):
+                    try:
+                        size += os.path.getsize(os.path.join(entry_dir, file_name))
+                    except OSError:
+                        pass
+                entries.append((os.path.getmtime(manifest_path), size, entry_dir))
+                total += size
+
+            entries.sort()
+            for _, size, entry_dir in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+
+
+artifact_cache = ArtifactCache()
@@ -1,18 +1,174 @@
 import subprocess
 import json
 import os
+import bisect
+import time
+import threading
+import contextvars
 import concurrent.futures
-from typing import Optional, Dict, List, Tuple
-from config import FFMPEG_VIDEO_CODEC, FFMPEG_AUDIO_CODEC, FFMPEG_PRESET, FFMPEG_CRF
+from typing import Optional, Dict, List, Tuple, Callable, Hashable, BinaryIO
+from config import (FFMPEG_VIDEO_CODEC, FFMPEG_AUDIO_CODEC, KEYFRAME_SAMPLE_SECONDS,
+                    ENCODING_PROFILES, BASE_ENCODING_PROFILE)
+from utils.progress import ProgressTracker, parse_progress_block
+from utils.probe_cache import probe_cache
+from utils.scheduler import EncodeScheduler, encode_scheduler
+from utils.metrics import observe_subprocess
+from utils.resource_usage import record_child
 
 
 class FFmpegHelper:
     
     @staticmethod
-    def _run_split_cmd(cmd: List[str], output_file: str) -> Optional[str]:
+    def is_encode(cmd: List[str]) -> bool:
+        """Whether an ffmpeg command encodes video: the video codec of the output (the last
+        of -c/-codec/-c:v/-codec:v/-vcodec after the inputs) is not a stream copy and video
+        is not dropped with -vn. Audio-only codec options do not count."""
+        last_input = max((i for i, arg in enumerate(cmd) if arg == "-i"), default=0)
+        video_codec = None
+        for i in range(last_input + 2, len(cmd) - 1):
+            if cmd[i] == "-vn":
+                return False
+            if cmd[i] in ("-c", "-codec", "-c:v", "-codec:v", "-vcodec"):
+                video_codec = cmd[i + 1]
+        return video_codec != "copy"
+    
+    @staticmethod
+    def with_threads(cmd: List[str], threads: int) -> List[str]:
+        """Set the output -threads option of cmd (the output file is the last argument)"""
+        cmd = list(cmd)
+        last_input = max((i for i, arg in enumerate(cmd) if arg == "-i"), default=0)
+        for i in range(len(cmd) - 2, last_input, -1):
+            if cmd[i] == "-threads":
+                del cmd[i:i + 2]
+        return cmd[:-1] + ["-threads", str(threads), cmd[-1]]
+    
+    @staticmethod
+    def _run(cmd: List[str], timeout: float, progress: Optional[ProgressTracker] = None,
+             task: Hashable = None, offset: float = 0.0, scheduler: Optional[EncodeScheduler] = None,
+             feed: Optional[Callable[[BinaryIO], None]] = None) -> subprocess.CompletedProcess:
+        """Run an ffmpeg command. Encodes first take a slot from the encode scheduler (or the
+        given one), which decides their thread count. With a progress tracker, ffmpeg writes
+        machine-readable progress to stdout and every report is forwarded as
+        (task, offset + out_time, speed). feed, if given, writes ffmpeg's stdin."""
+        if not FFmpegHelper.is_encode(cmd):
+            return FFmpegHelper._run_process(cmd, timeout, progress, task, offset, feed=feed)
+        
+        with (scheduler or encode_scheduler).slot() as threads:
+            return FFmpegHelper._run_process(FFmpegHelper.with_threads(cmd, threads),
+                                             timeout, progress, task, offset, feed=feed)
+    
+    @staticmethod
+    def _run_process(cmd: List[str], timeout: float, progress: Optional[ProgressTracker] = None,
+                     task: Hashable = None, offset: float = 0.0,
+                     on_line: Optional[Callable[[str], None]] = None,
+                     tool: Optional[str] = None,
+                     feed: Optional[Callable[[BinaryIO], None]] = None) -> subprocess.CompletedProcess:
+        tool = tool or os.path.basename(cmd[0])
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = FFmpegHelper._spawn(cmd, timeout, progress, task, offset, on_line, tool, feed)
+            ok = result.returncode == 0
+            return result
+        finally:
+            observe_subprocess(tool, time.perf_counter() - start, ok)
+    
+    @staticmethod
+    def _spawn(cmd: List[str], timeout: float, progress: Optional[ProgressTracker] = None,
+               task: Hashable = None, offset: float = 0.0,
+               on_line: Optional[Callable[[str], None]] = None,
+               tool: Optional[str] = None,
+               feed: Optional[Callable[[BinaryIO], None]] = None) -> subprocess.CompletedProcess:
+        """Run cmd to completion. The child is reaped with wait4 so its CPU time, peak RSS
+        and block I/O are charged to the job being tracked (see utils.resource_usage).
+        With on_line, each stdout line is handed to it as it arrives instead of being returned.
+        With feed, a thread hands it the child's stdin, closed once feed returns."""
+        if progress is not None:
+            cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+        started = time.monotonic()
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE if feed else None,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        
+        if feed is not None:
+            feeder = threading.Thread(target=FFmpegHelper._feed_stdin, args=(proc, feed))
+            feeder.daemon = True
+            feeder.start()
+        
+        stderr_chunks = []
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()))
+        stderr_reader.daemon = True
+        stderr_reader.start()
+        
+        timed_out = threading.Event()
+        def kill():
+            timed_out.set()
+            proc.kill()
+        timer = threading.Timer(timeout, kill)
+        timer.daemon = True
+        timer.start()
+        
+        stdout = ""
+        try:
+            if on_line is not None:
+                for line in proc.stdout:
+                    on_line(line)
+            elif progress is None:
+                stdout = proc.stdout.read()
+            else:
+                block = []
+                for line in proc.stdout:
+                    block.append(line)
+                    if line.startswith("progress="):
+                        out_time, speed = parse_progress_block(block)
+                        block = []
+                        if out_time is not None:
+                            progress.update(task, offset + out_time, speed)
+            usage = FFmpegHelper._reap(proc)
+        finally:
+            timer.cancel()
+            stderr_reader.join()
+            proc.stdout.close()
+            proc.stderr.close()
+        
+        record_child(tool or os.path.basename(cmd[0]), usage, time.monotonic() - started)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, "".join(stderr_chunks))
+    
+    @staticmethod
+    def _feed_stdin(proc: subprocess.Popen, feed: Callable[[BinaryIO], None]):
+        try:
+            feed(proc.stdin.buffer)
+        except BrokenPipeError:
+            pass  # the child stopped reading; its exit code tells why
+        except Exception as e:
+            print(f"{os.path.basename(proc.args[0])} input error: {e}")
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+    
+    @staticmethod
+    def _reap(proc: subprocess.Popen):
+        """Wait for proc and return its rusage (None where wait4 is not available)"""
+        if not hasattr(os, "wait4"):
+            proc.wait()
+            return None
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        except ChildProcessError:
+            proc.wait()
+            return None
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return usage
+    
+    @staticmethod
+    def _run_split_cmd(cmd: List[str], output_file: str, progress: Optional[ProgressTracker] = None,
+                       task: Hashable = None, offset: float = 0.0) -> Optional[str]:
         """Helper to run a split command in a thread"""
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            result = FFmpegHelper._run(cmd, 600, progress, task, offset)
             if result.returncode == 0 and os.path.exists(output_file):
                 return os.path.basename(output_file)
             else:
@@ -21,25 +177,157 @@ class FFmpegHelper:
             print(f"FFmpeg execution error: {e}")
         return None
 
+    @staticmethod
+    def encoding_args(encoding_profile: str = BASE_ENCODING_PROFILE) -> List[str]:
+        """-preset/-crf for a named profile from ENCODING_PROFILES"""
+        settings = ENCODING_PROFILES.get(encoding_profile) or ENCODING_PROFILES[BASE_ENCODING_PROFILE]
+        return ["-preset", settings["preset"], "-crf", settings["crf"]]
+    
+    @staticmethod
+    def get_segment_plan(segment_duration: int, total_duration: float, fps: int = 30) -> List[Tuple[float, float]]:
+        """Return (start_time, duration) for every segment, snapped to the fps frame grid"""
+        frame_duration = 1.0 / fps
+        
+        num_segments = int(total_duration // segment_duration)
+        last_segment_duration = total_duration - (num_segments * segment_duration)
+        
+        if last_segment_duration > frame_duration:
+            num_segments += 1
+        
+        plan = []
+        for i in range(num_segments):
+            start_frame = i * segment_duration * fps
+            start_time = start_frame / fps
+            
+            if i == num_segments - 1 and last_segment_duration > frame_duration:
+                duration = last_segment_duration
+            else:
+                duration = segment_duration
+            
+            num_frames = int(duration * fps)
+            plan.append((start_time, num_frames / fps))
+        
+        return plan
+    
+    @staticmethod
+    def _run_parallel(cmds: List[List[str]], output_files: List[str],
+                      progress: Optional[ProgressTracker] = None) -> List[str]:
+        """Run independent segment commands in parallel, keeping output order"""
+        args_list = [(cmds[i], output_files[i], progress, i) for i in range(len(cmds))]
+        return FFmpegHelper._map_parallel(FFmpegHelper._run_split_cmd, args_list, progress)
+    
+    @staticmethod
+    def _map_parallel(func: Callable[..., Optional[str]], args_list: List[tuple],
+                      progress: Optional[ProgressTracker] = None) -> List[str]:
+        """Call func(*args) for every entry in parallel; returns the non-None results in order.
+        Entry i is reported to the progress tracker as task i."""
+        results = [None] * len(args_list)
+        max_workers = encode_scheduler.max_parallel(len(args_list))
+
+        with encode_scheduler.demand(len(args_list)) as task_done:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Each task runs in a copy of the caller's context so the job's resource
+                # tracking sees the children started from the pool threads
+                future_to_index = {
+                    executor.submit(contextvars.copy_context().run, func, *args_list[i]): i
+                    for i in range(len(args_list))
+                }
+
+                for future in concurrent.futures.as_completed(future_to_index):
+                    index = future_to_index[future]
+                    task_done()
+                    try:
+                        results[index] = future.result()
+                    except Exception as exc:
+                        print(f'Segment {index} generated an exception: {exc}')
+                    if progress:
+                        progress.finish_task(index)
+        
+        return [r for r in results if r is not None]
+
     @staticmethod
     def get_video_info(file_path: str) -> Dict:
+        """ffprobe format and streams, plus the keyframe interval measured on the first
+        seconds of packets. Cached per (path, size, mtime) so a file is probed once."""
+        cached = probe_cache.get(file_path)
+        if cached is not None:
+            return cached
+        
         try:
-            result = subprocess.run([
+            result = FFmpegHelper._run_process([
                 "ffprobe",
                 "-v", "quiet",
                 "-print_format", "json",
                 "-show_format",
                 "-show_streams",
+                "-show_entries", "packet=stream_index,pts_time,flags",
+                "-read_intervals", f"%+{KEYFRAME_SAMPLE_SECONDS}",
                 file_path
-            ], capture_output=True, text=True, timeout=30)
+            ], 30)
             
             if result.returncode != 0:
                 return {}
             
-            return json.loads(result.stdout)
+            info = json.loads(result.stdout)
         except Exception as e:
             print(f"FFprobe error: {e}")
             return {}
+        
+        packets = info.pop("packets", [])
+        video_index = next((st.get("index") for st in info.get("streams", [])
+                            if st.get("codec_type") == "video"), None)
+        keyframes = []
+        for packet in packets:
+            if packet.get("stream_index") != video_index or "K" not in packet.get("flags", ""):
+                continue
+            try:
+                keyframes.append(float(packet["pts_time"]))
+            except (KeyError, ValueError, TypeError):
+                continue
+        keyframes.sort()
+        info["keyframe_interval"] = None
+        if len(keyframes) > 1:
+            info["keyframe_interval"] = round((keyframes[-1] - keyframes[0]) / (len(keyframes) - 1), 3)
+        
+        probe_cache.put(file_path, info)
+        return info
+    
+    @staticmethod
+    def get_media_summary(file_path: str) -> Dict:
+        """Structured fields from the (cached) probe of file_path"""
+        return FFmpegHelper.summarize_probe(FFmpegHelper.get_video_info(file_path))
+    
+    @staticmethod
+    def summarize_probe(info: Dict) -> Dict:
+        streams = info.get("streams", [])
+        video = next((st for st in streams if st.get("codec_type") == "video"), {})
+        audio = next((st for st in streams if st.get("codec_type") == "audio"), {})
+        
+        fps = None
+        rate = video.get("avg_frame_rate") or video.get("r_frame_rate")
+        if rate and rate != "0/0":
+            num, _, den = rate.partition("/")
+            try:
+                fps = round(float(num) / float(den or 1), 3)
+            except (ValueError, ZeroDivisionError):
+                fps = None
+        
+        def to_number(value, cast):
+            try:
+                return cast(value)
+            except (ValueError, TypeError):
+                return None
+        
+        return {
+            "duration": to_number(info.get("format", {}).get("duration"), float),
+            "bitrate": to_number(info.get("format", {}).get("bit_rate"), int),
+            "codec": video.get("codec_name"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "fps": fps,
+            "audio_codec": audio.get("codec_name"),
+            "keyframe_interval": info.get("keyframe_interval"),
+        }
     
     @staticmethod
     def get_duration(file_path: str) -> float:
@@ -73,34 +361,290 @@ class FFmpegHelper:
         return video_codec, resolution, bitrate
     
     @staticmethod
-    def split_video_lossless(input_path: str, output_pattern: str, 
-                             segment_duration: int, total_duration: float, fps: int = 30) -> List[str]:
-        """Split video with frame-accurate cuts at 30fps for seamless merging.
-        Always re-encodes to ensure exact frame boundaries - stream copy cannot guarantee frame accuracy."""
-        frame_duration = 1.0 / fps
+    def get_keyframes(file_path: str) -> List[float]:
+        """Return the presentation times of every video keyframe.
+        Reads packet flags only, so no frame is decoded."""
+        cached = probe_cache.get(file_path, "keyframes")
+        if cached is not None:
+            return cached
         
-        num_segments = int(total_duration // segment_duration)
-        last_segment_duration = total_duration - (num_segments * segment_duration)
+        try:
+            result = FFmpegHelper._run_process([
+                "ffprobe",
+                "-v", "quiet",
+                "-select_streams", "v:0",
+                "-show_entries", "packet=pts_time,flags",
+                "-of", "csv=p=0",
+                file_path
+            ], 300)
+            
+            if result.returncode != 0:
+                return []
+            
+            keyframes = []
+            for line in result.stdout.splitlines():
+                pts_time, _, flags = line.partition(",")
+                if "K" not in flags:
+                    continue
+                try:
+                    keyframes.append(float(pts_time))
+                except ValueError:
+                    continue
+            keyframes.sort()
+            probe_cache.put(file_path, keyframes, "keyframes")
+            return keyframes
+        except Exception as e:
+            print(f"FFprobe keyframe error: {e}")
+            return []
+    
+    @staticmethod
+    def snap_cut_points(cut_points: List[float], keyframes: List[float],
+                        tolerance: float) -> Optional[List[float]]:
+        """Move each cut point to its nearest keyframe.
+        Returns None when a cut has no keyframe within tolerance seconds.
+        Cuts that collapse onto the same keyframe (or onto the start) are merged."""
+        if not keyframes:
+            return None
         
-        if last_segment_duration > frame_duration:
-            num_segments += 1
+        snapped = []
+        for cut in cut_points:
+            index = bisect.bisect_left(keyframes, cut)
+            candidates = keyframes[max(0, index - 1):index + 1]
+            nearest = min(candidates, key=lambda k: abs(k - cut))
+            
+            if abs(nearest - cut) > tolerance:
+                return None
+            if nearest <= 0 or (snapped and nearest <= snapped[-1]):
+                continue
+            snapped.append(nearest)
         
+        return snapped
+    
+    @staticmethod
+    def plan_keyframe_segments(input_path: str, segment_duration: int, total_duration: float,
+                               tolerance: float) -> Optional[List[Tuple[float, float]]]:
+        """Segment plan whose cut points all fall on source keyframes, or None if
+        the source has no keyframe close enough to one of the requested cuts."""
+        cut_points = []
+        cut = float(segment_duration)
+        while cut < total_duration:
+            cut_points.append(cut)
+            cut += segment_duration
+        
+        keyframes = FFmpegHelper.get_keyframes(input_path)
+        snapped = FFmpegHelper.snap_cut_points(cut_points, keyframes, tolerance)
+        if snapped is None:
+            return None
+        
+        # Drop a trailing cut that would leave an empty last segment
+        snapped = [t for t in snapped if t < total_duration - 0.001]
+        
+        starts = [0.0] + snapped
+        ends = snapped + [total_duration]
+        return [(start, end - start) for start, end in zip(starts, ends)]
+    
+    @staticmethod
+    def split_video_stream_copy(input_path: str, output_pattern: str, plan: List[Tuple[float, float]],
+                                progress: Optional[ProgressTracker] = None) -> List[str]:
+        """Split on keyframe-aligned boundaries without re-encoding.
+        The plan must come from plan_keyframe_segments so that every cut lands on a keyframe."""
+        if not plan:
+            return []
+        
+        segment_times = ",".join(f"{start:.6f}" for start, _ in plan[1:])
+        segment_pattern = output_pattern.replace("%", "%%").format(index="%d")
+        ext = os.path.splitext(output_pattern)[1].lower()
+        
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-c", "copy",
+            "-avoid_negative_ts", "make_zero",
+            "-f", "segment",
+            "-segment_start_number", "1",
+            # Keyframe times are printed rounded; accept a packet a hair early
+            "-segment_time_delta", "0.001",
+            "-reset_timestamps", "1",
+        ]
+        if segment_times:
+            cmd += ["-segment_times", segment_times]
+        if ext in (".mp4", ".mov", ".m4v"):
+            cmd += ["-segment_format_options", "movflags=+faststart"]
+        cmd.append(segment_pattern)
+        
+        output_files = [output_pattern.format(index=i + 1) for i in range(len(plan))]
+        if progress:
+            progress.add_task(0, sum(duration for _, duration in plan))
+        try:
+            result = FFmpegHelper._run(cmd, 600, progress, 0)
+            if result.returncode == 0:
+                return [os.path.basename(f) for f in output_files if os.path.exists(f)]
+            print(f"FFmpeg stream copy split error: {result.stderr}")
+        except Exception as e:
+            print(f"FFmpeg execution error: {e}")
+        
+        for output_file in output_files:
+            if os.path.exists(output_file):
+                os.remove(output_file)
+        return []
+    
+    # ffprobe reports H.264 profiles by name, libx264 expects the short form
+    H264_PROFILES = {
+        "constrained baseline": "baseline",
+        "baseline": "baseline",
+        "main": "main",
+        "high": "high",
+        "high 10": "high10",
+        "high 4:2:2": "high422",
+        "high 4:4:4 predictive": "high444",
+    }
+    
+    @staticmethod
+    def split_video_smart(input_path: str, output_pattern: str, segment_duration: int,
+                          total_duration: float, temp_dir: str, fps: int = 30,
+                          progress: Optional[ProgressTracker] = None,
+                          encoding_profile: str = BASE_ENCODING_PROFILE) -> Optional[List[str]]:
+        """Smart-cut split: frame-accurate cuts on the fps grid while re-encoding only the
+        frames between each cut and the next source keyframe. The rest of every segment's
+        video is stream-copied and stitched to the re-encoded head through MPEG-TS
+        intermediates; the audio of the segment is encoded in one piece across the join.
+        Returns None when the source cannot be smart-cut (non H.264 video or no keyframe index)."""
+        info = FFmpegHelper.get_video_info(input_path)
+        video_stream = next((st for st in info.get("streams", []) if st.get("codec_type") == "video"), None)
+        if not video_stream or video_stream.get("codec_name") != "h264":
+            return None
+        
+        keyframes = FFmpegHelper.get_keyframes(input_path)
+        if not keyframes:
+            return None
+        
+        encode_args = ["-c:v", FFMPEG_VIDEO_CODEC, *FFmpegHelper.encoding_args(encoding_profile)]
+        if video_stream.get("pix_fmt"):
+            encode_args += ["-pix_fmt", video_stream["pix_fmt"]]
+        profile = FFmpegHelper.H264_PROFILES.get(str(video_stream.get("profile", "")).lower())
+        if profile:
+            encode_args += ["-profile:v", profile]
+        # The head is played back to back with copied source frames: same frame rate
+        if video_stream.get("r_frame_rate") not in (None, "0/0"):
+            encode_args += ["-r", video_stream["r_frame_rate"]]
+        
+        plan = FFmpegHelper.get_segment_plan(segment_duration, total_duration, fps)
+        args_list = []
+        for i, (start_time, duration) in enumerate(plan):
+            index = bisect.bisect_left(keyframes, start_time - 0.0005)
+            next_keyframe = keyframes[index] if index < len(keyframes) else None
+            if progress:
+                progress.add_task(i, duration)
+            args_list.append((
+                input_path,
+                output_pattern.format(index=i + 1),
+                start_time,
+                duration,
+                next_keyframe,
+                encode_args,
+                os.path.join(temp_dir, f"smart_{i + 1}"),
+                progress,
+                i,
+            ))
+        
+        return FFmpegHelper._map_parallel(FFmpegHelper._smart_cut_segment, args_list, progress)
+    
+    @staticmethod
+    def _smart_cut_segment(input_path: str, output_file: str, start_time: float, duration: float,
+                           next_keyframe: Optional[float], encode_args: List[str], temp_prefix: str,
+                           progress: Optional[ProgressTracker] = None, task: Hashable = None) -> Optional[str]:
+        """Produce one smart-cut segment; see split_video_smart"""
+        end_time = start_time + duration
+        
+        if next_keyframe is not None and abs(next_keyframe - start_time) < 0.0005:
+            # Cut already sits on a keyframe: the whole segment is a plain copy
+            cmd = [
+                "ffmpeg", "-y",
+                "-ss", f"{start_time:.6f}",
+                "-i", input_path,
+                "-t", f"{duration:.6f}",
+                "-c", "copy",
+                "-avoid_negative_ts", "make_zero",
+                output_file
+            ]
+            return FFmpegHelper._run_split_cmd(cmd, output_file, progress, task)
+        
+        if next_keyframe is None or next_keyframe >= end_time - 0.0005:
+            # No keyframe inside the segment: nothing to copy, encode it whole
+            head_end = end_time
+        else:
+            head_end = next_keyframe
+        
+        head_file = f"{temp_prefix}_head.ts"
+        tail_file = f"{temp_prefix}_tail.ts"
+        head_duration = head_end - start_time
+        
+        # Video only: the audio is encoded across the join by the stitch below
+        head_cmd = [
+            "ffmpeg", "-y",
+            "-ss", f"{start_time:.6f}",
+            "-i", input_path,
+            "-t", f"{head_duration:.6f}",
+            "-an",
+            *encode_args,
+            "-threads", "1",
+            "-f", "mpegts",
+            head_file
+        ]
+        if FFmpegHelper._run_split_cmd(head_cmd, head_file, progress, task) is None:
+            return None
+        
+        parts = [head_file]
+        if head_end < end_time:
+            # Both intermediates start at 0: shift the tail so timestamps run on from the head
+            tail_cmd = [
+                "ffmpeg", "-y",
+                "-ss", f"{head_end:.6f}",
+                "-i", input_path,
+                "-t", f"{end_time - head_end:.6f}",
+                "-an",
+                "-c:v", "copy",
+                "-output_ts_offset", f"{head_duration:.6f}",
+                "-f", "mpegts",
+                tail_file
+            ]
+            if FFmpegHelper._run_split_cmd(tail_cmd, tail_file, progress, task, head_duration) is None:
+                return None
+            parts.append(tail_file)
+        
+        stitch_cmd = [
+            "ffmpeg", "-y",
+            "-i", "concat:" + "|".join(parts),
+            "-ss", f"{start_time:.6f}",
+            "-t", f"{duration:.6f}",
+            "-i", input_path,
+            "-map", "0:v",
+            "-map", "1:a?",
+            "-c:v", "copy",
+            "-c:a", FFMPEG_AUDIO_CODEC,
+            "-b:a", "192k",
+            "-movflags", "+faststart",
+            "-avoid_negative_ts", "make_zero",
+            output_file
+        ]
+        return FFmpegHelper._run_split_cmd(stitch_cmd, output_file)
+    
+    @staticmethod
+    def split_video_lossless(input_path: str, output_pattern: str, 
+                             segment_duration: int, total_duration: float, fps: int = 30,
+                             progress: Optional[ProgressTracker] = None,
+                             encoding_profile: str = BASE_ENCODING_PROFILE) -> List[str]:
+        """Split video with frame-accurate cuts at 30fps for seamless merging.
+        Always re-encodes to ensure exact frame boundaries - stream copy cannot guarantee frame accuracy."""
         cmds = []
         output_files = []
 
-        for i in range(num_segments):
-            start_frame = i * segment_duration * fps
-            start_time = start_frame / fps
-            
+        plan = FFmpegHelper.get_segment_plan(segment_duration, total_duration, fps)
+        for i, (start_time, actual_duration) in enumerate(plan):
             output_file = output_pattern.format(index=i + 1)
-            
-            if i == num_segments - 1 and last_segment_duration > frame_duration:
-                duration = last_segment_duration
-            else:
-                duration = segment_duration
-            
-            num_frames = int(duration * fps)
-            actual_duration = num_frames / fps
+            if progress:
+                progress.add_task(i, actual_duration)
             
             cmd = [
                 "ffmpeg",
@@ -109,8 +653,7 @@ class FFmpegHelper:
                 "-i", input_path,
                 "-t", f"{actual_duration:.6f}",
                 "-c:v", FFMPEG_VIDEO_CODEC,
-                "-preset", FFMPEG_PRESET,
-                "-crf", FFMPEG_CRF,
+                *FFmpegHelper.encoding_args(encoding_profile),
                 "-r", str(fps),
                 "-g", str(fps),
                 "-force_key_frames", f"expr:eq(mod(n,{fps}),0)",
@@ -126,33 +669,19 @@ class FFmpegHelper:
             cmds.append(cmd)
             output_files.append(output_file)
             
-        # Execute in parallel
-        results = [None] * len(cmds)
-        max_workers = min(os.cpu_count() or 1, 4)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_index = {
-                executor.submit(FFmpegHelper._run_split_cmd, cmds[i], output_files[i]): i
-                for i in range(len(cmds))
-            }
-
-            for future in concurrent.futures.as_completed(future_to_index):
-                index = future_to_index[future]
-                try:
-                    results[index] = future.result()
-                except Exception as exc:
-                    print(f'Segment {index} generated an exception: {exc}')
-        
-        return [r for r in results if r is not None]
+        return FFmpegHelper._run_parallel(cmds, output_files, progress)
     
     @staticmethod
     def _split_with_reencode(input_path: str, output_file: str, 
-                             start_time: float, duration: float) -> List[str]:
-        return FFmpegHelper._split_with_reencode_precise(input_path, output_file, start_time, duration, 30)
+                             start_time: float, duration: float,
+                             encoding_profile: str = BASE_ENCODING_PROFILE) -> List[str]:
+        return FFmpegHelper._split_with_reencode_precise(input_path, output_file, start_time, duration, 30,
+                                                         encoding_profile)
     
     @staticmethod
     def _split_with_reencode_precise(input_path: str, output_file: str, 
-                                     start_time: float, duration: float, fps: int = 30) -> List[str]:
+                                     start_time: float, duration: float, fps: int = 30,
+                                     encoding_profile: str = BASE_ENCODING_PROFILE) -> List[str]:
         """Re-encode with frame-accurate timing at specified FPS"""
         cmd = [
             "ffmpeg",
@@ -161,8 +690,7 @@ class FFmpegHelper:
             "-i", input_path,
             "-t", f"{duration:.6f}",
             "-c:v", FFMPEG_VIDEO_CODEC,
-            "-preset", FFMPEG_PRESET,
-            "-crf", FFMPEG_CRF,
+            *FFmpegHelper.encoding_args(encoding_profile),
             "-r", str(fps),
             "-g", str(fps),
             "-c:a", FFMPEG_AUDIO_CODEC,
@@ -172,20 +700,175 @@ class FFmpegHelper:
             output_file
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+        output = FFmpegHelper._run_split_cmd(cmd, output_file)
+        return [output] if output else []
+    
+    # Stream parameters that must match for the concat demuxer to copy inputs back to back
+    MERGE_SIGNATURE_KEYS = ("codec", "profile", "width", "height", "pix_fmt", "fps", "time_base",
+                            "audio_codec", "sample_rate", "channels")
+    
+    # Encoders used to bring an outlier input to the dominant codec
+    VIDEO_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+    AUDIO_ENCODERS = {"aac": "aac", "mp3": "libmp3lame", "opus": "libopus", "ac3": "ac3"}
+    
+    @staticmethod
+    def stream_signature(info: Dict) -> Optional[Dict]:
+        """Concat-relevant parameters of the first video and audio stream, None without video"""
+        streams = info.get("streams", [])
+        video = next((st for st in streams if st.get("codec_type") == "video"), None)
+        if not video:
+            return None
+        audio = next((st for st in streams if st.get("codec_type") == "audio"), {})
         
-        if result.returncode == 0 and os.path.exists(output_file):
-            return [os.path.basename(output_file)]
-        return []
+        return {
+            "codec": video.get("codec_name"),
+            "profile": video.get("profile"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "pix_fmt": video.get("pix_fmt"),
+            "fps": FFmpegHelper.summarize_probe(info)["fps"],
+            "frame_rate": video.get("avg_frame_rate") or video.get("r_frame_rate"),
+            "time_base": video.get("time_base"),
+            "audio_codec": audio.get("codec_name"),
+            "sample_rate": audio.get("sample_rate"),
+            "channels": audio.get("channels"),
+            "channel_layout": audio.get("channel_layout"),
+        }
+    
+    @staticmethod
+    def analyze_merge_inputs(input_files: List[str]) -> Optional[Tuple[Dict, List[int]]]:
+        """Pick the dominant stream signature among the inputs (most files, then longest
+        total duration) and return it with the indexes of the inputs that differ from it.
+        Returns None when an input cannot be probed."""
+        signatures = []
+        groups: Dict[tuple, Dict] = {}
+        for file_path in input_files:
+            info = FFmpegHelper.get_video_info(file_path)
+            signature = FFmpegHelper.stream_signature(info)
+            if signature is None:
+                return None
+            key = tuple(signature[k] for k in FFmpegHelper.MERGE_SIGNATURE_KEYS)
+            group = groups.setdefault(key, {"signature": signature, "count": 0, "duration": 0.0})
+            group["count"] += 1
+            group["duration"] += FFmpegHelper.summarize_probe(info)["duration"] or 0.0
+            signatures.append(key)
+        
+        if not groups:
+            return None
+        
+        dominant_key = max(groups, key=lambda k: (groups[k]["count"], groups[k]["duration"]))
+        outliers = [i for i, key in enumerate(signatures) if key != dominant_key]
+        return groups[dominant_key]["signature"], outliers
+    
+    @staticmethod
+    def _normalize_cmd(input_path: str, output_file: str, target: Dict,
+                       encoding_profile: str = BASE_ENCODING_PROFILE) -> Optional[List[str]]:
+        """ffmpeg command re-encoding input_path to the target signature, None if the
+        target codecs have no known encoder"""
+        video_encoder = FFmpegHelper.VIDEO_ENCODERS.get(target["codec"])
+        if not video_encoder:
+            return None
+        
+        source = FFmpegHelper.stream_signature(FFmpegHelper.get_video_info(input_path)) or {}
+        
+        cmd = ["ffmpeg", "-y", "-i", input_path]
+        audio_args = ["-an"]
+        if target["audio_codec"]:
+            audio_encoder = FFmpegHelper.AUDIO_ENCODERS.get(target["audio_codec"])
+            if not audio_encoder:
+                return None
+            audio_map = "0:a:0"
+            if not source.get("audio_codec"):
+                # Silent track so the audio stream runs through the whole merged file
+                layout = target["channel_layout"] or ("mono" if target["channels"] == 1 else "stereo")
+                cmd += ["-f", "lavfi", "-i", f"anullsrc=channel_layout={layout}:sample_rate={target['sample_rate']}"]
+                audio_map = "1:a:0"
+            audio_args = ["-map", audio_map, "-c:a", audio_encoder,
+                          "-ar", str(target["sample_rate"]), "-ac", str(target["channels"])]
+            if audio_map == "1:a:0":
+                audio_args.append("-shortest")
+        
+        width, height = target["width"], target["height"]
+        filters = [
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease",
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+            "setsar=1",
+        ]
+        if target["frame_rate"] and target["frame_rate"] != "0/0":
+            filters.append(f"fps={target['frame_rate']}")
+        if target["pix_fmt"]:
+            filters.append(f"format={target['pix_fmt']}")
+        
+        cmd += [
+            "-map", "0:v:0",
+            "-vf", ",".join(filters),
+            "-c:v", video_encoder,
+            *FFmpegHelper.encoding_args(encoding_profile),
+        ]
+        profile = FFmpegHelper.H264_PROFILES.get(str(target["profile"] or "").lower())
+        if target["codec"] == "h264" and profile:
+            cmd += ["-profile:v", profile]
+        time_base = str(target["time_base"] or "")
+        if time_base.startswith("1/"):
+            cmd += ["-video_track_timescale", time_base[2:]]
+        
+        return cmd + audio_args + ["-movflags", "+faststart", output_file]
+    
+    @staticmethod
+    def normalize_merge_inputs(input_files: List[str], outliers: List[int], target: Dict,
+                               temp_dir: str, progress: Optional[ProgressTracker] = None,
+                               encoding_profile: str = BASE_ENCODING_PROFILE) -> Optional[List[str]]:
+        """Re-encode the outlier inputs to the target signature in parallel. Returns the input
+        list with outliers replaced by their normalized copies, or None if one could not be made."""
+        ext = os.path.splitext(next(
+            (f for i, f in enumerate(input_files) if i not in outliers), input_files[0]
+        ))[1] or ".mp4"
+        
+        args_list = []
+        outputs = {}
+        for position, index in enumerate(outliers):
+            output_file = os.path.join(temp_dir, f"normalized_{index}{ext}")
+            cmd = FFmpegHelper._normalize_cmd(input_files[index], output_file, target, encoding_profile)
+            if cmd is None:
+                return None
+            if progress:
+                progress.add_task(position, FFmpegHelper.get_duration(input_files[index]))
+            args_list.append((cmd, output_file, progress, position))
+            outputs[index] = output_file
+        
+        done = FFmpegHelper._map_parallel(FFmpegHelper._run_split_cmd, args_list, progress)
+        if len(done) != len(args_list):
+            return None
+        
+        return [outputs.get(i, file_path) for i, file_path in enumerate(input_files)]
     
     @staticmethod
     def merge_videos_lossless(input_files: List[str], output_path: str, 
-                              temp_dir: str) -> bool:
-        """Merge videos losslessly - works best when all segments have same codec/fps"""
+                              temp_dir: str, progress: Optional[ProgressTracker] = None,
+                              encoding_profile: str = BASE_ENCODING_PROFILE) -> bool:
+        """Merge videos losslessly. Inputs whose streams differ from the dominant format are
+        re-encoded to it first, so only the odd files pay for a transcode; the full re-encode
+        is kept as a fallback for when the concat copy still fails."""
+        concat_inputs = input_files
+        expected_duration = sum(FFmpegHelper.get_duration(f) for f in input_files)
+        
+        analysis = FFmpegHelper.analyze_merge_inputs(input_files)
+        if analysis is not None and analysis[1]:
+            target, outliers = analysis
+            print(f"Normalizing {len(outliers)} of {len(input_files)} merge inputs")
+            concat_inputs = FFmpegHelper.normalize_merge_inputs(input_files, outliers, target, temp_dir,
+                                                                progress, encoding_profile)
+            if concat_inputs is None:
+                return FFmpegHelper._merge_with_reencode(input_files, output_path, temp_dir, progress=progress,
+                                                       encoding_profile=encoding_profile)
+            if progress:
+                normalized_duration = sum(FFmpegHelper.get_duration(input_files[i]) for i in outliers)
+                progress.add_task("merge", max(expected_duration - normalized_duration, 0.0))
+        
         concat_file = os.path.join(temp_dir, "concat_list.txt")
         
         with open(concat_file, "w") as f:
-            for file_path in input_files:
+            for file_path in concat_inputs:
                 escaped_path = file_path.replace("'", "'\\''")
                 f.write(f"file '{escaped_path}'\n")
         
@@ -201,16 +884,22 @@ class FFmpegHelper:
             output_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+        result = FFmpegHelper._run(cmd, 600, progress, "merge")
         
         if result.returncode == 0 and os.path.exists(output_path):
-            return True
+            # A concat copy of mismatched streams can exit cleanly yet stop short
+            merged_duration = FFmpegHelper.get_duration(output_path)
+            if merged_duration >= expected_duration - max(1.0, expected_duration * 0.02):
+                return True
+            print(f"Concat copy produced {merged_duration:.1f}s of {expected_duration:.1f}s, re-encoding")
         
-        return FFmpegHelper._merge_with_reencode(input_files, output_path, temp_dir)
+        return FFmpegHelper._merge_with_reencode(input_files, output_path, temp_dir, progress=progress,
+                                                       encoding_profile=encoding_profile)
     
     @staticmethod
     def _merge_with_reencode(input_files: List[str], output_path: str, 
-                             temp_dir: str, fps: int = 30) -> bool:
+                             temp_dir: str, fps: int = 30, progress: Optional[ProgressTracker] = None,
+                             encoding_profile: str = BASE_ENCODING_PROFILE) -> bool:
         """Re-encode and merge at consistent FPS for seamless playback"""
         concat_file = os.path.join(temp_dir, "concat_list.txt")
         
@@ -226,8 +915,7 @@ class FFmpegHelper:
             "-safe", "0",
             "-i", concat_file,
             "-c:v", FFMPEG_VIDEO_CODEC,
-            "-preset", FFMPEG_PRESET,
-            "-crf", FFMPEG_CRF,
+            *FFmpegHelper.encoding_args(encoding_profile),
             "-r", str(fps),
             "-g", str(fps),
             "-c:a", FFMPEG_AUDIO_CODEC,
@@ -237,38 +925,24 @@ class FFmpegHelper:
             output_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1200)
+        result = FFmpegHelper._run(cmd, 1200, progress, "merge")
         
         return result.returncode == 0 and os.path.exists(output_path)
     
     @staticmethod
     def split_video_720p(input_path: str, output_pattern: str, 
-                         segment_duration: int, total_duration: float, fps: int = 30) -> List[str]:
+                         segment_duration: int, total_duration: float, fps: int = 30,
+                         progress: Optional[ProgressTracker] = None,
+                         encoding_profile: str = BASE_ENCODING_PROFILE) -> List[str]:
         """Split video with 720p conversion and frame-accurate cuts at 30fps for seamless merging."""
-        frame_duration = 1.0 / fps
-        
-        num_segments = int(total_duration // segment_duration)
-        last_segment_duration = total_duration - (num_segments * segment_duration)
-        
-        if last_segment_duration > frame_duration:
-            num_segments += 1
-        
         cmds = []
         output_files = []
 
-        for i in range(num_segments):
-            start_frame = i * segment_duration * fps
-            start_time = start_frame / fps
-            
+        plan = FFmpegHelper.get_segment_plan(segment_duration, total_duration, fps)
+        for i, (start_time, actual_duration) in enumerate(plan):
             output_file = output_pattern.format(index=i + 1)
-            
-            if i == num_segments - 1 and last_segment_duration > frame_duration:
-                duration = last_segment_duration
-            else:
-                duration = segment_duration
-            
-            num_frames = int(duration * fps)
-            actual_duration = num_frames / fps
+            if progress:
+                progress.add_task(i, actual_duration)
             
             cmd = [
                 "ffmpeg",
@@ -278,8 +952,7 @@ class FFmpegHelper:
                 "-t", f"{actual_duration:.6f}",
                 "-vf", "scale='if(lt(iw,ih),720,trunc(720*iw/ih/2)*2)':'if(lt(iw,ih),trunc(720*ih/iw/2)*2,720)'",
                 "-c:v", FFMPEG_VIDEO_CODEC,
-                "-preset", FFMPEG_PRESET,
-                "-crf", FFMPEG_CRF,
+                *FFmpegHelper.encoding_args(encoding_profile),
                 "-r", str(fps),
                 "-g", str(fps),
                 "-force_key_frames", f"expr:eq(mod(n,{fps}),0)",
@@ -295,28 +968,81 @@ class FFmpegHelper:
             cmds.append(cmd)
             output_files.append(output_file)
             
-        # Execute in parallel
-        results = [None] * len(cmds)
-        max_workers = min(os.cpu_count() or 1, 4)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_index = {
-                executor.submit(FFmpegHelper._run_split_cmd, cmds[i], output_files[i]): i
-                for i in range(len(cmds))
-            }
-
-            for future in concurrent.futures.as_completed(future_to_index):
-                index = future_to_index[future]
-                try:
-                    results[index] = future.result()
-                except Exception as exc:
-                    print(f'Segment {index} generated an exception: {exc}')
+        return FFmpegHelper._run_parallel(cmds, output_files, progress)
+    
+    @staticmethod
+    def split_video_single_pass(input_path: str, output_pattern: str, segment_duration: int,
+                                total_duration: float, fps: int = 30, convert_720: bool = False,
+                                progress: Optional[ProgressTracker] = None,
+                                encoding_profile: str = BASE_ENCODING_PROFILE) -> List[str]:
+        """Split video in a single ffmpeg pass with the segment muxer.
+        The input is decoded once; keyframes are forced on the same 30fps grid as the
+        per-segment split so cut points and output names match split_video_lossless / split_video_720p."""
+        plan = FFmpegHelper.get_segment_plan(segment_duration, total_duration, fps)
+        if not plan:
+            return []
         
-        return [r for r in results if r is not None]
+        output_duration = plan[-1][0] + plan[-1][1]
+        segment_times = ",".join(f"{start:.6f}" for start, _ in plan[1:])
+        segment_pattern = output_pattern.replace("%", "%%").format(index="%d")
+        ext = os.path.splitext(output_pattern)[1].lower()
+        
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-t", f"{output_duration:.6f}",
+        ]
+        if convert_720:
+            cmd += ["-vf", "scale='if(lt(iw,ih),720,trunc(720*iw/ih/2)*2)':'if(lt(iw,ih),trunc(720*ih/iw/2)*2,720)'"]
+        cmd += [
+            "-c:v", FFMPEG_VIDEO_CODEC,
+            *FFmpegHelper.encoding_args(encoding_profile),
+            "-r", str(fps),
+            "-g", str(fps),
+            "-force_key_frames", f"expr:eq(mod(n,{fps}),0)",
+            "-c:a", FFMPEG_AUDIO_CODEC,
+            "-b:a", "192k",
+            "-fflags", "+genpts",
+            "-avoid_negative_ts", "make_zero",
+            "-f", "segment",
+            "-segment_start_number", "1",
+            "-segment_time_delta", f"{0.5 / fps:.6f}",
+            "-reset_timestamps", "1",
+        ]
+        if segment_times:
+            cmd += ["-segment_times", segment_times]
+        if ext in (".mp4", ".mov", ".m4v"):
+            cmd += ["-segment_format_options", "movflags=+faststart"]
+        cmd.append(segment_pattern)
+        
+        output_files = [output_pattern.format(index=i + 1) for i in range(len(plan))]
+        timeout = max(1200, int(output_duration * 5))
+        if progress:
+            progress.add_task(0, output_duration)
+        success = False
+        try:
+            result = FFmpegHelper._run(cmd, timeout, progress, 0)
+            if result.returncode == 0:
+                success = True
+            else:
+                print(f"FFmpeg segment error: {result.stderr}")
+        except Exception as e:
+            print(f"FFmpeg execution error: {e}")
+        
+        if not success:
+            # A failed pass can leave a truncated last segment behind
+            for output_file in output_files:
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+            return []
+        
+        return [os.path.basename(f) for f in output_files if os.path.exists(f)]
     
     @staticmethod
     def merge_videos_720p(input_files: List[str], output_path: str, 
-                          temp_dir: str, fps: int = 30) -> bool:
+                          temp_dir: str, fps: int = 30, progress: Optional[ProgressTracker] = None,
+                          encoding_profile: str = BASE_ENCODING_PROFILE) -> bool:
         """Merge videos with 720p conversion at consistent FPS for seamless playback"""
         concat_file = os.path.join(temp_dir, "concat_list.txt")
         
@@ -333,8 +1059,7 @@ class FFmpegHelper:
             "-i", concat_file,
             "-vf", "scale='if(lt(iw,ih),720,trunc(720*iw/ih/2)*2)':'if(lt(iw,ih),trunc(720*ih/iw/2)*2,720)'",
             "-c:v", FFMPEG_VIDEO_CODEC,
-            "-preset", FFMPEG_PRESET,
-            "-crf", FFMPEG_CRF,
+            *FFmpegHelper.encoding_args(encoding_profile),
             "-r", str(fps),
             "-g", str(fps),
             "-c:a", FFMPEG_AUDIO_CODEC,
@@ -344,6 +1069,6 @@ class FFmpegHelper:
             output_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1200)
+        result = FFmpegHelper._run(cmd, 1200, progress, "merge")
         
         return result.returncode == 0 and os.path.exists(output_path)
@@ -1,10 +1,13 @@
 import os
 import shutil
 import uuid
+import hashlib
 from werkzeug.utils import secure_filename
 from typing import Optional, Tuple
 from config import UPLOAD_DIR, OUTPUT_DIR, ALLOWED_EXTENSIONS, MAX_FILE_SIZE
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
 
 class FileHandler:
     
@@ -35,6 +38,35 @@ class FileHandler:
         file.save(file_path)
         return filename, file_path
     
+    @staticmethod
+    def save_upload_hashed(file, original_name: str) -> Tuple[str, str, str]:
+        """Stream an upload to UPLOAD_DIR, hashing it on the way.
+        Returns (filename, file_path, sha256 hex digest)."""
+        filename = FileHandler.generate_unique_filename(original_name)
+        file_path = os.path.join(UPLOAD_DIR, filename)
+        digest = hashlib.sha256()
+        
+        with open(file_path, "wb") as out:
+            while True:
+                chunk = file.stream.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        
+        return filename, file_path, digest.hexdigest()
+    
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+    
     @staticmethod
     def get_file_size(file_path: str) -> int:
         try:
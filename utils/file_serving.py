@@ -0,0 +1,44 @@
+import os
+import mimetypes
+import unicodedata
+from typing import Optional
+from urllib.parse import quote
+
+from flask import Response, send_file
+from werkzeug.security import safe_join
+
+from config import FILE_SERVING_MODE, X_ACCEL_LOCATIONS
+
+
+def content_disposition(download_name: str) -> str:
+    """attachment header with an ASCII fallback name and the UTF-8 name (RFC 6266)"""
+    ascii_name = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode()
+    ascii_name = ascii_name.replace('"', "").replace("\\", "") or "download"
+    if ascii_name == download_name:
+        return f'attachment; filename="{ascii_name}"'
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(download_name)}"
+
+
+def send_download(directory: str, filename: str, download_name: Optional[str] = None) -> Optional[Response]:
+    """Attachment response for directory/filename, or None when it does not exist
+    (or would escape directory).
+
+    In 'flask' mode Werkzeug answers Range, If-Range and If-None-Match itself.
+    In 'x-accel' and 'x-sendfile' mode the body is left to the front server,
+    which then also handles ranges, validators and sendfile."""
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    download_name = download_name or os.path.basename(filename)
+
+    if FILE_SERVING_MODE == 'x-accel' and directory in X_ACCEL_LOCATIONS:
+        header, value = 'X-Accel-Redirect', X_ACCEL_LOCATIONS[directory] + quote(filename)
+    elif FILE_SERVING_MODE == 'x-sendfile':
+        header, value = 'X-Sendfile', path
+    else:
+        return send_file(path, as_attachment=True, download_name=download_name, conditional=True, etag=True)
+
+    response = Response(mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream')
+    response.headers[header] = value
+    response.headers['Content-Disposition'] = content_disposition(download_name)
+    return response
@@ -0,0 +1,48 @@
+import threading
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+try:
+    from yt_dlp.extractor import gen_extractor_classes
+except ImportError:
+    gen_extractor_classes = None
+
+# Query parameters that identify the media rather than the visit (tracking, share source...)
+ID_QUERY_PARAMS = ('v', 'id', 'fbid', 'story_fbid')
+
+_extractors = None
+_extractors_lock = threading.Lock()
+
+
+def _extractor_classes():
+    global _extractors
+    with _extractors_lock:
+        if _extractors is None:
+            _extractors = [ie for ie in gen_extractor_classes() if ie.ie_key() != 'Generic']
+        return _extractors
+
+
+def normalize_url(url: str) -> str:
+    """url without scheme differences, www./m. hosts, fragment, tracking parameters or trailing slash"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ('www.', 'm.', 'mobile.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if k in ID_QUERY_PARAMS))
+    return urlunsplit(('https', host, parts.path.rstrip('/'), query, ''))
+
+
+def canonical_media_key(url: str, platform: Optional[str] = None) -> str:
+    """Identity of the media behind url, computed without any network access:
+    '<extractor>:<media id>' when a yt-dlp extractor recognises the URL (so
+    youtu.be/X, youtube.com/watch?v=X and youtube.com/shorts/X all match),
+    else '<platform>:<normalized url>'."""
+    if gen_extractor_classes is not None:
+        for ie in _extractor_classes():
+            if ie.suitable(url):
+                media_id = ie.get_temp_id(url)
+                if media_id:
+                    return f"{ie.ie_key().lower()}:{media_id}"
+                break
+    return f"{platform or 'url'}:{normalize_url(url)}"
@@ -0,0 +1,227 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 3600.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A metric family in the Prometheus text format, one series per label combination"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self.samples()
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def set_total(self, value: float, **labels):
+        """Copy a running total kept elsewhere (e.g. a cache's hit count), from a collector"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.set_total(value, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple, dict] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            series["counts"][bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series["count"] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, dict(s, counts=list(s["counts"]))) for key, s in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process metrics. Collectors are called before every render to
+    copy in-memory state (caches, scheduler, stats snapshot) into gauges."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, func: Callable[[], None]):
+        self._collectors.append(func)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "clipflow_http_request_duration_seconds", "HTTP request latency by route",
+    ("endpoint", "method", "status"))
+
+JOB_DURATION = registry.histogram(
+    "clipflow_job_duration_seconds", "Time spent running a job, by job type",
+    ("type",), JOB_BUCKETS)
+JOB_STAGE_DURATION = registry.histogram(
+    "clipflow_job_stage_duration_seconds", "Time spent in each stage of a job (upload, probe, encode, concat, db_commit)",
+    ("type", "stage"), JOB_BUCKETS)
+JOB_QUEUE_DEPTH = registry.gauge(
+    "clipflow_job_queue_depth", "Jobs waiting in the queue")
+JOBS_RUNNING = registry.gauge(
+    "clipflow_jobs_running", "Jobs running in this process")
+
+SUBPROCESS_DURATION = registry.histogram(
+    "clipflow_subprocess_duration_seconds", "Duration of external tool runs (ffmpeg, ffprobe, yt-dlp)",
+    ("tool",), JOB_BUCKETS)
+SUBPROCESS_FAILURES = registry.counter(
+    "clipflow_subprocess_failures_total", "External tool runs that exited with an error", ("tool",))
+
+IO_BYTES = registry.counter(
+    "clipflow_io_bytes_total", "Bytes of media read and written, by direction and source",
+    ("direction", "source"))
+
+CACHE_LOOKUPS = registry.counter(
+    "clipflow_cache_lookups_total",
+    "Cache lookups by cache and result (hit, miss, or coalesced into a running download)", ("cache", "result"))
+
+ENCODE_SLOTS = registry.gauge(
+    "clipflow_encode_threads", "Encode scheduler threads by state (budget, in_use)", ("state",))
+ENCODE_WAIT = registry.gauge(
+    "clipflow_encode_wait_seconds", "Encode scheduler wait for a slot (average, max)", ("stat",))
+
+STATS_TOTALS = registry.counter(
+    "clipflow_stats_total", "Lifetime counters from the stats table, refreshed in the background", ("counter",))
+
+
+@contextmanager
+def job_stage(job_type: str, stage: str) -> Iterator[None]:
+    with JOB_STAGE_DURATION.time(type=job_type, stage=stage):
+        yield
+
+
+def observe_subprocess(tool: str, seconds: float, ok: bool = True):
+    SUBPROCESS_DURATION.observe(seconds, tool=tool)
+    if not ok:
+        SUBPROCESS_FAILURES.inc(tool=tool)
+
+
+def count_bytes(direction: str, source: str, amount: int):
+    if amount:
+        IO_BYTES.inc(amount, direction=direction, source=source)
@@ -0,0 +1,74 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def parse_since(value: Optional[str]) -> Optional[datetime]:
+    """ISO 8601 timestamp (UTC) from a query string; raises ValueError"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    return parsed
+
+
+def paginate(query, model, cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """Keyset pagination, newest first, on (created_at, id).
+
+    Unlike OFFSET, the cost of a page does not grow with its depth, and rows
+    inserted while a client pages through do not shift the following pages.
+    Returns (rows, next_cursor); next_cursor is None on the last page."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def page_args(args, page_size: int, max_page_size: int) -> Tuple[Optional[dict], Optional[str]]:
+    """cursor, limit and since from request args; (values, error)"""
+    cursor = args.get('cursor') or None
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            return None, "cursor is invalid"
+
+    try:
+        limit = int(args.get('limit', page_size))
+    except ValueError:
+        return None, "limit must be an integer"
+    if limit <= 0:
+        return None, "limit must be positive"
+
+    try:
+        since = parse_since(args.get('since'))
+    except ValueError:
+        return None, "since must be an ISO 8601 timestamp"
+
+    return {"cursor": cursor, "limit": min(limit, max_page_size), "since": since}, None
@@ -0,0 +1,76 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import PROBE_CACHE_SIZE
+
+
+class ProbeCache:
+    """In-memory LRU of parsed ffprobe results.
+
+    Entries are keyed by (path, size, mtime), so a file that is replaced or
+    rewritten in place is probed again. Several kinds of result can be cached
+    per file ('info' for streams/format, 'keyframes' for the keyframe index)."""
+
+    def __init__(self, max_entries: int = PROBE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_key(file_path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return os.path.realpath(file_path), st.st_size, st.st_mtime_ns
+
+    def get(self, file_path: str, kind: str = "info") -> Optional[Any]:
+        key = self.file_key(file_path)
+        with self._lock:
+            if key is not None and (kind, key) in self._entries:
+                self._entries.move_to_end((kind, key))
+                self.hits += 1
+                return self._entries[(kind, key)]
+            self.misses += 1
+            return None
+
+    def put(self, file_path: str, value: Any, kind: str = "info"):
+        key = self.file_key(file_path)
+        if key is None:
+            return
+        self._store((kind, key), value)
+
+    def export(self, file_path: str) -> Optional[Dict]:
+        """Serializable copy of the cached info for file_path, for persisting in the DB"""
+        key = self.file_key(file_path)
+        if key is None:
+            return None
+        with self._lock:
+            info = self._entries.get(("info", key))
+        if info is None:
+            return None
+        return {"size": key[1], "mtime_ns": key[2], "info": info}
+
+    def load(self, file_path: str, entry: Optional[Dict]) -> bool:
+        """Seed the cache from an exported entry if the file on disk is unchanged"""
+        if not entry or "info" not in entry:
+            return False
+        key = self.file_key(file_path)
+        if key is None or (key[1], key[2]) != (entry.get("size"), entry.get("mtime_ns")):
+            return False
+        self._store(("info", key), entry["info"])
+        return True
+
+    def _store(self, cache_key: Tuple, value: Any):
+        with self._lock:
+            self._entries[cache_key] = value
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+probe_cache = ProbeCache()
@@ -0,0 +1,114 @@
+import time
+import threading
+from typing import Callable, Dict, Optional, Hashable, Tuple
+
+from config import PROGRESS_UPDATE_INTERVAL
+
+
+class ProgressTracker:
+    """Aggregates ffmpeg progress reports from one or more concurrent tasks.
+
+    Each task (a split segment, a merge pass...) reports how many seconds of
+    media it has written and its current speed. The tracker turns that into an
+    overall percentage, a combined speed (x realtime) and an ETA, and hands the
+    result to on_update at most once every `interval` seconds."""
+
+    def __init__(self, total_duration: float,
+                 on_update: Callable[[int, Optional[float], Optional[float]], None],
+                 interval: float = PROGRESS_UPDATE_INTERVAL):
+        self.total_duration = max(total_duration, 0.0)
+        self.on_update = on_update
+        self.interval = interval
+        self.started_at = time.monotonic()
+
+        self._durations: Dict[Hashable, float] = {}
+        self._done: Dict[Hashable, float] = {}
+        self._speeds: Dict[Hashable, float] = {}
+        self._finished = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def add_task(self, task: Hashable, duration: float):
+        with self._lock:
+            self._durations[task] = duration
+            self._done.setdefault(task, 0.0)
+
+    def update(self, task: Hashable, out_time: float, speed: Optional[float] = None):
+        with self._lock:
+            limit = self._durations.get(task)
+            if limit is not None:
+                out_time = min(out_time, limit)
+            self._done[task] = max(out_time, 0.0)
+            if speed is not None:
+                self._speeds[task] = speed
+        self.flush()
+
+    def finish_task(self, task: Hashable):
+        with self._lock:
+            if task in self._durations:
+                self._done[task] = self._durations[task]
+            self._finished.add(task)
+            self._speeds.pop(task, None)
+        self.flush()
+
+    def snapshot(self) -> Tuple[int, Optional[float], Optional[float]]:
+        """Return (percent, speed, eta_seconds)"""
+        with self._lock:
+            done = sum(self._done.values())
+            active_speed = sum(v for k, v in self._speeds.items() if k not in self._finished)
+
+        if self.total_duration <= 0:
+            return 0, None, None
+
+        done = min(done, self.total_duration)
+        # The job itself reports 100 once its outputs are committed
+        percent = min(int(done * 100 / self.total_duration), 99)
+
+        speed = active_speed or None
+        if speed is None:
+            elapsed = time.monotonic() - self.started_at
+            if elapsed > 0 and done > 0:
+                speed = done / elapsed
+
+        eta = None
+        if speed:
+            eta = (self.total_duration - done) / speed
+        return percent, speed, eta
+
+    def flush(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.interval:
+            return
+        # Skip rather than queue up behind a flush that is already writing
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_flush = now
+            percent, speed, eta = self.snapshot()
+            self.on_update(percent, speed, eta)
+        except Exception as e:
+            print(f"Progress update error: {e}")
+        finally:
+            self._flush_lock.release()
+
+
+def parse_progress_block(lines) -> Tuple[Optional[float], Optional[float]]:
+    """Parse key=value lines from `ffmpeg -progress` into (out_time_seconds, speed)"""
+    out_time = None
+    speed = None
+    for line in lines:
+        key, _, value = line.strip().partition("=")
+        value = value.strip()
+        try:
+            # out_time_ms is in microseconds too (historic ffmpeg naming)
+            if key in ("out_time_us", "out_time_ms"):
+                out_time = int(value) / 1_000_000
+            elif key == "out_time" and out_time is None:
+                hours, minutes, seconds = value.split(":")
+                out_time = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            elif key == "speed" and value.endswith("x"):
+                speed = float(value[:-1])
+        except ValueError:
+            continue
+    return out_time, speed
@@ -0,0 +1,69 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# ru_inblock / ru_oublock are counted in 512-byte blocks on Linux
+BLOCK_SIZE = 512
+
+FIELDS = ("processes", "wallSeconds", "userCpuSeconds", "systemCpuSeconds", "maxRssMb",
+          "readBytes", "writtenBytes")
+
+
+class ResourceUsage:
+    """Running totals of the rusage of the child processes started for one job,
+    overall and per tool (ffmpeg, ffprobe...)"""
+
+    def __init__(self):
+        self._totals = dict.fromkeys(FIELDS, 0)
+        self._tools: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _add(totals: Dict, usage, wall: float):
+        totals["processes"] += 1
+        totals["wallSeconds"] += wall
+        if usage is None:
+            return
+        totals["userCpuSeconds"] += usage.ru_utime
+        totals["systemCpuSeconds"] += usage.ru_stime
+        totals["maxRssMb"] = max(totals["maxRssMb"], usage.ru_maxrss / 1024)
+        totals["readBytes"] += usage.ru_inblock * BLOCK_SIZE
+        totals["writtenBytes"] += usage.ru_oublock * BLOCK_SIZE
+
+    def add(self, tool: str, usage, wall: float):
+        """Account one finished child; usage is the os.wait4 rusage, or None when unavailable"""
+        with self._lock:
+            self._add(self._totals, usage, wall)
+            self._add(self._tools.setdefault(tool, dict.fromkeys(FIELDS, 0)), usage, wall)
+
+    @staticmethod
+    def _rounded(totals: Dict) -> Dict:
+        return {key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()}
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            result = self._rounded(self._totals)
+            result["tools"] = {tool: self._rounded(totals) for tool, totals in sorted(self._tools.items())}
+        return result
+
+
+_current: ContextVar[Optional[ResourceUsage]] = ContextVar("resource_usage", default=None)
+
+
+@contextmanager
+def track_resources() -> Iterator[ResourceUsage]:
+    """Collect the usage of every child started in this context (threads started with
+    a copy of the context included)"""
+    usage = ResourceUsage()
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+
+
+def record_child(tool: str, usage, wall: float):
+    current = _current.get()
+    if current is not None:
+        current.add(tool, usage, wall)
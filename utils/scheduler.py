@@ -0,0 +1,119 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+from config import ENCODE_CPU_BUDGET, ENCODE_MAX_THREADS, SOCIAL_STREAM_ENCODE_BUDGET
+
+
+class EncodeScheduler:
+    """Process-wide owner of the CPU budget for ffmpeg encodes.
+
+    Every encode asks for a slot before starting and is granted a number of
+    threads (passed to ffmpeg as -threads). The grant is the fair share of the
+    budget across the encodes that are running, waiting or announced by a batch
+    (split segments) at that moment, so a lone merge gets many threads while a
+    split of many segments runs them side by side with few threads each.
+    Requests block while the budget is fully used."""
+
+    def __init__(self, budget: int = ENCODE_CPU_BUDGET, max_threads: int = ENCODE_MAX_THREADS):
+        self.budget = max(1, budget)
+        self.max_threads = max(1, max_threads)
+
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._active = 0
+        self._waiting = 0
+        self._announced = 0
+
+        self._grants = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._busy_core_seconds = 0.0
+        self._last_change = time.monotonic()
+        self._started_at = self._last_change
+
+    def _account(self):
+        """Integrate cores in use over time; call with the condition held before changing _in_use"""
+        now = time.monotonic()
+        self._busy_core_seconds += self._in_use * (now - self._last_change)
+        self._last_change = now
+
+    def _fair_share(self) -> int:
+        demand = max(self._active + self._waiting, self._announced, 1)
+        return max(1, min(self.max_threads, self.budget // demand))
+
+    def max_parallel(self, count: int) -> int:
+        """How many of count independent encodes are worth running at once"""
+        return max(1, min(count, self.budget))
+
+    @contextmanager
+    def demand(self, count: int) -> Iterator[Callable[[], None]]:
+        """Announce a batch of count encodes that are about to ask for slots.
+        Yields a callback to report each finished encode of the batch."""
+        remaining = [count]
+        with self._cond:
+            self._announced += count
+
+        def task_done():
+            with self._cond:
+                if remaining[0] > 0:
+                    remaining[0] -= 1
+                    self._announced -= 1
+
+        try:
+            yield task_done
+        finally:
+            with self._cond:
+                self._announced -= remaining[0]
+
+    @contextmanager
+    def slot(self) -> Iterator[int]:
+        """Hold part of the budget for one encode; yields the thread count to use"""
+        requested_at = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_use >= self.budget:
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            threads = min(self._fair_share(), self.budget - self._in_use)
+
+            self._account()
+            self._in_use += threads
+            self._active += 1
+
+            waited = time.monotonic() - requested_at
+            self._grants += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            yield threads
+        finally:
+            with self._cond:
+                self._account()
+                self._in_use -= threads
+                self._active -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            self._account()
+            elapsed = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                "budget": self.budget,
+                "inUse": self._in_use,
+                "active": self._active,
+                "waiting": self._waiting,
+                "utilization": round(self._in_use / self.budget, 3),
+                "averageUtilization": round(self._busy_core_seconds / (self.budget * elapsed), 3),
+                "grants": self._grants,
+                "averageWaitSeconds": round(self._wait_total / self._grants, 3) if self._grants else 0.0,
+                "maxWaitSeconds": round(self._wait_max, 3),
+            }
+
+
+encode_scheduler = EncodeScheduler()
+# Encodes fed from the network (streamed social downloads), kept off the main budget
+stream_encode_scheduler = EncodeScheduler(SOCIAL_STREAM_ENCODE_BUDGET)
@@ -0,0 +1,6 @@
+import json
+
+
+def sse_event(event: str, data) -> str:
+    """One server-sent event named event carrying data as JSON"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
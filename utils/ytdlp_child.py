@@ -0,0 +1,137 @@
+"""yt-dlp download, run as a child process of a social download job:
+
+    python utils/ytdlp_child.py '{"url": ..., "options": {...}}'
+
+Writes one JSON object per line on stdout: {"progress": {...}} while
+downloading, then {"info": {...}} or {"error": "..."}. Other "mode"s download
+nothing: "expand" lists the playlist/profile at url as {"entries": [{"url",
+"title"}, ...]} (a single video lists itself); "resolve" answers {"info": {...}}
+for the format yt-dlp would download, with "stream": {"url", "protocol",
+"headers"} when that format is one progressive http(s) stream the server can
+fetch and pipe into ffmpeg, else null (e.g. DASH video and audio in separate
+streams, HLS). The headers include the cookies, so they only travel over this
+pipe, never on a command line. Anything yt-dlp prints
+goes to stderr. Only the standard library and yt-dlp are imported, so the child
+starts without loading the application."""
+import json
+import sys
+import time
+
+PROGRESS_INTERVAL = 0.5
+INFO_FIELDS = ('title', 'uploader', 'channel', 'duration', 'view_count', 'like_count',
+               'width', 'height', 'vcodec', 'acodec', 'ext')
+STREAM_PROTOCOLS = ('http', 'https')
+VIDEO_EXTS = ('mp4', 'm4v', 'mov', 'webm', 'mkv', 'flv', 'ts')
+
+
+def main(argv) -> int:
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    def emit(message):
+        out.write(json.dumps(message) + "\n")
+        out.flush()
+
+    try:
+        import yt_dlp
+    except ImportError:
+        emit({"error": "yt-dlp not installed"})
+        return 1
+
+    request = json.loads(argv[1])
+    last_report = [0.0]
+
+    def hook(d):
+        status = d.get('status')
+        if status == 'downloading':
+            now = time.monotonic()
+            if now - last_report[0] < PROGRESS_INTERVAL:
+                return
+            last_report[0] = now
+        elif status != 'finished':
+            return
+        emit({"progress": {
+            "status": status,
+            "downloaded": d.get('downloaded_bytes'),
+            "total": d.get('total_bytes') or d.get('total_bytes_estimate'),
+            "speed": d.get('speed'),
+            "eta": d.get('eta'),
+        }})
+
+    mode = request.get("mode", "download")
+    if mode == "expand":
+        return expand(request, emit)
+    if mode == "resolve":
+        return resolve(request, emit)
+
+    options = {**request["options"], 'progress_hooks': [hook]}
+    try:
+        with yt_dlp.YoutubeDL(options) as ydl:
+            info = ydl.extract_info(request["url"], download=True)
+            if not info:
+                emit({"error": "Could not extract media info"})
+                return 1
+            result = {field: info.get(field) for field in INFO_FIELDS}
+            downloads = info.get('requested_downloads') or [{}]
+            result["filename"] = downloads[0].get('filepath') or ydl.prepare_filename(info)
+    except Exception as e:
+        emit({"error": str(e)})
+        return 1
+
+    emit({"info": result})
+    return 0
+
+
+def expand(request, emit) -> int:
+    import yt_dlp
+
+    try:
+        with yt_dlp.YoutubeDL(request["options"]) as ydl:
+            info = ydl.extract_info(request["url"], download=False)
+    except Exception as e:
+        emit({"error": str(e)})
+        return 1
+    if not info:
+        emit({"error": "Could not extract playlist"})
+        return 1
+
+    entries = []
+    for entry in (info.get('entries') if 'entries' in info else [info]) or []:
+        url = entry and (entry.get('webpage_url') or entry.get('url'))
+        if url and url.startswith(('http://', 'https://')):
+            entries.append({"url": url, "title": entry.get('title')})
+    emit({"entries": entries})
+    return 0
+
+
+def resolve(request, emit) -> int:
+    import yt_dlp
+
+    try:
+        with yt_dlp.YoutubeDL(request["options"]) as ydl:
+            info = ydl.extract_info(request["url"], download=False)
+            if not info:
+                emit({"error": "Could not extract media info"})
+                return 1
+            result = {field: info.get(field) for field in INFO_FIELDS}
+            result["stream"] = None
+            # 'requested_formats' means separate video and audio streams
+            if (not info.get('requested_formats') and info.get('url')
+                    and info.get('protocol') in STREAM_PROTOCOLS
+                    and info.get('vcodec') != 'none'
+                    and info.get('ext') in VIDEO_EXTS):
+                headers = dict(info.get('http_headers') or {})
+                cookie = ydl.cookiejar.get_cookie_header(info['url'])
+                if cookie:
+                    headers['Cookie'] = cookie
+                result["stream"] = {"url": info['url'], "protocol": info['protocol'], "headers": headers}
+    except Exception as e:
+        emit({"error": str(e)})
+        return 1
+
+    emit({"info": result})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,60 @@
+import os
+import time
+import zipfile
+from typing import Iterable, Iterator, Tuple, Union
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object: ZipFile writes into it and the
+    generator hands out whatever it holds after each chunk"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries: Iterable[Tuple[str, Union[str, bytes]]], chunk_size: int = ZIP_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a ZIP archive of entries, (name in the archive, file path or bytes), as it is built.
+
+    Members are stored uncompressed and written through a data descriptor, so
+    nothing is seeked or buffered beyond one chunk; ZIP64 records are used for
+    members over 4 GiB."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, source in entries:
+            if isinstance(source, bytes):
+                info = zipfile.ZipInfo(name, time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                archive.writestr(info, source)
+                continue
+
+            info = zipfile.ZipInfo.from_file(source, name)
+            info.compress_type = zipfile.ZIP_STORED
+            size = os.path.getsize(source)
+            with open(source, 'rb') as src, archive.open(info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as dest:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()